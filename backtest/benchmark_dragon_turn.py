@@ -0,0 +1,123 @@
+"""
+龙回头 Backtrader 策略基准测试
+
+用随机行情构造大量数据源（默认 3000 只股票），只有少量股票有信号，
+统计策略 next() 的累计耗时与每个交易日的平均耗时。
+
+对比同样信号数量下 300 只与 3000 只数据源的结果：next() 的代价应当随持仓和信号数量变化，
+而与数据源总数基本无关（Backtrader 自身推进数据源的开销不计入）。
+
+运行方式（不依赖数据库）：
+    python -m backtest.benchmark_dragon_turn --feeds 3000 --bars 120 --signals 300
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+from backtest.strategies_backtrader import DragonTurnBacktraderStrategy, PandasData
+
+
+class TimedDragonTurnStrategy(DragonTurnBacktraderStrategy):
+    """累计 next() 耗时的策略"""
+
+    def __init__(self):
+        super().__init__()
+        self.next_seconds = 0.0
+        self.next_calls = 0
+
+    def next(self):
+        started = time.perf_counter()
+        super().next()
+        self.next_seconds += time.perf_counter() - started
+        self.next_calls += 1
+
+    def log(self, txt, dt=None):
+        # 基准测试中不输出逐笔日志
+        pass
+
+
+def build_feeds(n_feeds: int, n_bars: int, seed: int = 7):
+    """随机游走行情，返回 ({code: DataFrame}, 交易日列表)"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2024-01-02', periods=n_bars, name='datetime')
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_bars, n_feeds)), axis=0))
+    frames = {}
+    for idx in range(n_feeds):
+        c = close[:, idx]
+        frames[f'{600000 + idx:06d}.SH'] = pd.DataFrame({
+            'open': c * (1 + rng.normal(0, 0.005, n_bars)),
+            'high': c * 1.02,
+            'low': c * 0.98,
+            'close': c,
+            'volume': 1e6,
+        }, index=index)
+    return frames, [d.date() for d in index]
+
+
+def build_signals(frames, trading_days, n_signals: int, seed: int = 11):
+    """在随机股票、随机交易日生成信号，第一买点取当日收盘价（当日最低价可触及）"""
+    rng = np.random.default_rng(seed)
+    codes = list(frames)
+    signals = {}
+    for _ in range(n_signals):
+        code = codes[rng.integers(len(codes))]
+        day_idx = int(rng.integers(len(trading_days) - 1))
+        close = float(frames[code]['close'].iloc[day_idx])
+        signal_date = trading_days[day_idx]
+        signals.setdefault(signal_date, []).append(SimpleNamespace(
+            stock_code=code,
+            signal_date=signal_date,
+            first_buy_point=round(close, 2),
+            take_profit_point=round(close * 1.08, 2),
+            stop_loss_point=round(close * 0.93, 2),
+            strategy_type='龙回头',
+        ))
+    return signals
+
+
+def run(n_feeds: int, n_bars: int, n_signals: int):
+    frames, trading_days = build_feeds(n_feeds, n_bars)
+    signals = build_signals(frames, trading_days, n_signals)
+
+    started = time.perf_counter()
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.broker.setcash(100_000_000)
+    for code, frame in frames.items():
+        cerebro.adddata(PandasData(dataname=frame), name=code)
+    cerebro.addstrategy(
+        TimedDragonTurnStrategy,
+        signal_data=signals,
+        hold_timeout_days=20,
+        capital_per_stock_ratio=0.01,
+    )
+    setup_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    strategy = cerebro.run()[0]
+    run_seconds = time.perf_counter() - started
+
+    print(
+        f"数据源 {n_feeds:>5} | 交易日 {n_bars} | 信号 {n_signals} | 成交 {len(strategy.trade_logs):>4} 笔 | "
+        f"构建 {setup_seconds:6.2f}s | 运行 {run_seconds:6.2f}s | "
+        f"next() 合计 {strategy.next_seconds:6.3f}s，每日 {1000 * strategy.next_seconds / max(strategy.next_calls, 1):.3f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='龙回头 Backtrader 策略基准测试')
+    parser.add_argument('--feeds', type=int, default=3000, help='数据源数量')
+    parser.add_argument('--bars', type=int, default=120, help='每个数据源的交易日数')
+    parser.add_argument('--signals', type=int, default=300, help='信号数量')
+    args = parser.parse_args()
+
+    # 先跑一个 1/10 规模的对照组，信号数量相同
+    run(max(args.feeds // 10, 1), args.bars, args.signals)
+    run(args.feeds, args.bars, args.signals)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,15 @@
 自定义 Backtrader 数据源
 支持额外的 up_limit 字段
 """
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Optional
+import threading
+
 import backtrader as bt
+import numpy as np
+import pandas as pd
+from django.conf import settings
 
 
 class LimitBreakDataFeed(bt.feeds.PandasData):
@@ -25,3 +33,147 @@ class LimitBreakDataFeed(bt.feeds.PandasData):
         ('up_limit', -1),        # 涨停标记列名（-1表示使用默认列名'up_limit'）
         ('openinterest', -1),    # 不使用持仓量
     )
+
+
+FEED_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def split_feed_frames(prices, start_date: date, end_date: date) -> Dict[str, pd.DataFrame]:
+    """
+    把行情一次性拆分为每只股票的数据源 DataFrame
+
+    先按 (股票, 日期) 顺序取出全部有效行组成一个二维数组，再按股票边界切片，
+    不逐股票、逐日期查找，总代价与行数成正比。
+
+    Args:
+        prices: PricePanel，或按 (stock_id, trade_date) 排序的日线 DataFrame（load_bars_frame 的结果）
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+
+    Returns:
+        {stock_code: 以 datetime 为索引、含 open/high/low/close/volume 列的 DataFrame}
+    """
+    start, end = np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D')
+
+    if isinstance(prices, pd.DataFrame):
+        if prices.empty:
+            return {}
+        trade_dates = prices['trade_date'].to_numpy().astype('datetime64[D]')
+        keep = (trade_dates >= start) & (trade_dates <= end)
+        codes = prices['stock_id'].to_numpy()[keep]
+        bounds = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1, [len(codes)]))
+        stock_codes = codes[bounds[:-1]].tolist() if len(codes) else []
+        index = pd.DatetimeIndex(trade_dates[keep], name='datetime')
+        block = np.empty((len(codes), len(FEED_COLUMNS)), order='F')
+        for col, field in enumerate(FEED_COLUMNS):
+            block[:, col] = prices[field].to_numpy()[keep]
+    else:
+        if prices.is_empty:
+            return {}
+        in_range = (prices.days >= start) & (prices.days <= end)
+        # 面板按列存储，转置后是按股票优先的连续数组，布尔索引取出的行天然按股票分组
+        mask = (prices.has_data & in_range[:, None]).T
+        counts = mask.sum(axis=1)
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        stock_codes = prices.codes
+        day_positions = np.broadcast_to(np.arange(len(prices.days)), mask.shape)[mask]
+        index = pd.DatetimeIndex(prices.days, name='datetime')[day_positions]
+        block = np.empty((int(bounds[-1]), len(FEED_COLUMNS)), order='F')
+        for col, field in enumerate(FEED_COLUMNS):
+            block[:, col] = getattr(prices, field).T[mask]
+
+    # 按列存储的单个二维块构造 DataFrame 不会复制，各股票的切片也只是视图
+    frame = pd.DataFrame(block, index=index, columns=list(FEED_COLUMNS), copy=False)
+    return {
+        code: frame.iloc[begin:finish]
+        for code, begin, finish in zip(stock_codes, bounds[:-1].tolist(), bounds[1:].tolist())
+        if finish > begin
+    }
+
+
+class FeedPool:
+    """
+    Backtrader 数据源对象池，跨多次回测复用已构建的数据源
+
+    Cerebro 每次运行前会 reset 数据源的 lines，因此同一个数据源对象可以在下一次运行中再次使用。
+    取出（checkout）时从池中移除，运行结束后再归还（checkin），并发运行不会共享同一个对象。
+    键包含日线数据版本号，取出时发现版本变化即清空池，旧版本的数据源归还时直接丢弃。
+    容量默认取 settings.BACKTEST_FEED_POOL_SIZE，为 0 时不复用（默认关闭）。
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        self._capacity = capacity
+        self._version = None
+        self._feeds = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        if self._capacity is not None:
+            return self._capacity
+        return getattr(settings, 'BACKTEST_FEED_POOL_SIZE', 0)
+
+    def checkout(self, loader, stock_codes, start_date: date, end_date: date,
+                 version=None, feed_class=bt.feeds.PandasData) -> Dict[str, bt.feeds.PandasData]:
+        """
+        取出数据源，池中没有的一次性加载并构建
+
+        Args:
+            loader: loader(missing_codes) 返回 PricePanel 或日线 DataFrame
+            stock_codes: 股票代码列表
+            start_date: 开始日期
+            end_date: 结束日期
+            version: 日线数据版本号，None 表示不复用
+            feed_class: 数据源类
+
+        Returns:
+            {stock_code: data_feed}，按 stock_codes 顺序，没有数据的股票不出现
+        """
+        if self.capacity <= 0:
+            version = None
+
+        feeds = {}
+        if version is not None:
+            with self._lock:
+                if version != self._version:
+                    # 日线数据已更新，池中的数据源全部过期
+                    self._feeds.clear()
+                    self._version = version
+                for code in stock_codes:
+                    feed = self._feeds.pop(self._key(version, code, start_date, end_date, feed_class), None)
+                    if feed is not None:
+                        feeds[code] = feed
+
+        missing = [code for code in stock_codes if code not in feeds]
+        if missing:
+            frames = split_feed_frames(loader(missing), start_date, end_date)
+            for code in missing:
+                frame = frames.get(code)
+                if frame is None:
+                    continue
+                feed = feed_class(dataname=frame)
+                feed._pool_key = self._key(version, code, start_date, end_date, feed_class)
+                feeds[code] = feed
+
+        return {code: feeds[code] for code in stock_codes if code in feeds}
+
+    def checkin(self, feeds: Dict[str, bt.feeds.PandasData]):
+        """运行结束后归还数据源（运行失败时不归还，下次重新构建）"""
+        with self._lock:
+            for feed in feeds.values():
+                key = getattr(feed, '_pool_key', None)
+                if key is None or key[0] is None or key[0] != self._version:
+                    continue
+                # 解除对上一次 Cerebro 的引用，下次 adddata 时会重新设置
+                feed._env = None
+                self._feeds[key] = feed
+                self._feeds.move_to_end(key)
+            while len(self._feeds) > self.capacity:
+                self._feeds.popitem(last=False)
+
+    @staticmethod
+    def _key(version, code, start_date, end_date, feed_class):
+        return (version, code, start_date, end_date, feed_class.__name__)
+
+
+feed_pool = FeedPool()
@@ -0,0 +1,117 @@
+"""
+连续涨停策略的单股回测执行器
+
+每只股票的回测互相独立：父进程负责加载行情并切成 NumPy 数组，
+子进程只收到自己那只股票的数组，重建 DataFrame 后运行 Cerebro，返回交易记录与期初 / 期末资产。
+结果按股票的提交顺序返回，串行与并行模式的汇总结果完全一致。
+
+本模块不依赖 Django，子进程无需初始化 Django 或数据库连接。
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, Tuple
+import logging
+import multiprocessing
+
+import backtrader as bt
+import numpy as np
+import pandas as pd
+
+from .data_feeds import LimitBreakDataFeed
+from .strategies_limit_break import LimitBreakStrategy
+
+logger = logging.getLogger(__name__)
+
+# 数组字典中存放日期索引的键（与日线 DataFrame 的索引名一致）
+INDEX_COLUMN = 'trade_date'
+
+# 并行模式下，已提交但未取回结果的股票数上限（按进程数的倍数），限制父进程中积压的数组
+MAX_PENDING_PER_WORKER = 4
+
+
+def frame_to_arrays(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """把单只股票的日线 DataFrame 拆成 {列名: 数组}，日期索引存为 INDEX_COLUMN"""
+    arrays = {column: df[column].to_numpy() for column in df.columns}
+    arrays[INDEX_COLUMN] = df.index.to_numpy()
+    return arrays
+
+
+def arrays_to_frame(arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """frame_to_arrays 的逆操作"""
+    columns = {column: values for column, values in arrays.items() if column != INDEX_COLUMN}
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(arrays[INDEX_COLUMN], name=INDEX_COLUMN))
+
+
+def run_stock(stock_id: str, arrays: Dict[str, np.ndarray], params: Dict) -> Tuple[str, list, float, float]:
+    """
+    运行单只股票的回测
+
+    Args:
+        stock_id: 股票代码
+        arrays: frame_to_arrays 的结果（或同样格式的数组字典）
+        params: initial_capital, commission 及 LimitBreakStrategy 的参数
+
+    Returns:
+        (stock_id, trades_record, 期初资产, 期末资产)
+    """
+    cerebro = bt.Cerebro()
+    cerebro.broker.setcash(params['initial_capital'])
+    cerebro.broker.setcommission(commission=params['commission'])
+
+    cerebro.adddata(LimitBreakDataFeed(dataname=arrays_to_frame(arrays)))
+    cerebro.addstrategy(
+        LimitBreakStrategy,
+        profit_target=params['profit_target'],
+        stop_loss=params['stop_loss'],
+        max_hold_days=params['max_hold_days'],
+        lookback_days=params['lookback_days'],
+        max_wait_days=params['max_wait_days'],
+        position_pct=params['position_pct'],
+        debug_mode=False
+    )
+
+    cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
+    cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
+    cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
+
+    initial_value = cerebro.broker.getvalue()
+    strategy_instance = cerebro.run()[0]
+    final_value = cerebro.broker.getvalue()
+    return stock_id, strategy_instance.trades_record, initial_value, final_value
+
+
+def run_stocks(
+    tasks: Iterable[Tuple[str, Dict[str, np.ndarray]]],
+    params: Dict,
+    workers: int = 1
+) -> Iterator[Tuple[str, list, float, float]]:
+    """
+    依次（workers=1）或用进程池并行运行多只股票的回测
+
+    Args:
+        tasks: (stock_id, arrays) 的可迭代对象，可以是边加载边产出的生成器
+        params: 见 run_stock
+        workers: 进程数
+
+    Yields:
+        run_stock 的结果，顺序与 tasks 一致
+    """
+    if workers > 1 and multiprocessing.current_process().daemon:
+        # 守护进程（如 multiprocessing 池中的 worker）不能再创建子进程
+        logger.warning("当前进程为守护进程，无法创建进程池，改为串行回测")
+        workers = 1
+
+    if workers <= 1:
+        for stock_id, arrays in tasks:
+            yield run_stock(stock_id, arrays, params)
+        return
+
+    max_pending = workers * MAX_PENDING_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for stock_id, arrays in tasks:
+            pending.append(executor.submit(run_stock, stock_id, arrays, params))
+            # 按提交顺序取回结果，同时让加载与计算重叠
+            while len(pending) >= max_pending:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
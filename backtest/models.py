@@ -23,6 +23,10 @@ class PortfolioBacktest(models.Model):
     losing_trades = models.IntegerField(default=0, verbose_name="亏损次数")
     win_rate = models.DecimalField(max_digits=5, decimal_places=4, null=True, blank=True, verbose_name="胜率")
 
+    # 结果缓存：规范化请求参数 + 数据版本的哈希，相同请求直接复用已有结果
+    request_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True, verbose_name="请求哈希")
+    data_version = models.CharField(max_length=100, null=True, blank=True, verbose_name="数据版本")
+
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
 
     class Meta:
@@ -103,3 +107,91 @@ class TradeLog(models.Model):
     def __str__(self):
         return f"Trade {self.stock_code}: Buy at {self.buy_price}, Sell at {self.sell_price}"
 
+
+
+class ParameterSweep(models.Model):
+    """参数扫描（网格搜索）回测
+
+    一次扫描只保存每个参数组合的汇总指标（紧凑的结果矩阵），不为每个组合创建 PortfolioBacktest。
+    results 格式：{'params': [参数名...], 'metrics': [指标名...], 'rows': [[参数值..., 指标值...], ...]}
+    """
+    STATUS_CHOICES = [
+        ('PENDING', '等待中'),
+        ('RUNNING', '运行中'),
+        ('SUCCESS', '已完成'),
+        ('FAILURE', '失败'),
+    ]
+
+    strategy_name = models.CharField(max_length=100, verbose_name="策略名称", db_index=True)
+    strategy_type = models.CharField(max_length=50, default='龙回头', verbose_name="策略类型")
+    start_date = models.DateField(verbose_name="开始日期")
+    end_date = models.DateField(verbose_name="结束日期")
+    initial_capital = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="初始资金")
+
+    param_grid = models.JSONField(verbose_name="参数网格", help_text="{参数名: [取值...]}")
+    options = models.JSONField(default=dict, blank=True, verbose_name="固定参数", help_text="佣金率、数据源、进程数等")
+    total_combinations = models.IntegerField(default=0, verbose_name="参数组合数")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING', verbose_name="状态")
+    message = models.TextField(null=True, blank=True, verbose_name="状态信息")
+    task_id = models.CharField(max_length=255, null=True, blank=True, verbose_name="任务ID")
+    results = models.JSONField(null=True, blank=True, verbose_name="结果矩阵")
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="完成时间")
+
+    class Meta:
+        verbose_name = "参数扫描"
+        verbose_name_plural = "参数扫描"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.strategy_name} 参数扫描 ({self.total_combinations} 组) - {self.get_status_display()}"
+
+
+class WalkForwardRun(models.Model):
+    """滚动样本内 / 样本外（walk-forward）回测
+
+    windows 为各窗口的日期、样本内选出的最优参数及样本内外指标；
+    equity_curve 为拼接后的样本外资产曲线 [[日期, 资产], ...]。
+    """
+    STATUS_CHOICES = ParameterSweep.STATUS_CHOICES
+
+    OBJECTIVE_CHOICES = [
+        ('total_return', '总收益率'),
+        ('max_drawdown', '最大回撤'),
+        ('win_rate', '胜率'),
+    ]
+
+    strategy_name = models.CharField(max_length=100, verbose_name="策略名称", db_index=True)
+    strategy_type = models.CharField(max_length=50, default='龙回头', verbose_name="策略类型")
+    start_date = models.DateField(verbose_name="开始日期")
+    end_date = models.DateField(verbose_name="结束日期")
+    initial_capital = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="初始资金")
+
+    param_grid = models.JSONField(verbose_name="参数网格", help_text="{参数名: [取值...]}")
+    in_sample_days = models.IntegerField(verbose_name="样本内交易日数")
+    out_of_sample_days = models.IntegerField(verbose_name="样本外交易日数")
+    objective = models.CharField(max_length=20, choices=OBJECTIVE_CHOICES, default='total_return', verbose_name="优化目标")
+    options = models.JSONField(default=dict, blank=True, verbose_name="固定参数", help_text="数据库别名、进程数等")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING', verbose_name="状态")
+    message = models.TextField(null=True, blank=True, verbose_name="状态信息")
+    task_id = models.CharField(max_length=255, null=True, blank=True, verbose_name="任务ID")
+
+    windows = models.JSONField(null=True, blank=True, verbose_name="窗口结果")
+    equity_curve = models.JSONField(null=True, blank=True, verbose_name="样本外资产曲线")
+    final_capital = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True, verbose_name="最终资金")
+    total_return = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True, verbose_name="总收益率")
+    max_drawdown = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True, verbose_name="最大回撤")
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="完成时间")
+
+    class Meta:
+        verbose_name = "滚动回测"
+        verbose_name_plural = "滚动回测"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.strategy_name} 滚动回测 ({self.start_date} to {self.end_date}) - {self.get_status_display()}"
@@ -1,5 +1,8 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import PortfolioBacktest, TradeLog
+from .models import ParameterSweep, PortfolioBacktest, TradeLog, WalkForwardRun
+from .services.parameter_sweep_service import SWEEP_PARAMS, build_grid
+from .services.walk_forward_service import WALK_FORWARD_STRATEGIES
 
 class PortfolioBacktestSerializer(serializers.ModelSerializer):
     """组合回测结果序列化器"""
@@ -19,6 +22,11 @@ class BacktestParamsSerializer(serializers.Serializer):
     capital_per_stock_ratio = serializers.FloatField(default=0.1, min_value=0.01, max_value=1.0, help_text="单只股票资金占比")
     # 回测引擎选择
     use_backtrader = serializers.BooleanField(default=False, help_text="是否使用Backtrader引擎")
+    engine = serializers.ChoiceField(
+        choices=['custom', 'backtrader', 'vector'],
+        required=False,
+        help_text="回测引擎：custom(逐日循环) / backtrader / vector(向量化)，未指定时按 use_backtrader 选择"
+    )
     commission = serializers.FloatField(default=0.0003, min_value=0.0, max_value=0.1, help_text="佣金率")
     # 策略参数
     profit_target = serializers.FloatField(default=0.10, min_value=0.01, max_value=10.0, help_text="止盈目标 (0.10 = 10%)")
@@ -29,6 +37,18 @@ class BacktestParamsSerializer(serializers.Serializer):
         default='tushare',
         help_text="数据源：tushare(前复权) 或 oracle"
     )
+    workers = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        max_value=settings.BACKTEST_MAX_WORKERS,
+        help_text="连续涨停策略回测的并行进程数（1 为串行，0 为 CPU 核数，不超过服务端上限），默认取服务端配置"
+    )
+
+    def validate(self, data):
+        if 'engine' not in data:
+            data['engine'] = 'backtrader' if data.get('use_backtrader') else 'custom'
+        data['use_backtrader'] = data['engine'] == 'backtrader'
+        return data
 
 class BatchFiltersSerializer(serializers.Serializer):
     """批处理回测的过滤条件"""
@@ -56,3 +76,91 @@ class TradeLogSerializer(serializers.ModelSerializer):
         model = TradeLog
         fields = '__all__'
 
+
+
+class ParameterSweepRequestSerializer(serializers.Serializer):
+    """参数扫描请求体验证器"""
+    strategy_name = serializers.CharField(max_length=100, help_text="策略名称，用于标识本次扫描")
+    strategy_type = serializers.ChoiceField(choices=list(SWEEP_PARAMS), default='龙回头', help_text="策略类型（龙回头/连续涨停）")
+    start_date = serializers.DateField(help_text="回测起始日期 (YYYY-MM-DD)")
+    end_date = serializers.DateField(help_text="回测结束日期 (YYYY-MM-DD)")
+    total_capital = serializers.FloatField(default=1000000.0, min_value=1.0, help_text="初始总资金")
+    param_grid = serializers.DictField(
+        help_text="参数网格：{参数名: [取值...] 或 {start, stop, step}}，未列出的参数取默认值。"
+                  "龙回头可扫描 capital_per_stock_ratio、hold_timeout_days；"
+                  "连续涨停可扫描 profit_target、stop_loss、max_hold_days、capital_per_stock_ratio"
+    )
+    commission = serializers.FloatField(default=0.0003, min_value=0.0, max_value=0.1, help_text="佣金率（连续涨停）")
+    data_source = serializers.ChoiceField(
+        choices=['tushare', 'oracle'],
+        default='tushare',
+        help_text="数据源（连续涨停）：tushare(前复权) 或 oracle"
+    )
+    db_alias = serializers.CharField(default='default')
+    workers = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        max_value=settings.BACKTEST_MAX_WORKERS,
+        help_text="并行进程数（1 为串行，0 为 CPU 核数，不超过服务端上限），默认取服务端配置"
+    )
+
+    def validate(self, data):
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError("结束日期不能早于开始日期")
+        try:
+            data['param_grid'] = build_grid(data['strategy_type'], data['param_grid'])
+        except ValueError as e:
+            raise serializers.ValidationError({'param_grid': str(e)})
+        return data
+
+
+class ParameterSweepSerializer(serializers.ModelSerializer):
+    """参数扫描记录序列化器（不含结果矩阵）"""
+
+    class Meta:
+        model = ParameterSweep
+        exclude = ['results']
+
+
+class WalkForwardRequestSerializer(serializers.Serializer):
+    """滚动回测请求体验证器"""
+    strategy_name = serializers.CharField(max_length=100, help_text="策略名称，用于标识本次回测")
+    strategy_type = serializers.ChoiceField(choices=list(WALK_FORWARD_STRATEGIES), default='龙回头', help_text="策略类型（目前仅支持龙回头）")
+    start_date = serializers.DateField(help_text="回测起始日期 (YYYY-MM-DD)")
+    end_date = serializers.DateField(help_text="回测结束日期 (YYYY-MM-DD)")
+    total_capital = serializers.FloatField(default=1000000.0, min_value=1.0, help_text="初始总资金")
+    param_grid = serializers.DictField(
+        help_text="样本内扫描的参数网格：{参数名: [取值...] 或 {start, stop, step}}，"
+                  "可扫描 capital_per_stock_ratio、hold_timeout_days"
+    )
+    in_sample_days = serializers.IntegerField(default=120, min_value=5, help_text="样本内交易日数")
+    out_of_sample_days = serializers.IntegerField(default=20, min_value=1, help_text="样本外交易日数（即每次滚动的步长）")
+    objective = serializers.ChoiceField(
+        choices=WalkForwardRun.OBJECTIVE_CHOICES,
+        default='total_return',
+        help_text="样本内优化目标：total_return / max_drawdown / win_rate，均取最大值"
+    )
+    db_alias = serializers.CharField(default='default')
+    workers = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        max_value=settings.BACKTEST_MAX_WORKERS,
+        help_text="并行进程数（1 为串行，0 为 CPU 核数，不超过服务端上限），默认取服务端配置"
+    )
+
+    def validate(self, data):
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError("结束日期不能早于开始日期")
+        try:
+            data['param_grid'] = build_grid(data['strategy_type'], data['param_grid'])
+        except ValueError as e:
+            raise serializers.ValidationError({'param_grid': str(e)})
+        return data
+
+
+class WalkForwardRunSerializer(serializers.ModelSerializer):
+    """滚动回测记录序列化器"""
+
+    class Meta:
+        model = WalkForwardRun
+        fields = '__all__'
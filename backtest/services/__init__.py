@@ -2,5 +2,8 @@
 Backtest应用服务层
 """
 from .backtest_service import BacktestService
+from .vector_backtest_service import VectorBacktestService
+from .parameter_sweep_service import ParameterSweepService
+from .walk_forward_service import WalkForwardService
 
-__all__ = ['BacktestService']
+__all__ = ['BacktestService', 'VectorBacktestService', 'ParameterSweepService', 'WalkForwardService']
@@ -259,13 +259,14 @@ class BacktestService:
         
         # 扩展结束日期以包含持仓超时期间的数据
         extended_end_date = end_date + timedelta(days=hold_timeout_days + 10)
-        price_data = self.strategy_service.get_price_data(
+        price_panel = self.strategy_service.get_price_panel(
             stock_codes=stock_codes,
             start_date=start_date,
-            end_date=extended_end_date
+            end_date=extended_end_date,
+            fields=('high', 'low', 'close')
         )
         
-        if not price_data:
+        if price_panel.is_empty:
             logger.error("无法获取价格数据")
             return {
                 'status': 'FAILURE',
@@ -292,7 +293,7 @@ class BacktestService:
         # 4. 回测循环
         logger.info("=" * 50)
         logger.info("【阶段4】执行回测循环...")
-        trading_days = sorted(price_data.keys())
+        trading_days = price_panel.dates
         logger.info(f"交易日总数: {len(trading_days)}")
         
         for idx, trade_date in enumerate(trading_days, 1):
@@ -302,7 +303,8 @@ class BacktestService:
             if idx % 50 == 0:
                 logger.info(f"处理进度: {idx}/{len(trading_days)}")
             
-            current_prices = price_data.get(trade_date, {})
+            # 当日行情视图：current_prices.get(stock_code, {}) 与旧嵌套字典用法一致
+            current_prices = price_panel.day_prices(idx - 1)
             
             # a. 检查卖出条件
             for stock_code in list(portfolio.positions.keys()):
@@ -370,10 +372,40 @@ class BacktestService:
             # c. 记录每日资产
             portfolio.record_daily_value(trade_date, current_prices)
         
+        return self._save_results(
+            strategy_name=strategy_name,
+            start_date=start_date,
+            end_date=end_date,
+            initial_capital=initial_capital,
+            capital_per_stock_ratio=capital_per_stock_ratio,
+            history=portfolio.history,
+            trade_logs=trade_logs
+        )
+    
+    def _save_results(
+        self,
+        strategy_name: str,
+        start_date: date,
+        end_date: date,
+        initial_capital: Decimal,
+        capital_per_stock_ratio: Decimal,
+        history: List[Dict],
+        trade_logs: List[Dict]
+    ) -> Dict:
+        """
+        计算回测指标并保存结果与交易日志
+        
+        Args:
+            history: 每日资产 [{'date', 'value'}]
+            trade_logs: 已平仓交易记录
+        
+        Returns:
+            回测结果字典
+        """
         # 5. 计算最终指标
         logger.info("=" * 50)
         logger.info("【阶段5】计算回测指标...")
-        metrics = self._calculate_metrics(portfolio.history, initial_capital)
+        metrics = self._calculate_metrics(history, initial_capital)
         
         # 6. 统计交易
         winning_trades = sum(1 for log in trade_logs if log['profit'] > 0)
@@ -3,22 +3,37 @@
 """
 import backtrader as bt
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import date, timedelta
 from decimal import Decimal
 import logging
+import os
 
+from django.conf import settings
+
+from basic.services.data_version import BARS, get_version
+from basic.services.price_panel import PricePanel
 from basic.services.strategy_service import StrategyService
 from ..models import PortfolioBacktest, TradeLog
 from ..strategies_backtrader import DragonTurnBacktraderStrategy, PandasData
-from ..strategies_limit_break import LimitBreakStrategy
-from ..data_feeds import LimitBreakDataFeed
+from ..data_feeds import FEED_COLUMNS, feed_pool, split_feed_frames
+from ..limit_break_runner import frame_to_arrays, run_stocks
 from .oracle_data_service import OracleDataService
 from .tushare_data_service import TushareDataService
 
 logger = logging.getLogger(__name__)
 
 
+def resolve_workers(workers: Optional[int]) -> int:
+    """回测进程数：未指定时取 settings.BACKTEST_WORKERS，不大于 0 时使用全部 CPU 核，且不超过 settings.BACKTEST_MAX_WORKERS"""
+    cpu_count = os.cpu_count() or 1
+    if workers is None:
+        workers = getattr(settings, 'BACKTEST_WORKERS', 1)
+    if workers <= 0:
+        workers = cpu_count
+    return max(1, min(workers, getattr(settings, 'BACKTEST_MAX_WORKERS', cpu_count)))
+
+
 
 class BacktraderBacktestService:
     """基于Backtrader的回测服务"""
@@ -82,13 +97,9 @@ class BacktraderBacktestService:
         logger.info("=" * 50)
         logger.info("【阶段2】加载价格数据...")
         extended_end_date = end_date + timedelta(days=hold_timeout_days + 10)
-        price_data = self.strategy_service.get_price_data(
-            stock_codes=stock_codes,
-            start_date=start_date,
-            end_date=extended_end_date
-        )
+        data_feeds = self._prepare_data_feeds(stock_codes, start_date, extended_end_date)
         
-        if not price_data:
+        if not data_feeds:
             logger.error("无法获取价格数据")
             return {
                 'status': 'FAILURE',
@@ -110,8 +121,6 @@ class BacktraderBacktestService:
         
         # 添加数据源
         logger.info("添加数据源...")
-        data_feeds = self._prepare_data_feeds(price_data, stock_codes, start_date, extended_end_date)
-        
         for stock_code, data_feed in data_feeds.items():
             cerebro.adddata(data_feed, name=stock_code)
         
@@ -155,6 +164,8 @@ class BacktraderBacktestService:
         
         results = cerebro.run()
         strategy_instance = results[0]
+        # 数据源可在下一次回测中复用（Cerebro 运行前会重置数据源）
+        feed_pool.checkin(data_feeds)
         
         final_value = cerebro.broker.getvalue()
         logger.info(f"最终资产: {final_value:,.2f}")
@@ -234,60 +245,38 @@ class BacktraderBacktestService:
     
     def _prepare_data_feeds(
         self,
-        price_data: Dict,
         stock_codes: List[str],
         start_date: date,
-        end_date: date
+        end_date: date,
+        prices: Optional[Union[PricePanel, pd.DataFrame]] = None
     ) -> Dict[str, bt.feeds.PandasData]:
         """
         准备Backtrader数据源
         
         Args:
-            price_data: 价格数据字典 {date: {stock_code: {price_info}}}
             stock_codes: 股票代码列表
             start_date: 开始日期
             end_date: 结束日期
+            prices: 已加载的行情面板或日线 DataFrame；不传时从数据源池取出，
+                    池中没有的股票一次加载，运行结束后需调用 feed_pool.checkin 归还
             
         Returns:
             {stock_code: data_feed}
         """
-        data_feeds = {}
-        
-        for stock_code in stock_codes:
-            # 提取该股票的所有价格数据
-            stock_prices = []
-            
-            for trade_date in sorted(price_data.keys()):
-                if trade_date < start_date or trade_date > end_date:
-                    continue
-                
-                day_prices = price_data.get(trade_date, {})
-                stock_price = day_prices.get(stock_code)
-                
-                if stock_price:
-                    stock_prices.append({
-                        'datetime': trade_date,
-                        'open': stock_price.get('close', 0),  # 如果没有开盘价，用收盘价
-                        'high': stock_price.get('high', 0),
-                        'low': stock_price.get('low', 0),
-                        'close': stock_price.get('close', 0),
-                        'volume': 0,  # 可选
-                    })
-            
-            if not stock_prices:
-                continue
-            
-            # 转换为DataFrame
-            df = pd.DataFrame(stock_prices)
-            df['datetime'] = pd.to_datetime(df['datetime'])
-            df.set_index('datetime', inplace=True)
-            df = df.sort_index()
-            
-            # 创建Backtrader数据源
-            data_feed = PandasData(dataname=df)
-            data_feeds[stock_code] = data_feed
+        if prices is not None:
+            frames = split_feed_frames(prices, start_date, end_date)
+            return {
+                stock_code: PandasData(dataname=frames[stock_code])
+                for stock_code in stock_codes
+                if stock_code in frames
+            }
         
-        return data_feeds
+        return feed_pool.checkout(
+            lambda codes: self.strategy_service.get_price_panel(codes, start_date, end_date, fields=FEED_COLUMNS),
+            stock_codes, start_date, end_date,
+            version=get_version(BARS),
+            feed_class=PandasData
+        )
     
     def run_limit_break_backtest(
         self,
@@ -304,7 +293,8 @@ class BacktraderBacktestService:
         position_pct: float = 0.02,
         commission: float = 0.001,
         db_alias: str = 'default',
-        data_source: str = 'tushare'  # 新增参数：'tushare' 或 'oracle'
+        data_source: str = 'tushare',  # 新增参数：'tushare' 或 'oracle'
+        workers: Optional[int] = None
     ) -> Dict:
         """
         运行连续涨停策略回测
@@ -323,6 +313,7 @@ class BacktraderBacktestService:
             commission: 佣金率，默认0.1%
             db_alias: 数据库别名
             data_source: 数据源，'tushare'(默认) 或 'oracle'
+            workers: 并行回测的进程数，默认取 settings.BACKTEST_WORKERS，1 为串行，0 为 CPU 核数
             
         Returns:
             回测结果字典
@@ -376,60 +367,65 @@ class BacktraderBacktestService:
         success_count = 0
         failed_count = 0
         
-        for idx, stock_info in enumerate(stocks, 1):
-            stock_id = stock_info['stock_id']
-            stock_name = stock_info.get('stock_name', stock_id)
-            anchor_date = stock_info.get('date', start_date)  # ✅ 使用股票策略日期作为锚点
-            
-            logger.info(f"[{idx}/{len(stocks)}] 回测 {stock_name} ({stock_id}), 锚点日期: {anchor_date}")
-            
-            # ✅ 获取日线数据 - 使用股票策略日期作为锚点
-            df_data = data_service.get_stock_daily_data(
-                stock_id=stock_id,
-                anchor_date=anchor_date,  # 使用股票策略日期
+        workers = resolve_workers(workers)
+        logger.info(f"回测进程数: {workers}")
+        params = {
+            'initial_capital': float(initial_capital),
+            'commission': commission,
+            'profit_target': profit_target,
+            'stop_loss': stop_loss,
+            'max_hold_days': max_hold_days,
+            'lookback_days': lookback_days,
+            'max_wait_days': max_wait_days,
+            'position_pct': position_pct,
+        }
+        stock_names = {}
+        
+        # Oracle 数据源：全部 (股票, 锚点) 窗口一次批量加载
+        windows = None
+        if data_source != 'tushare':
+            windows = oracle_service.get_stock_daily_windows(
+                [(stock_info['stock_id'], stock_info.get('date', start_date)) for stock_info in stocks],
                 days_before=lookback_days + 10,
                 days_after=max_hold_days + 10
             )
-            
-            if df_data is None or df_data.empty:
-                logger.warning(f"{stock_id} 无数据，跳过")
-                failed_count += 1
-                continue
-            
-            # 创建 Cerebro
-            cerebro = bt.Cerebro()
-            cerebro.broker.setcash(float(initial_capital))
-            cerebro.broker.setcommission(commission=commission)
-            
-            # 添加数据源
-            data_feed = LimitBreakDataFeed(dataname=df_data)
-            cerebro.adddata(data_feed)
-            
-            # 添加策略
-            cerebro.addstrategy(
-                LimitBreakStrategy,
-                profit_target=profit_target,
-                stop_loss=stop_loss,  # ✅ 传递止损参数
-                max_hold_days=max_hold_days,
-                lookback_days=lookback_days,
-                max_wait_days=max_wait_days,
-                position_pct=position_pct,
-                debug_mode=False
-            )
-            
-            # 添加分析器
-            cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
-            cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-            cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='trades')
-            
-            # 运行
-            initial_value = cerebro.broker.getvalue()
-            results = cerebro.run()
-            strategy_instance = results[0]
-            final_value = cerebro.broker.getvalue()
+        
+        def load_tasks():
+            """逐只取出日线数组（在本进程中执行，回测子进程不访问数据源）"""
+            nonlocal failed_count
+            for idx, stock_info in enumerate(stocks, 1):
+                stock_id = stock_info['stock_id']
+                stock_name = stock_info.get('stock_name', stock_id)
+                anchor_date = stock_info.get('date', start_date)  # ✅ 使用股票策略日期作为锚点
+                
+                logger.info(f"[{idx}/{len(stocks)}] 回测 {stock_name} ({stock_id}), 锚点日期: {anchor_date}")
+                
+                if windows is not None:
+                    arrays = windows[idx - 1]
+                else:
+                    # ✅ 获取日线数据 - 使用股票策略日期作为锚点
+                    df_data = data_service.get_stock_daily_data(
+                        stock_id=stock_id,
+                        anchor_date=anchor_date,  # 使用股票策略日期
+                        days_before=lookback_days + 10,
+                        days_after=max_hold_days + 10
+                    )
+                    arrays = frame_to_arrays(df_data) if df_data is not None and not df_data.empty else None
+                
+                if arrays is None:
+                    logger.warning(f"{stock_id} 无数据，跳过")
+                    failed_count += 1
+                    continue
+                
+                stock_names[stock_id] = stock_name
+                yield stock_id, arrays
+        
+        # 每只股票一个独立的 Cerebro，结果按股票顺序返回
+        for stock_id, trades_record, initial_value, final_value in run_stocks(load_tasks(), params, workers):
+            stock_name = stock_names[stock_id]
             
             # 提取交易记录
-            for trade_record in strategy_instance.trades_record:
+            for trade_record in trades_record:
                 trade_log = {
                     'stock_code': stock_id,
                     'buy_date': trade_record['买入日期'],
@@ -452,9 +448,9 @@ class BacktraderBacktestService:
             total_initial += Decimal(str(initial_value))
             total_final += Decimal(str(final_value))
             
-            if len(strategy_instance.trades_record) > 0:
+            if len(trades_record) > 0:
                 success_count += 1
-                logger.info(f"✓ {stock_name}: {len(strategy_instance.trades_record)}笔交易")
+                logger.info(f"✓ {stock_name}: {len(trades_record)}笔交易")
             else:
                 logger.info(f"- {stock_name}: 无交易")
         
@@ -2,12 +2,15 @@
 Oracle 数据服务
 使用 Django ORM 从 Oracle 数据库查询股票数据
 """
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
+import time
 
 from basic.models import Code, StockDailyData, PolicyDetails
+from basic.services.market_data import ORACLE_IN_LIMIT
 
 logger = logging.getLogger(__name__)
 
@@ -134,17 +137,9 @@ class OracleDataService:
             - up_limit (计算得出的涨停标记：1=涨停，0=非涨停)
         """
         # 日期处理
-        if isinstance(anchor_date, datetime):
-            anchor_date = anchor_date.date()
-        elif isinstance(anchor_date, str):
-            try:
-                anchor_date = datetime.strptime(anchor_date, '%Y-%m-%d').date()
-            except ValueError:
-                try:
-                    anchor_date = datetime.strptime(anchor_date, '%Y-%m-%d %H:%M:%S').date()
-                except ValueError:
-                    logger.error(f'日期格式错误: {anchor_date}')
-                    return None
+        anchor_date = self._to_date(anchor_date)
+        if anchor_date is None:
+            return None
         
         # 计算时间范围
         start_date = anchor_date - timedelta(days=days_before)
@@ -195,6 +190,154 @@ class OracleDataService:
             traceback.print_exc()
             return None
     
+    @staticmethod
+    def _to_date(value) -> Optional[datetime.date]:
+        """锚点日期统一为 date，支持 datetime 与 'YYYY-MM-DD[ HH:MM:SS]' 字符串，无法解析时返回 None"""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, str):
+            for fmt in ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S'):
+                try:
+                    return datetime.strptime(value, fmt).date()
+                except ValueError:
+                    continue
+            logger.error(f'日期格式错误: {value}')
+            return None
+        return value
+    
+    @staticmethod
+    def _group_ranges(ranges: Dict[str, Tuple], max_span: timedelta) -> List[Tuple[List[str], datetime.date, datetime.date]]:
+        """
+        把 {股票: (开始日期, 结束日期)} 按开始日期排序后分批
+        
+        每批最多 1000 只股票（Oracle IN 列表上限），且合并后的日期范围不超过 max_span（单个范围本身更长时除外）。
+        
+        Returns:
+            [(股票代码列表, 开始日期, 结束日期)]
+        """
+        groups = []
+        for stock_id in sorted(ranges, key=lambda code: ranges[code][0]):
+            start_date, end_date = ranges[stock_id]
+            if groups:
+                codes, group_start, group_end = groups[-1]
+                if len(codes) < ORACLE_IN_LIMIT and max(group_end, end_date) - group_start <= max_span:
+                    codes.append(stock_id)
+                    groups[-1] = (codes, group_start, max(group_end, end_date))
+                    continue
+            groups.append(([stock_id], start_date, end_date))
+        return groups
+    
+    def get_stock_daily_windows(
+        self,
+        requests: List[Tuple[str, datetime.date]],
+        days_before: int = 60,
+        days_after: int = 60
+    ) -> List[Optional[Dict[str, np.ndarray]]]:
+        """
+        批量获取多只股票锚点窗口内的日线数据（get_stock_daily_data 的批量版本）
+        
+        先算出全部 (股票, 锚点) 的日期窗口，股票按窗口起点排序后分批，每批一条 IN + 日期范围查询
+        （见 _group_ranges，同一批股票的日期相近，多取的行很少）；查询结果合并为按 (股票, 日期) 排序的一组数组，
+        每个窗口是其中连续的一段切片（视图，不复制），只有 up_limit 按窗口重新计算。
+        
+        Args:
+            requests: [(股票代码, 锚点日期)]，同一股票可以出现多次
+            days_before: 向前取多少天
+            days_after: 向后取多少天
+            
+        Returns:
+            与 requests 一一对应的数组字典，键为 trade_date、open、high、low、close、volume、up_limit，
+            取值与 get_stock_daily_data 返回的 DataFrame 相同；无数据时为 None
+        """
+        started = time.perf_counter()
+        today = datetime.now().date()
+        
+        windows = []
+        ranges = {}  # 股票 -> (最早开始日期, 最晚结束日期)
+        for stock_id, anchor_date in requests:
+            anchor_date = self._to_date(anchor_date)
+            if anchor_date is None:
+                windows.append(None)
+                continue
+            start_date = anchor_date - timedelta(days=days_before)
+            end_date = min(anchor_date + timedelta(days=days_after), today)
+            windows.append((stock_id, start_date, end_date))
+            if stock_id in ranges:
+                low, high = ranges[stock_id]
+                ranges[stock_id] = (min(low, start_date), max(high, end_date))
+            else:
+                ranges[stock_id] = (start_date, end_date)
+        
+        rows = []
+        groups = self._group_ranges(ranges, max_span=timedelta(days=2 * (days_before + days_after)))
+        for codes, start_date, end_date in groups:
+            rows.extend(
+                StockDailyData.objects.using(self.db_alias).filter(
+                    stock_id__in=codes,
+                    trade_date__gte=start_date,
+                    trade_date__lte=end_date
+                ).values_list(
+                    'stock_id', 'trade_date', 'open', 'high', 'low', 'close', 'volume'
+                ).iterator(chunk_size=5000)
+            )
+        
+        if not rows:
+            logger.warning(f'未找到 {len(ranges)} 只股票的日线数据')
+            return [None] * len(requests)
+        
+        # 合并为按 (股票, 日期) 排序的数组
+        columns = list(zip(*rows))
+        codes = np.array(columns[0], dtype=object).astype(str)
+        days = np.array(columns[1], dtype='datetime64[D]')
+        order = np.lexsort((days, codes))
+        codes, days = codes[order], days[order]
+        trade_dates = days.astype('datetime64[ns]')
+        prices = {
+            field: np.array(columns[offset], dtype=np.float64)[order]
+            for offset, field in enumerate(('open', 'high', 'low', 'close'), start=2)
+        }
+        volume = np.array(columns[6], dtype=np.int64)[order]
+        
+        # 每只股票在数组中的区间
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)]
+        blocks = {codes[lo]: (lo, hi) for lo, hi in zip(starts.tolist(), ends.tolist())}
+        
+        results = []
+        for window in windows:
+            block = blocks.get(window[0]) if window else None
+            if block is None:
+                results.append(None)
+                continue
+            stock_id, start_date, end_date = window
+            lo, hi = block
+            begin = lo + int(np.searchsorted(days[lo:hi], np.datetime64(start_date), 'left'))
+            end = lo + int(np.searchsorted(days[lo:hi], np.datetime64(end_date), 'right'))
+            if begin == end:
+                results.append(None)
+                continue
+            
+            # 涨停标记：(今日收盘 - 昨日收盘) / 昨日收盘 > 0.096，窗口第一天为 0
+            close = prices['close'][begin:end]
+            up_limit = np.zeros(end - begin, dtype=np.int64)
+            up_limit[1:] = (close[1:] - close[:-1]) / close[:-1] > 0.096
+            
+            results.append({
+                'trade_date': trade_dates[begin:end],
+                'open': prices['open'][begin:end],
+                'high': prices['high'][begin:end],
+                'low': prices['low'][begin:end],
+                'close': close,
+                'volume': volume[begin:end],
+                'up_limit': up_limit,
+            })
+        
+        logger.info(
+            f'批量加载日线: {len(requests)} 个窗口，{len(ranges)} 只股票，{len(groups)} 次查询，'
+            f'{len(rows)} 条记录，耗时 {time.perf_counter() - started:.2f}s'
+        )
+        return results
+    
     def get_stock_info(self, stock_id: str) -> Optional[dict]:
         """
         获取股票基本信息
@@ -0,0 +1,441 @@
+"""
+参数扫描（网格搜索）回测服务
+
+信号与行情只加载一次，参数网格中的每个组合在进程池中独立回测，只保存各组合的汇总指标
+（紧凑的结果矩阵），不为每个组合创建 PortfolioBacktest / TradeLog。
+
+- 龙回头：使用向量化引擎，可扫描 capital_per_stock_ratio、hold_timeout_days。
+  止盈止损由信号自身的止盈点 / 止损点决定，不参与扫描。
+  行情按最长持仓期加载一次，每个组合截取到自己的扩展结束日期，结果与单独运行向量化回测一致。
+- 连续涨停：每只股票一个 Cerebro，可扫描 profit_target、stop_loss、max_hold_days、capital_per_stock_ratio。
+  各股票的日线窗口按最长持仓期加载一次，每个组合截取自己的窗口，结果与单独运行 Backtrader 回测一致。
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import accumulate, product
+from typing import Callable, Dict, List, Optional
+import logging
+import math
+import multiprocessing
+import time
+
+import numpy as np
+from django.utils import timezone
+
+from basic.services.strategy_service import StrategyService
+from ..limit_break_runner import INDEX_COLUMN, frame_to_arrays, run_stock
+from ..models import ParameterSweep
+from .backtrader_service import resolve_workers
+from .oracle_data_service import OracleDataService
+from .tushare_data_service import TushareDataService
+from .vector_backtest_service import VectorBacktestService
+
+logger = logging.getLogger(__name__)
+
+# 各策略可扫描的参数及未扫描时的取值（与 BacktestParamsSerializer 的默认值一致）
+SWEEP_PARAMS = {
+    '龙回头': {
+        'capital_per_stock_ratio': 0.1,
+        'hold_timeout_days': 60,
+    },
+    '连续涨停': {
+        'profit_target': 0.10,
+        'stop_loss': 0.05,
+        'max_hold_days': 60,
+        'capital_per_stock_ratio': 0.1,
+    },
+}
+INTEGER_PARAMS = {'hold_timeout_days', 'max_hold_days'}
+
+SWEEP_METRICS = ('total_return', 'max_drawdown', 'win_rate', 'total_trades', 'final_capital')
+
+# 默认排名：收益率、最大回撤（负数，越接近 0 越好）、胜率均从高到低
+DEFAULT_RANKING = ('-total_return', '-max_drawdown', '-win_rate')
+
+MAX_SWEEP_COMBINATIONS = 500
+
+# 连续涨停策略的固定参数（与 run_portfolio_backtest 任务一致）
+LIMIT_BREAK_LOOKBACK_DAYS = 20
+LIMIT_BREAK_MAX_WAIT_DAYS = 100
+
+
+def expand_values(name: str, spec) -> List:
+    """
+    单个参数的取值
+
+    Args:
+        name: 参数名
+        spec: 取值列表、单个取值，或区间 {'start', 'stop', 'step'}（含 stop）
+
+    Raises:
+        ValueError: 取值无效
+    """
+    if isinstance(spec, dict):
+        try:
+            start, stop, step = (float(spec[key]) for key in ('start', 'stop', 'step'))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{name}: 区间需要数值 start、stop、step")
+        if step <= 0 or stop < start:
+            raise ValueError(f"{name}: 区间需要 step > 0 且 stop >= start")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        if count > MAX_SWEEP_COMBINATIONS:
+            raise ValueError(f"{name}: 取值超过 {MAX_SWEEP_COMBINATIONS} 个")
+        values = [round(start + idx * step, 10) for idx in range(count)]
+    elif isinstance(spec, (list, tuple)):
+        values = list(spec)
+    else:
+        values = [spec]
+    if not values:
+        raise ValueError(f"{name}: 至少需要一个取值")
+
+    result = []
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{name}: 取值必须是数字")
+        if name in INTEGER_PARAMS:
+            if value != int(value) or value < 1:
+                raise ValueError(f"{name}: 取值必须是正整数")
+            value = int(value)
+        elif value <= 0:
+            raise ValueError(f"{name}: 取值必须大于 0")
+        else:
+            value = float(value)
+        if value not in result:
+            result.append(value)
+    return result
+
+
+def build_grid(strategy_type: str, param_grid: Dict) -> Dict[str, List]:
+    """
+    补全参数网格：未扫描的参数取默认值
+
+    Returns:
+        {参数名: [取值...]}，参数顺序与 SWEEP_PARAMS 一致
+
+    Raises:
+        ValueError: 策略类型不支持、参数名无效、取值无效或组合数超过上限
+    """
+    if strategy_type not in SWEEP_PARAMS:
+        raise ValueError(f"不支持参数扫描的策略类型: {strategy_type}")
+    defaults = SWEEP_PARAMS[strategy_type]
+    unknown = set(param_grid) - set(defaults)
+    if unknown:
+        raise ValueError(f"{strategy_type}策略不能扫描参数: {', '.join(sorted(unknown))}，可选: {', '.join(defaults)}")
+
+    grid = {name: expand_values(name, param_grid.get(name, default)) for name, default in defaults.items()}
+    total = math.prod(len(values) for values in grid.values())
+    if total > MAX_SWEEP_COMBINATIONS:
+        raise ValueError(f"参数组合数 {total} 超过上限 {MAX_SWEEP_COMBINATIONS}")
+    return grid
+
+
+def grid_combinations(grid: Dict[str, List]) -> List[Dict]:
+    """参数网格的全部组合（笛卡尔积）"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*grid.values())]
+
+
+def summarize(engine: VectorBacktestService, history: List[Dict], profits: List[Decimal], initial_capital: Decimal) -> Dict:
+    """一个参数组合的汇总指标（收益率与回撤的算法同 BacktestService._calculate_metrics）"""
+    if initial_capital <= 0 or not history:
+        return {'total_return': 0.0, 'max_drawdown': 0.0, 'win_rate': 0.0, 'total_trades': 0, 'final_capital': 0.0}
+    metrics = engine._calculate_metrics(history, initial_capital)
+    winning = sum(1 for profit in profits if profit > 0)
+    return {
+        'total_return': round(float(metrics['total_return']), 6),
+        'max_drawdown': round(float(metrics['max_drawdown']), 6),
+        'win_rate': round(winning / len(profits), 6) if profits else 0.0,
+        'total_trades': len(profits),
+        'final_capital': round(float(metrics['final_capital']), 2),
+    }
+
+
+def ranking_key(order_by=DEFAULT_RANKING) -> Callable[[Dict], tuple]:
+    """指标字典的排序键，order_by 中前缀 '-' 的指标从高到低"""
+    def key(metrics: Dict) -> tuple:
+        return tuple(
+            -metrics[name.lstrip('-')] if name.startswith('-') else metrics[name]
+            for name in order_by
+        )
+    return key
+
+
+# 进程池中各组合共用的数据（由 _init_worker 设置，每个子进程只接收一次）
+_shared: Dict = {}
+
+
+def _init_worker(shared: Dict):
+    _shared.clear()
+    _shared.update(shared)
+
+
+def run_dragon_turn(params: Dict, start_date: Optional[date], end_date: date):
+    """
+    龙回头：用共享的信号与行情回测一个参数组合（只使用 [start_date, end_date] 内的信号）
+
+    Returns:
+        (每日资产 [{'date', 'value'}], 已平仓交易记录)
+    """
+    engine = _shared['engine']
+    initial_capital = _shared['initial_capital']
+    hold_timeout_days = params['hold_timeout_days']
+
+    # 与单独回测相同：行情从开始日期截止到 结束日期 + 持仓超时 + 10 天，区间外的信号找不到交易日、不会触发
+    prices = _shared['prices'].truncate(end_date + timedelta(days=hold_timeout_days + 10), start_date)
+    capital_to_invest = initial_capital * Decimal(str(params['capital_per_stock_ratio']))
+    positions = engine._simulate(
+        prices, _shared['signals'], initial_capital, capital_to_invest, hold_timeout_days, end_date
+    )
+    history = engine._equity_curve(prices, positions, initial_capital)
+    trade_logs, _ = engine._build_trade_logs(prices, positions)
+    return history, trade_logs
+
+
+def _evaluate_dragon_turn(params: Dict) -> Dict:
+    """龙回头：用向量化引擎回测一个参数组合"""
+    history, trade_logs = run_dragon_turn(params, None, _shared['end_date'])
+    return summarize(_shared['engine'], history, [log['profit'] for log in trade_logs], _shared['initial_capital'])
+
+
+def _evaluate_limit_break(params: Dict) -> Dict:
+    """连续涨停：逐只股票运行 Cerebro，汇总一个参数组合的结果"""
+    run_params = {
+        'initial_capital': _shared['initial_capital'],
+        'commission': _shared['commission'],
+        'profit_target': params['profit_target'],
+        'stop_loss': params['stop_loss'],
+        'max_hold_days': params['max_hold_days'],
+        'lookback_days': LIMIT_BREAK_LOOKBACK_DAYS,
+        'max_wait_days': LIMIT_BREAK_MAX_WAIT_DAYS,
+        'position_pct': params['capital_per_stock_ratio'],
+    }
+    # 与单独回测相同的窗口长度（Tushare 数据源向后多取 1.5 倍自然日）
+    days_after = timedelta(days=int((params['max_hold_days'] + 10) * _shared['days_after_scale']))
+
+    total_initial = Decimal('0')
+    total_final = Decimal('0')
+    trades = []
+    for stock_id, anchor_date, arrays in _shared['windows']:
+        stop = int(np.searchsorted(arrays[INDEX_COLUMN], np.datetime64(anchor_date + days_after), side='right'))
+        if stop == 0:
+            continue
+        _, records, initial_value, final_value = run_stock(
+            stock_id, {column: values[:stop] for column, values in arrays.items()}, run_params
+        )
+        total_initial += Decimal(str(initial_value))
+        total_final += Decimal(str(final_value))
+        trades.extend((record['卖出日期'], Decimal(str(record['盈亏金额']))) for record in records)
+
+    # 各股票独立回测，没有组合层面的逐日资产，回撤按卖出日期累计的已实现盈亏计算
+    trades.sort(key=lambda trade: trade[0])
+    profits = [profit for _, profit in trades]
+    history = [{'value': value} for value in accumulate([total_initial] + profits)]
+    history.append({'value': total_final})
+    return summarize(_shared['engine'], history, profits, total_initial)
+
+
+@contextmanager
+def worker_pool(shared: Dict, workers: int):
+    """
+    共享数据的进程池（workers=1 时在本进程中执行），产出 run(evaluate, items) -> 结果列表
+
+    共享数据通过进程池初始化函数传给每个子进程一次，evaluate 从 _shared 中读取。
+    """
+    if workers > 1 and multiprocessing.current_process().daemon:
+        # 守护进程（如 multiprocessing 池中的 worker）不能再创建子进程
+        logger.warning("当前进程为守护进程，无法创建进程池，改为串行执行")
+        workers = 1
+
+    if workers <= 1:
+        _init_worker(shared)
+        try:
+            yield lambda evaluate, items: [evaluate(item) for item in items]
+        finally:
+            _shared.clear()
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shared,)) as executor:
+        yield lambda evaluate, items: list(executor.map(evaluate, items))
+
+
+def map_combinations(evaluate: Callable[[Dict], Dict], combos: List[Dict], shared: Dict, workers: int) -> List[Dict]:
+    """
+    逐个（workers=1）或在进程池中回测全部参数组合
+
+    Returns:
+        与 combos 一一对应的指标字典
+    """
+    with worker_pool(shared, min(workers, len(combos))) as run:
+        return run(evaluate, combos)
+
+
+class ParameterSweepService:
+    """参数扫描服务"""
+
+    def __init__(self):
+        self.strategy_service = StrategyService()
+        self.engine = VectorBacktestService()
+
+    def run_sweep(self, sweep: ParameterSweep) -> Dict:
+        """
+        执行参数扫描并把结果矩阵保存到 sweep.results
+
+        Returns:
+            {'status', 'message', 'sweep_id'}
+        """
+        started = time.perf_counter()
+        sweep.status = 'RUNNING'
+        sweep.save(update_fields=['status'])
+
+        try:
+            # 参数顺序以 SWEEP_PARAMS 为准（JSON 字段不保证键的顺序）
+            grid = {name: sweep.param_grid[name] for name in SWEEP_PARAMS[sweep.strategy_type]}
+            names = list(grid)
+            combos = grid_combinations(grid)
+            workers = resolve_workers(sweep.options.get('workers'))
+            logger.info(
+                f"开始参数扫描: {sweep.strategy_name} ({sweep.strategy_type})，"
+                f"{len(combos)} 个参数组合，进程数 {workers}"
+            )
+
+            if sweep.strategy_type == '连续涨停':
+                evaluate, shared = _evaluate_limit_break, self._load_limit_break(sweep, combos)
+            else:
+                evaluate, shared = _evaluate_dragon_turn, self._load_dragon_turn(sweep, combos)
+            load_seconds = time.perf_counter() - started
+
+            if shared is None:
+                sweep.status = 'SUCCESS'
+                sweep.message = '未找到符合条件的信号或行情数据'
+                sweep.results = {'params': names, 'metrics': list(SWEEP_METRICS), 'rows': []}
+            else:
+                metrics = map_combinations(evaluate, combos, shared, workers)
+                sweep.status = 'SUCCESS'
+                sweep.message = (
+                    f'完成 {len(combos)} 个参数组合，数据加载 {load_seconds:.1f}s，'
+                    f'总耗时 {time.perf_counter() - started:.1f}s'
+                )
+                sweep.results = {
+                    'params': names,
+                    'metrics': list(SWEEP_METRICS),
+                    'rows': [
+                        [params[name] for name in names] + [result[metric] for metric in SWEEP_METRICS]
+                        for params, result in zip(combos, metrics)
+                    ],
+                }
+            logger.info(f"参数扫描完成: {sweep.message}")
+        except Exception as e:
+            sweep.status = 'FAILURE'
+            sweep.message = str(e)
+            raise
+        finally:
+            sweep.finished_at = timezone.now()
+            sweep.save(update_fields=['status', 'message', 'results', 'finished_at'])
+
+        return {'status': sweep.status, 'message': sweep.message, 'sweep_id': sweep.id}
+
+    def _load_dragon_turn(self, sweep: ParameterSweep, combos: List[Dict]) -> Optional[Dict]:
+        """加载信号与覆盖最长持仓期的行情面板"""
+        signals = self.strategy_service.get_signals_for_backtest(
+            start_date=sweep.start_date,
+            end_date=sweep.end_date,
+            strategy_type=sweep.strategy_type
+        )
+        if not signals:
+            return None
+
+        longest = max(params['hold_timeout_days'] for params in combos)
+        prices = self.strategy_service.get_price_panel(
+            list(set(s.stock_code for s in signals)),
+            sweep.start_date,
+            sweep.end_date + timedelta(days=longest + 10),
+            fields=('high', 'low', 'close')
+        )
+        if prices.is_empty:
+            return None
+
+        return {
+            'engine': self.engine,
+            'signals': signals,
+            'prices': prices,
+            'end_date': sweep.end_date,
+            'initial_capital': sweep.initial_capital,
+        }
+
+    def _load_limit_break(self, sweep: ParameterSweep, combos: List[Dict]) -> Optional[Dict]:
+        """加载股票列表与覆盖最长持仓期的日线窗口"""
+        options = sweep.options
+        data_source = options.get('data_source', 'tushare')
+        oracle_service = OracleDataService(db_alias=options.get('db_alias', 'default'))
+
+        stocks = oracle_service.get_strategy_stocks_by_date_range(
+            start_date=sweep.start_date,
+            end_date=sweep.end_date
+        )
+        if not stocks:
+            return None
+
+        anchors = [OracleDataService._to_date(stock_info.get('date', sweep.start_date)) for stock_info in stocks]
+        days_before = LIMIT_BREAK_LOOKBACK_DAYS + 10
+        days_after = max(params['max_hold_days'] for params in combos) + 10
+
+        if data_source == 'tushare':
+            data_service = TushareDataService()
+            loaded = []
+            for stock_info, anchor_date in zip(stocks, anchors):
+                df_data = data_service.get_stock_daily_data(
+                    stock_id=stock_info['stock_id'],
+                    anchor_date=anchor_date,
+                    days_before=days_before,
+                    days_after=days_after
+                )
+                loaded.append(frame_to_arrays(df_data) if df_data is not None and not df_data.empty else None)
+        else:
+            loaded = oracle_service.get_stock_daily_windows(
+                [(stock_info['stock_id'], anchor_date) for stock_info, anchor_date in zip(stocks, anchors)],
+                days_before=days_before,
+                days_after=days_after
+            )
+
+        windows = [
+            (stock_info['stock_id'], anchor_date, arrays)
+            for stock_info, anchor_date, arrays in zip(stocks, anchors, loaded)
+            if arrays is not None
+        ]
+        if not windows:
+            return None
+
+        return {
+            'engine': self.engine,
+            'windows': windows,
+            'initial_capital': float(sweep.initial_capital),
+            'commission': options.get('commission', 0.0003),
+            'days_after_scale': 1.5 if data_source == 'tushare' else 1,
+        }
+
+    @staticmethod
+    def rank_results(results: Optional[Dict], order_by=DEFAULT_RANKING, limit: Optional[int] = None) -> List[Dict]:
+        """
+        按指标排名
+
+        Args:
+            results: ParameterSweep.results
+            order_by: 排序指标，前缀 '-' 表示从高到低
+            limit: 最多返回条数
+
+        Returns:
+            [{'rank', 'params': {...}, 指标...}]
+        """
+        if not results or not results.get('rows'):
+            return []
+        names, metrics = results['params'], results['metrics']
+        entries = [
+            {'params': dict(zip(names, row[:len(names)])), **dict(zip(metrics, row[len(names):]))}
+            for row in results['rows']
+        ]
+        entries.sort(key=ranking_key(order_by))
+        if limit:
+            entries = entries[:limit]
+        return [{'rank': rank, **entry} for rank, entry in enumerate(entries, start=1)]
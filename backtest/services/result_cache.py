@@ -0,0 +1,150 @@
+"""
+回测结果缓存与去重
+
+同一回测请求（引擎、策略参数、日期区间与数据版本均相同）的结果是确定的：
+- 请求哈希：对影响结果的参数做规范化（按引擎取相关参数、统一类型）后，连同数据版本计算 SHA-256，
+  与回测结果一起保存在 PortfolioBacktest.request_hash 上；再次收到相同请求时直接返回已有结果；
+- 数据版本：日线数据版本号（BARS）加上区间内策略信号输入列（买点 / 止损 / 止盈）的聚合摘要。
+  回测会回写信号的执行结果并递增 SIGNALS 版本号，因此不能直接使用 SIGNALS 版本号；
+- 单飞：执行中的请求在缓存中登记 (哈希 -> 任务ID)，并发的相同请求复用同一个 Celery 任务。
+
+连续涨停策略使用 Tushare 数据源时行情来自外部接口，没有数据版本可用，不参与缓存与去重；
+缓存不可用时同样退化为每次重新回测。
+"""
+from decimal import Decimal
+from typing import Dict, Optional
+import hashlib
+import json
+import logging
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+
+from basic.models import PolicyDetails
+from basic.services.data_version import BARS, get_version
+from ..models import PortfolioBacktest
+
+logger = logging.getLogger(__name__)
+
+INFLIGHT_KEY = 'backtest_inflight:{}'
+
+# 执行中登记的过期时间（秒）：任务异常退出未能清除登记时，最多阻塞相同请求这么久
+INFLIGHT_TIMEOUT = 2 * 3600
+
+# 各引擎影响回测结果的参数（strategy_name 只是标签，workers 只影响速度，均不参与哈希）
+RESULT_PARAMS = {
+    'custom': ('total_capital', 'capital_per_stock_ratio', 'hold_timeout_days', 'db_alias'),
+    'vector': ('total_capital', 'capital_per_stock_ratio', 'hold_timeout_days', 'db_alias'),
+    'backtrader': ('total_capital', 'capital_per_stock_ratio', 'hold_timeout_days', 'db_alias', 'commission'),
+}
+LIMIT_BREAK_PARAMS = RESULT_PARAMS['backtrader'] + ('profit_target', 'stop_loss', 'data_source')
+
+# 参数未传入时与 run_portfolio_backtest 保持一致的默认值
+PARAM_DEFAULTS = {
+    'db_alias': 'default',
+    'commission': 0.0003,
+    'profit_target': 0.10,
+    'stop_loss': 0.05,
+    'data_source': 'tushare',
+}
+
+
+def resolve_engine(backtest_params: Dict) -> str:
+    """与 run_portfolio_backtest 相同的引擎选择规则"""
+    return backtest_params.get('engine') or (
+        'backtrader' if backtest_params.get('use_backtrader', False) else 'custom'
+    )
+
+
+def _normalize(value):
+    """统一参数类型：数值转为 float（1 与 1.0、Decimal('0.1') 与 0.1 视为相同），日期转为 ISO 字符串"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def canonical_request(filters: Dict, backtest_params: Dict) -> Dict:
+    """只保留影响回测结果的参数并规范化"""
+    engine = resolve_engine(backtest_params)
+    strategy_type = filters.get('strategy_type', '龙回头')
+    names = LIMIT_BREAK_PARAMS if engine == 'backtrader' and strategy_type == '连续涨停' else RESULT_PARAMS.get(
+        engine, RESULT_PARAMS['custom']
+    )
+    return {
+        'engine': engine,
+        'strategy_type': strategy_type,
+        'start_date': _normalize(filters['start_date']),
+        'end_date': _normalize(filters['end_date']),
+        'params': {name: _normalize(backtest_params.get(name, PARAM_DEFAULTS.get(name))) for name in names},
+    }
+
+
+def data_version(canonical: Dict) -> Optional[str]:
+    """
+    当前数据版本：日线版本号 + 区间内策略信号输入列的聚合摘要
+
+    Returns:
+        版本字符串；数据版本不可确定（外部数据源、缓存不可用）时返回 None
+    """
+    params = canonical['params']
+    if params.get('data_source') == 'tushare':
+        return None
+    bars = get_version(BARS)
+    if bars is None:
+        return None
+
+    signals = PolicyDetails.objects.using(params['db_alias']).filter(
+        date__range=(canonical['start_date'], canonical['end_date'])
+    ).aggregate(
+        count=Count('id'), max_id=Max('id'), buy=Sum('first_buy_point'),
+        stop=Sum('stop_loss_point'), target=Sum('take_profit_point')
+    )
+    digest = hashlib.sha1(json.dumps(signals, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{BARS}-{bars}:signals-{digest}"
+
+
+def request_hash(canonical: Dict, version: str) -> str:
+    """规范化请求与数据版本的 SHA-256"""
+    raw = json.dumps({'request': canonical, 'data_version': version}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def find_result(digest: str) -> Optional[PortfolioBacktest]:
+    """查找相同请求已保存的回测结果"""
+    return PortfolioBacktest.objects.filter(request_hash=digest).order_by('-created_at').first()
+
+
+def claim_inflight(digest: str, task_id: str) -> Optional[str]:
+    """
+    登记执行中的请求
+
+    Returns:
+        登记成功返回 task_id；已有相同请求在执行时返回其任务ID；缓存不可用时返回 None
+    """
+    key = INFLIGHT_KEY.format(digest)
+    try:
+        if cache.add(key, task_id, timeout=INFLIGHT_TIMEOUT):
+            return task_id
+        return cache.get(key) or None
+    except Exception as e:
+        logger.warning(f"登记执行中回测失败: {str(e)}")
+        return None
+
+
+def release_inflight(digest: str, task_id: str):
+    """任务结束后清除自己的登记"""
+    key = INFLIGHT_KEY.format(digest)
+    try:
+        if cache.get(key) == task_id:
+            cache.delete(key)
+    except Exception as e:
+        logger.warning(f"清除执行中回测登记失败: {str(e)}")
+
+
+def save_request_hash(result_id: int, digest: str, version: str):
+    """在回测结果上记录请求哈希与数据版本"""
+    PortfolioBacktest.objects.filter(id=result_id).update(request_hash=digest, data_version=version)
@@ -0,0 +1,278 @@
+"""
+向量化回测引擎（engine='vector'）
+
+与 BacktestService 的交易规则完全一致，只是换了一种计算方式：
+- 行情使用 (交易日 × 股票) 的 PricePanel 数组，缺失为 NaN；
+- 所有信号的买入条件（当日有行情且最低价触及第一买点）一次性用掩码数组判定；
+- 每笔持仓的卖出日只取决于自身（超时 / 止盈 / 止损），买入时对该股票的列做一次掩码扫描即可得到；
+- 资金约束按日期顺序处理：当日先回笼已到期卖出的资金，再依次尝试当日的买入候选；
+- 每日资产 = 现金 + 持仓数量矩阵与价格矩阵逐行内积。
+
+资金、成交价和盈亏仍用 Decimal 计算（只在成交时发生，次数很少），因此结果与逐日循环引擎逐笔一致。
+"""
+from typing import Dict, List
+from datetime import date, timedelta
+from decimal import Decimal
+import heapq
+import logging
+import time
+
+import numpy as np
+
+from basic.services.price_panel import PricePanel
+from .backtest_service import BacktestService
+
+logger = logging.getLogger(__name__)
+
+
+class VectorBacktestService(BacktestService):
+    """向量化回测服务"""
+
+    def run_backtest(
+        self,
+        strategy_name: str,
+        start_date: date,
+        end_date: date,
+        initial_capital: Decimal,
+        capital_per_stock_ratio: Decimal,
+        strategy_type: str = '龙回头',
+        hold_timeout_days: int = 60,
+        db_alias: str = 'default'
+    ) -> Dict:
+        """
+        执行回测（参数与返回值同 BacktestService.run_backtest）
+        """
+        started = time.perf_counter()
+        logger.info(f"开始向量化回测: {strategy_name}，时间范围: {start_date} 至 {end_date}")
+
+        signals = self.strategy_service.get_signals_for_backtest(
+            start_date=start_date,
+            end_date=end_date,
+            strategy_type=strategy_type if strategy_type != '全部' else None
+        )
+        if not signals:
+            logger.warning("未找到符合条件的策略信号")
+            return {
+                'status': 'SUCCESS',
+                'message': '未找到符合条件的策略信号',
+                'result_id': None
+            }
+
+        # 与逐日引擎相同：扩展结束日期以包含持仓超时期间的数据
+        stock_codes = list(set(s.stock_code for s in signals))
+        extended_end_date = end_date + timedelta(days=hold_timeout_days + 10)
+        prices = self.strategy_service.get_price_panel(
+            stock_codes, start_date, extended_end_date, fields=('high', 'low', 'close')
+        )
+        if prices.is_empty:
+            logger.error("无法获取价格数据")
+            return {
+                'status': 'FAILURE',
+                'message': '无法获取所需的价格数据',
+                'result_id': None
+            }
+
+        logger.info(
+            f"信号 {len(signals)} 个，股票 {len(prices.codes)} 只，交易日 {len(prices.days)} 个，"
+            f"加载耗时 {time.perf_counter() - started:.2f}s"
+        )
+
+        positions = self._simulate(
+            prices, signals, initial_capital, initial_capital * capital_per_stock_ratio,
+            hold_timeout_days, end_date
+        )
+        history = self._equity_curve(prices, positions, initial_capital)
+        trade_logs, strategy_results = self._build_trade_logs(prices, positions)
+
+        self.strategy_service.bulk_update_strategy_results(strategy_results)
+        logger.info(f"向量化回测计算完成，耗时 {time.perf_counter() - started:.2f}s")
+
+        return self._save_results(
+            strategy_name=strategy_name,
+            start_date=start_date,
+            end_date=end_date,
+            initial_capital=initial_capital,
+            capital_per_stock_ratio=capital_per_stock_ratio,
+            history=history,
+            trade_logs=trade_logs
+        )
+
+    def _simulate(
+        self,
+        prices: PricePanel,
+        signals: List,
+        initial_capital: Decimal,
+        capital_to_invest: Decimal,
+        hold_timeout_days: int,
+        end_date: date
+    ) -> List[Dict]:
+        """
+        按日期顺序撮合买入，并为每笔持仓向量化地求出卖出日
+
+        Returns:
+            持仓列表（按买入顺序），未平仓的持仓 exit 为 None
+        """
+        # 卖出时按 (股票, 买入日) 查找信号，同一键有多个信号时以最后一个为准（与逐日引擎一致）
+        exit_signals = {(s.stock_code, s.signal_date): s for s in signals}
+
+        # 所有信号的买入条件一次判定
+        sig_day = prices.day_index([s.signal_date for s in signals])
+        sig_stock = np.array([prices.code_index.get(s.stock_code, -1) for s in signals], dtype=np.int64)
+        buy_points = np.array([float(s.first_buy_point) for s in signals])
+        valid = (sig_day >= 0) & (sig_stock >= 0)
+        valid &= prices.days[np.maximum(sig_day, 0)] <= np.datetime64(end_date)
+        lows = np.where(valid, prices.low[np.maximum(sig_day, 0), np.maximum(sig_stock, 0)], np.nan)
+        triggered = np.flatnonzero(valid & (lows <= buy_points))
+        # 同一天的候选保持信号原有顺序
+        triggered = triggered[np.argsort(sig_day[triggered], kind='stable')]
+
+        n_days = len(prices.days)
+        held_until = np.full(len(prices.codes), -1, dtype=np.int64)
+        pending_exits = []  # (卖出日下标, 买入序号, 回款)
+        cash = initial_capital
+        positions = []
+
+        for sig_idx in triggered:
+            day = int(sig_day[sig_idx])
+            stock = int(sig_stock[sig_idx])
+            # 当日先卖后买：卖出日不晚于今天的持仓回款可用
+            while pending_exits and pending_exits[0][0] <= day:
+                cash += heapq.heappop(pending_exits)[2]
+            if held_until[stock] > day:
+                continue
+
+            signal = signals[sig_idx]
+            if cash < capital_to_invest:
+                continue
+            buy_price = Decimal(str(float(signal.first_buy_point)))
+            quantity = int(capital_to_invest / buy_price / 100) * 100
+            if quantity == 0:
+                continue
+            cash -= quantity * buy_price
+
+            exit_signal = exit_signals[(signal.stock_code, signal.signal_date)]
+            exit_day, reason = self._find_exit(
+                prices, stock, day, hold_timeout_days,
+                float(exit_signal.take_profit_point), float(exit_signal.stop_loss_point)
+            )
+            position = {
+                'seq': len(positions),
+                'stock': stock,
+                'entry': day,
+                'exit': exit_day,
+                'reason': reason,
+                'quantity': quantity,
+                'buy_price': buy_price,
+                'signal': signal,
+                'exit_signal': exit_signal,
+            }
+            positions.append(position)
+
+            if exit_day is None:
+                held_until[stock] = n_days
+            else:
+                held_until[stock] = exit_day
+                sell_price = Decimal(str(prices.close[exit_day, stock]))
+                position['sell_price'] = sell_price
+                heapq.heappush(pending_exits, (exit_day, position['seq'], quantity * sell_price))
+
+        return positions
+
+    @staticmethod
+    def _find_exit(prices: PricePanel, stock: int, entry: int, hold_timeout_days: int,
+                   take_profit: float, stop_loss: float):
+        """
+        持仓的卖出日与原因：买入次日起第一个有行情且满足 超时 > 止盈 > 止损 任一条件的交易日
+
+        Returns:
+            (卖出日下标, 卖出原因)，持有到数据结束仍未卖出时为 (None, '')
+        """
+        window = slice(entry + 1, None)
+        has_data = prices.has_data[window, stock]
+        timeout = (prices.ordinals[window] - prices.ordinals[entry]) >= hold_timeout_days
+        take = prices.high[window, stock] >= take_profit
+        stop = prices.low[window, stock] <= stop_loss
+        hits = np.flatnonzero(has_data & (timeout | take | stop))
+        if not len(hits):
+            return None, ''
+        offset = int(hits[0])
+        if timeout[offset]:
+            reason = 'timeout'
+        elif take[offset]:
+            reason = 'take_profit'
+        else:
+            reason = 'stop_loss'
+        return entry + 1 + offset, reason
+
+    def _equity_curve(self, prices: PricePanel, positions: List[Dict], initial_capital: Decimal) -> List[Dict]:
+        """
+        每日资产：现金 + 持仓数量矩阵与收盘价矩阵逐行内积
+
+        价格以分为单位的整数计算，结果与逐日引擎的 Decimal 累加完全一致；
+        持仓股票当日无行情时按买入价估值（与 Portfolio.get_total_value 相同）。
+        """
+        n_days = len(prices.days)
+        quantities = np.zeros(prices.close.shape, dtype=np.int64, order='F')
+        cents = np.zeros(prices.close.shape, dtype=np.int64, order='F')
+        cents[prices.has_data] = np.rint(prices.close[prices.has_data] * 100).astype(np.int64)
+        cash_delta = [Decimal('0')] * n_days
+
+        for position in positions:
+            stock, entry = position['stock'], position['entry']
+            end = position['exit'] if position['exit'] is not None else n_days
+            held = slice(entry, end)
+            quantities[held, stock] = position['quantity']
+            missing = ~prices.has_data[held, stock]
+            if missing.any():
+                cents[held, stock][missing] = int(position['buy_price'] * 100)
+            cash_delta[entry] -= position['quantity'] * position['buy_price']
+            if position['exit'] is not None:
+                cash_delta[position['exit']] += position['quantity'] * position['sell_price']
+
+        stock_value = np.einsum('ij,ij->i', quantities, cents)
+
+        history = []
+        cash = initial_capital
+        for idx in range(n_days):
+            cash += cash_delta[idx]
+            history.append({
+                'date': prices.dates[idx],
+                'value': cash + Decimal(int(stock_value[idx])).scaleb(-2),
+            })
+        return history
+
+    @staticmethod
+    def _build_trade_logs(prices: PricePanel, positions: List[Dict]):
+        """
+        生成交易日志（按卖出日、同日按买入顺序，与逐日引擎一致）及策略结果更新列表
+
+        Returns:
+            (trade_logs, [(policy_id, result_type, execution_date, profit_rate)])
+        """
+        strategy_results = [
+            (position['signal'].policy_id, 'first_buy', prices.dates[position['entry']], None)
+            for position in positions
+        ]
+        trade_logs = []
+        closed = sorted((p for p in positions if p['exit'] is not None), key=lambda p: (p['exit'], p['seq']))
+        for position in closed:
+            buy_price, sell_price = position['buy_price'], position['sell_price']
+            quantity = position['quantity']
+            sell_date = prices.dates[position['exit']]
+            return_rate = (sell_price / buy_price) - Decimal('1')
+            trade_logs.append({
+                'stock_code': prices.codes[position['stock']],
+                'buy_date': prices.dates[position['entry']],
+                'buy_price': buy_price,
+                'sell_date': sell_date,
+                'sell_price': sell_price,
+                'quantity': quantity,
+                'profit': (sell_price - buy_price) * quantity,
+                'return_rate': return_rate,
+                'strategy_type': position['signal'].strategy_type,
+                'sell_reason': position['reason'],
+            })
+            strategy_results.append(
+                (position['exit_signal'].policy_id, position['reason'], sell_date, float(return_rate))
+            )
+        return trade_logs, strategy_results
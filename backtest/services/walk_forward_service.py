@@ -0,0 +1,185 @@
+"""
+滚动样本内 / 样本外（walk-forward）回测服务
+
+把回测区间的交易日切分为滚动窗口：每个窗口先在样本内区间对参数网格做扫描，
+按优化目标选出最优参数，再用这组参数回测紧随其后的样本外区间；窗口每次向前滚动一个样本外长度。
+
+- 信号与行情面板只加载一次（覆盖整个区间及最长持仓期），所有窗口共用，
+  每次回测只是对面板按日期截取视图（见 parameter_sweep_service.run_dragon_turn）；
+- 全部窗口的样本内扫描（窗口数 × 参数组合数）作为一批任务在同一个进程池中并行执行，
+  随后各窗口的样本外回测也在这个进程池中并行执行；
+- 各样本外回测都以相同的初始资金独立运行，拼接时按收益率复利衔接：
+  每段资产曲线按上一段结束时的资产等比缩放。样本外区间结束时仍未平仓的持仓按原规则在之后平仓，
+  其盈亏计入该段的期末资产，体现在下一段的起点。
+
+目前只支持龙回头策略（向量化引擎），可扫描参数同 SWEEP_PARAMS['龙回头']。
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List
+import logging
+import time
+
+from django.utils import timezone
+
+from ..models import WalkForwardRun
+from .backtrader_service import resolve_workers
+from .parameter_sweep_service import (
+    DEFAULT_RANKING, SWEEP_PARAMS, ParameterSweepService, _shared, grid_combinations, ranking_key,
+    run_dragon_turn, summarize, worker_pool
+)
+
+logger = logging.getLogger(__name__)
+
+WALK_FORWARD_STRATEGIES = ('龙回头',)
+
+MAX_WALK_FORWARD_WINDOWS = 100
+
+
+def split_windows(trading_days: List[date], in_sample_days: int, out_of_sample_days: int) -> List[Dict]:
+    """
+    按交易日切分滚动窗口：样本内 in_sample_days 个交易日，随后 out_of_sample_days 个交易日为样本外，
+    每次向前滚动 out_of_sample_days 个交易日；最后一个样本外区间可以不足长度。
+
+    Returns:
+        [{'index', 'in_sample_start', 'in_sample_end', 'out_of_sample_start', 'out_of_sample_end'}]
+    """
+    windows = []
+    offset = 0
+    while offset + in_sample_days < len(trading_days):
+        in_sample = trading_days[offset:offset + in_sample_days]
+        out_of_sample = trading_days[offset + in_sample_days:offset + in_sample_days + out_of_sample_days]
+        windows.append({
+            'index': len(windows),
+            'in_sample_start': in_sample[0],
+            'in_sample_end': in_sample[-1],
+            'out_of_sample_start': out_of_sample[0],
+            'out_of_sample_end': out_of_sample[-1],
+        })
+        offset += out_of_sample_days
+    return windows
+
+
+def _evaluate_window(task: Dict) -> Dict:
+    """在共享数据上回测一个 (区间, 参数组合)，样本外回测额外返回区间内的每日资产"""
+    history, trade_logs = run_dragon_turn(task['params'], task['start_date'], task['end_date'])
+    result = summarize(_shared['engine'], history, [log['profit'] for log in trade_logs], _shared['initial_capital'])
+    if task.get('with_history'):
+        result['history'] = [
+            (row['date'], float(row['value'])) for row in history if row['date'] <= task['end_date']
+        ]
+    return result
+
+
+class WalkForwardService(ParameterSweepService):
+    """滚动回测服务"""
+
+    def run_walk_forward(self, run: WalkForwardRun) -> Dict:
+        """
+        执行滚动回测，保存各窗口结果与拼接后的样本外资产曲线
+
+        Returns:
+            {'status', 'message', 'walk_forward_id'}
+        """
+        started = time.perf_counter()
+        run.status = 'RUNNING'
+        run.save(update_fields=['status'])
+
+        try:
+            grid = {name: run.param_grid[name] for name in SWEEP_PARAMS[run.strategy_type]}
+            combos = grid_combinations(grid)
+            shared = self._load_dragon_turn(run, combos)
+            trading_days = [d for d in shared['prices'].dates if run.start_date <= d <= run.end_date] if shared else []
+            windows = split_windows(trading_days, run.in_sample_days, run.out_of_sample_days)
+
+            if not windows:
+                run.status = 'SUCCESS'
+                run.message = '未找到信号或行情数据，或交易日不足一个窗口'
+                run.windows, run.equity_curve = [], []
+            else:
+                if len(windows) > MAX_WALK_FORWARD_WINDOWS:
+                    raise ValueError(f"窗口数 {len(windows)} 超过上限 {MAX_WALK_FORWARD_WINDOWS}，请增大样本外交易日数")
+                workers = resolve_workers(run.options.get('workers'))
+                logger.info(
+                    f"开始滚动回测: {run.strategy_name}，{len(windows)} 个窗口 × {len(combos)} 个参数组合，"
+                    f"进程数 {workers}，数据加载 {time.perf_counter() - started:.1f}s"
+                )
+                with worker_pool(shared, workers) as pool:
+                    self._optimize(pool, windows, combos, run.objective)
+                    out_of_sample = pool(_evaluate_window, [
+                        {
+                            'params': window['best_params'],
+                            'start_date': window['out_of_sample_start'],
+                            'end_date': window['out_of_sample_end'],
+                            'with_history': True,
+                        }
+                        for window in windows
+                    ])
+                self._stitch(run, windows, out_of_sample)
+                run.status = 'SUCCESS'
+                run.message = (
+                    f'完成 {len(windows)} 个窗口（每个窗口 {len(combos)} 个参数组合），'
+                    f'总耗时 {time.perf_counter() - started:.1f}s'
+                )
+            logger.info(f"滚动回测完成: {run.message}")
+        except Exception as e:
+            run.status = 'FAILURE'
+            run.message = str(e)
+            raise
+        finally:
+            run.finished_at = timezone.now()
+            run.save(update_fields=[
+                'status', 'message', 'windows', 'equity_curve', 'final_capital', 'total_return',
+                'max_drawdown', 'finished_at'
+            ])
+
+        return {'status': run.status, 'message': run.message, 'walk_forward_id': run.id}
+
+    @staticmethod
+    def _optimize(pool, windows: List[Dict], combos: List[Dict], objective: str):
+        """全部窗口的样本内扫描作为一批任务并行执行，为每个窗口选出最优参数（写入 window['best_params']）"""
+        tasks = [
+            {'params': params, 'start_date': window['in_sample_start'], 'end_date': window['in_sample_end']}
+            for window in windows
+            for params in combos
+        ]
+        results = pool(_evaluate_window, tasks)
+
+        order_by = (f'-{objective}',) + tuple(name for name in DEFAULT_RANKING if name.lstrip('-') != objective)
+        key = ranking_key(order_by)
+        for window_idx, window in enumerate(windows):
+            scores = results[window_idx * len(combos):(window_idx + 1) * len(combos)]
+            best = min(range(len(combos)), key=lambda idx: key(scores[idx]))
+            window['best_params'] = combos[best]
+            window['in_sample'] = scores[best]
+
+    def _stitch(self, run: WalkForwardRun, windows: List[Dict], out_of_sample: List[Dict]):
+        """按收益率复利拼接各段样本外资产曲线，计算整体指标"""
+        initial = float(run.initial_capital)
+        capital = initial
+        curve = []
+        for window, result in zip(windows, out_of_sample):
+            scale = capital / initial
+            curve.extend(
+                [trade_date.isoformat(), round(value * scale, 2)]
+                for trade_date, value in result.pop('history')
+                if trade_date >= window['out_of_sample_start']
+            )
+            capital *= result['final_capital'] / initial
+            window['out_of_sample'] = result
+
+        history = [{'value': value} for _, value in curve] + [{'value': capital}]
+        metrics = self.engine._calculate_metrics(history, initial)
+        run.final_capital = Decimal(str(round(capital, 2)))
+        run.total_return = Decimal(str(round(float(metrics['total_return']), 4)))
+        run.max_drawdown = Decimal(str(round(float(metrics['max_drawdown']), 4)))
+        run.equity_curve = curve
+        run.windows = [
+            {
+                **window,
+                **{key: window[key].isoformat() for key in (
+                    'in_sample_start', 'in_sample_end', 'out_of_sample_start', 'out_of_sample_end'
+                )},
+            }
+            for window in windows
+        ]
@@ -32,6 +32,12 @@ class DragonTurnBacktraderStrategy(bt.Strategy):
         self.positions_info = {}  # {data._name: {'entry_date': date, 'signal': signal}}
         self.trade_logs = []  # 交易记录
         
+        # 按名称索引数据源，按信号查找数据源为 O(1)
+        self.data_by_name = {data._name: data for data in self.datas}
+        self.data_order = {data._name: idx for idx, data in enumerate(self.datas)}
+        # 当前持仓的数据源 {data._name: data}，每个交易日只检查持仓股票而不是全部数据源
+        self.held = {}
+        
         logger.info("策略初始化完成")
         logger.info(f"持仓超时: {self.p.hold_timeout_days}天")
         logger.info(f"单票比例: {self.p.capital_per_stock_ratio * 100}%")
@@ -88,6 +94,13 @@ class DragonTurnBacktraderStrategy(bt.Strategy):
         elif order.status in [order.Canceled, order.Margin, order.Rejected]:
             self.log(f'订单失败 {data_name}: {order.status}')
         
+        # 成交后按实际持仓维护持仓集合
+        if order.status == order.Completed:
+            if self.getposition(order.data).size > 0:
+                self.held[data_name] = order.data
+            else:
+                self.held.pop(data_name, None)
+        
         # 清除订单
         if data_name in self.orders:
             self.orders.pop(data_name)
@@ -120,7 +133,7 @@ class DragonTurnBacktraderStrategy(bt.Strategy):
                 'buy_date': pos_info.get('entry_date'),
                 'buy_price': Decimal(str(trade.price)),
                 'sell_date': current_date,
-                'sell_price': Decimal(str(self.getdatabyname(data_name).close[0])),
+                'sell_price': Decimal(str(trade.data.close[0])),
                 'quantity': int(abs(trade.size)),
                 'profit': Decimal(str(trade.pnlcomm)),
                 'return_rate': Decimal(str(profit_rate)),
@@ -148,9 +161,9 @@ class DragonTurnBacktraderStrategy(bt.Strategy):
         """每个交易日的策略逻辑"""
         current_date = self.datas[0].datetime.date(0)
         
-        # 1. 检查卖出条件（已持有的股票）
-        for data in self.datas:
-            data_name = data._name
+        # 1. 检查卖出条件（已持有的股票，按数据源添加顺序）
+        held = sorted(self.held.items(), key=lambda item: self.data_order[item[0]])
+        for data_name, data in held:
             position = self.getposition(data)
             
             if position.size > 0:  # 有持仓
@@ -196,18 +209,13 @@ class DragonTurnBacktraderStrategy(bt.Strategy):
                 stock_code = signal.stock_code
                 
                 # 找到对应的数据
-                data = None
-                for d in self.datas:
-                    if d._name == stock_code:
-                        data = d
-                        break
+                data = self.data_by_name.get(stock_code)
                 
-                if not data:
+                if data is None:
                     continue
                 
                 # 检查是否已经持有
-                position = self.getposition(data)
-                if position.size > 0:
+                if stock_code in self.held:
                     continue
                 
                 # 检查是否有未完成订单
@@ -6,14 +6,25 @@ import traceback
 
 from .services.backtest_service import BacktestService
 from .services.backtrader_service import BacktraderBacktestService
+from .services.vector_backtest_service import VectorBacktestService
+from .services.parameter_sweep_service import ParameterSweepService
+from .services.walk_forward_service import WalkForwardService
+from .services import result_cache
+from .models import ParameterSweep, WalkForwardRun
 from utils.telegram import send_telegram_message
 
 
 logger = logging.getLogger(__name__)
 
+ENGINE_NAMES = {
+    'custom': '自定义引擎',
+    'backtrader': 'Backtrader',
+    'vector': '向量化引擎',
+}
+
 
 @shared_task(bind=True)
-def run_portfolio_backtest(self, filters, backtest_params):
+def run_portfolio_backtest(self, filters, backtest_params, request_hash=None, data_version=None):
     """
     执行组合回测任务
     
@@ -28,8 +39,11 @@ def run_portfolio_backtest(self, filters, backtest_params):
             - capital_per_stock_ratio: 单票资金占比
             - hold_timeout_days: 最大持仓天数
             - db_alias: 数据库别名
+            - engine: 回测引擎 custom / backtrader / vector（未指定时按 use_backtrader 选择）
             - use_backtrader: 是否使用Backtrader引擎（默认False）
             - commission: 佣金率（仅Backtrader，默认0.0003）
+        request_hash: 请求哈希（见 result_cache），成功后记录在回测结果上，并清除执行中登记
+        data_version: 计算请求哈希时的数据版本
     
     Returns:
         回测结果字典
@@ -58,8 +72,10 @@ def run_portfolio_backtest(self, filters, backtest_params):
         strategy_type = filters.get('strategy_type', '龙回头')
         
         # 选择回测引擎
-        use_backtrader = backtest_params.get('use_backtrader', False)
-        engine_name = 'Backtrader' if use_backtrader else '自定义引擎'
+        engine = backtest_params.get('engine') or (
+            'backtrader' if backtest_params.get('use_backtrader', False) else 'custom'
+        )
+        engine_name = ENGINE_NAMES.get(engine, '自定义引擎')
         
         logger.info(f"回测引擎: {engine_name}")
         logger.info(f"策略名称: {strategy_name}")
@@ -70,7 +86,7 @@ def run_portfolio_backtest(self, filters, backtest_params):
         logger.info(f"最大持仓: {hold_timeout_days}天")
         
         # 使用对应的服务层执行回测
-        if use_backtrader:
+        if engine == 'backtrader':
             backtest_service = BacktraderBacktestService()
             commission = backtest_params.get('commission', 0.0003)
             logger.info(f"佣金率: {commission*100:.2f}%")
@@ -98,7 +114,8 @@ def run_portfolio_backtest(self, filters, backtest_params):
                     position_pct=float(capital_per_stock_ratio),
                     commission=commission,
                     db_alias=db_alias,
-                    data_source=data_source  # ✅ 传递数据源参数
+                    data_source=data_source,  # ✅ 传递数据源参数
+                    workers=backtest_params.get('workers')
                 )
             else:
                 # 使用龙回头策略回测（DragonTurnBacktraderStrategy）
@@ -115,7 +132,8 @@ def run_portfolio_backtest(self, filters, backtest_params):
                     commission=commission
                 )
         else:
-            backtest_service = BacktestService()
+            # 向量化引擎与自定义引擎规则一致、结果逐笔相同，只是计算方式不同
+            backtest_service = VectorBacktestService() if engine == 'vector' else BacktestService()
             
             result = backtest_service.run_backtest(
                 strategy_name=strategy_name,
@@ -128,6 +146,9 @@ def run_portfolio_backtest(self, filters, backtest_params):
                 db_alias=db_alias
             )
         
+        if request_hash and result.get('result_id'):
+            result_cache.save_request_hash(result['result_id'], request_hash, data_version)
+        
         logger.info("="*60)
         logger.info(f"✅ 回测任务完成 ({engine_name})")
         logger.info("="*60)
@@ -149,12 +170,12 @@ def run_portfolio_backtest(self, filters, backtest_params):
                 msg += f"状态: {result.get('status', '未知')}\n"
                 msg += f"信息: {result.get('message', '无详细信息')}\n"
             
-logger.info("📡 正在发送 Telegram 通知...")
-sent = send_telegram_message(msg)
-if sent:
-    logger.info("✅ Telegram 通知发送成功")
-else:
-    logger.warning("❌ Telegram 通知发送失败，请检查配置或日志")
+            logger.info("📡 正在发送 Telegram 通知...")
+            sent = send_telegram_message(msg)
+            if sent:
+                logger.info("✅ Telegram 通知发送成功")
+            else:
+                logger.warning("❌ Telegram 通知发送失败，请检查配置或日志")
         except Exception as tg_e:
             logger.error(f"发送 Telegram 通知报错: {tg_e}")
         
@@ -175,3 +196,46 @@ else:
             logger.error(f"发送 Telegram 错误通知失败: {tg_e}")
             
         return {'status': 'FAILURE', 'error': error_msg}
+    finally:
+        if request_hash:
+            result_cache.release_inflight(request_hash, self.request.id)
+
+
+@shared_task(bind=True)
+def run_parameter_sweep(self, sweep_id):
+    """
+    执行参数扫描任务
+    
+    Args:
+        sweep_id: ParameterSweep 记录ID（参数网格与固定参数保存在记录中）
+    
+    Returns:
+        {'status', 'message', 'sweep_id'}
+    """
+    try:
+        sweep = ParameterSweep.objects.get(id=sweep_id)
+        return ParameterSweepService().run_sweep(sweep)
+    except Exception as e:
+        error_msg = f"参数扫描失败: {str(e)}\n{traceback.format_exc()}"
+        logger.error(error_msg)
+        return {'status': 'FAILURE', 'error': error_msg, 'sweep_id': sweep_id}
+
+
+@shared_task(bind=True)
+def run_walk_forward(self, walk_forward_id):
+    """
+    执行滚动（walk-forward）回测任务
+    
+    Args:
+        walk_forward_id: WalkForwardRun 记录ID（参数网格与窗口设置保存在记录中）
+    
+    Returns:
+        {'status', 'message', 'walk_forward_id'}
+    """
+    try:
+        run = WalkForwardRun.objects.get(id=walk_forward_id)
+        return WalkForwardService().run_walk_forward(run)
+    except Exception as e:
+        error_msg = f"滚动回测失败: {str(e)}\n{traceback.format_exc()}"
+        logger.error(error_msg)
+        return {'status': 'FAILURE', 'error': error_msg, 'walk_forward_id': walk_forward_id}
@@ -1,15 +1,33 @@
 """
 回测功能测试代码
 """
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from datetime import date, timedelta
 from decimal import Decimal
+import os
+import random
 
-from basic.models import Code, PolicyDetails, StockDailyData
+import numpy as np
+import pandas as pd
+
+from basic.models import Code, PolicyDetails, SignalOutcomeBucket, StockDailyData, StrategyStatsRollup
+from basic.services.price_panel import PricePanel
+from basic.services.strategy_rollup_service import COUNT_FIELDS as ROLLUP_COUNT_FIELDS, StrategyRollupService
 from basic.services.strategy_service import StrategyService, StrategySignal
+from basic.services.success_rate_service import SuccessRateService
+from backtest.data_feeds import FeedPool, split_feed_frames
+from backtest.limit_break_runner import frame_to_arrays, run_stocks
+from backtest.serializers import BacktestParamsSerializer
 from backtest.services.backtest_service import BacktestService
-from backtest.models import PortfolioBacktest, TradeLog
+from backtest.services.backtrader_service import resolve_workers
+from backtest.services.oracle_data_service import OracleDataService
+from backtest.services import result_cache
+from backtest.services.parameter_sweep_service import ParameterSweepService, build_grid
+from backtest.services.vector_backtest_service import VectorBacktestService
+from backtest.services.walk_forward_service import WalkForwardService, split_windows
+from backtest.models import ParameterSweep, PortfolioBacktest, TradeLog, WalkForwardRun
 
 
 class StrategyServiceTest(TestCase):
@@ -305,6 +323,415 @@ class BacktestServiceTest(TestCase):
         print("\n✅ 测试通过：回测执行成功")
 
 
+class SyntheticMarketTestCase(TestCase):
+    """随机行情与龙回头信号夹具：12 只股票、2024 年一季度的信号"""
+    
+    def setUp(self):
+        """随机生成多只股票的行情（含停牌缺失日）和大量信号"""
+        rng = random.Random(42)
+        self.start_date = date(2024, 1, 1)
+        self.end_date = date(2024, 3, 31)
+        trading_days = [
+            self.start_date + timedelta(days=i) for i in range(150)
+            if (self.start_date + timedelta(days=i)).weekday() < 5
+        ]
+        
+        for n in range(12):
+            stock = Code.objects.create(
+                ts_code=f'60{n:04d}.SH', symbol=f'60{n:04d}', name=f'测试{n}',
+                area='上海', industry='测试', market='主板', list_status='L', list_date='2000-01-01'
+            )
+            price = rng.uniform(5, 30)
+            bars = []
+            for trade_date in trading_days:
+                price = max(1.0, price * (1 + rng.gauss(0, 0.03)))
+                if rng.random() < 0.05:
+                    continue  # 停牌
+                high = price * (1 + rng.uniform(0, 0.04))
+                low = price * (1 - rng.uniform(0, 0.04))
+                bars.append(StockDailyData(
+                    stock=stock, trade_date=trade_date,
+                    open=Decimal(f'{price:.2f}'), high=Decimal(f'{high:.2f}'),
+                    low=Decimal(f'{low:.2f}'), close=Decimal(f'{price:.2f}'),
+                    volume=1000000, amount=Decimal('10000000')
+                ))
+                if trade_date <= self.end_date and rng.random() < 0.15:
+                    first_buy_point = Decimal(f'{price * rng.uniform(0.95, 1.0):.2f}')
+                    PolicyDetails.objects.create(
+                        stock=stock, date=trade_date,
+                        first_buy_point=first_buy_point, holding_price=first_buy_point,
+                        stop_loss_point=Decimal(f'{price * 0.93:.2f}'),
+                        take_profit_point=Decimal(f'{price * 1.08:.2f}'),
+                        strategy_type='龙回头', current_status='L',
+                        limit_up_streak=n % 3 + 1, gap_pct=Decimal(n % 5 - 2), buy_distance_pct=Decimal(trade_date.day % 25)
+                    )
+            StockDailyData.objects.bulk_create(bars)
+    
+
+
+class VectorBacktestParityTest(SyntheticMarketTestCase):
+    """向量化引擎与逐日循环引擎逐笔一致性测试"""
+    
+    RESULT_FIELDS = ['first_buy_time', 'take_profit_time', 'stop_loss_time', 'current_status', 'holding_profit']
+    
+    def _run(self, service):
+        started = timezone.now()
+        result = service.run_backtest(
+            strategy_name='一致性测试',
+            start_date=self.start_date,
+            end_date=self.end_date,
+            initial_capital=Decimal('1000000'),
+            capital_per_stock_ratio=Decimal('0.2'),
+            hold_timeout_days=15
+        )
+        backtest = PortfolioBacktest.objects.get(id=result['result_id'])
+        trades = list(TradeLog.objects.filter(portfolio_backtest=backtest).order_by('id').values_list(
+            'stock_code', 'buy_date', 'buy_price', 'sell_date', 'sell_price',
+            'quantity', 'profit', 'return_rate', 'sell_reason'
+        ))
+        policies = list(PolicyDetails.objects.order_by('id').values_list(*self.RESULT_FIELDS))
+        touched = list(PolicyDetails.objects.filter(updated_at__gte=started).order_by('id').values_list('id', flat=True))
+        rollups = list(StrategyStatsRollup.objects.order_by('date', 'strategy_type', 'stock_id').values_list(
+            'date', 'strategy_type', 'stock_id', *ROLLUP_COUNT_FIELDS, 'max_drawdown'
+        ))
+        buckets = list(SignalOutcomeBucket.objects.order_by(
+            'strategy_type', 'streak_bucket', 'gap_bucket', 'distance_bucket'
+        ).values_list('strategy_type', 'streak_bucket', 'gap_bucket', 'distance_bucket', 'resolved_count', 'success_count'))
+        # queryset.update 不触发模型信号，重置信号后重建汇总桶与分桶
+        PolicyDetails.objects.update(
+            first_buy_time=None, take_profit_time=None, stop_loss_time=None,
+            current_status='L', holding_profit=0
+        )
+        StrategyRollupService().rebuild()
+        SuccessRateService().rebuild()
+        summary = (
+            backtest.final_capital, backtest.total_return, backtest.max_drawdown,
+            backtest.max_profit, backtest.total_trades, backtest.win_rate
+        )
+        return trades, policies, summary, rollups, buckets, touched
+    
+    def test_matches_loop_engine(self):
+        """交易记录、信号执行结果、汇总指标、统计汇总桶、成功率分桶与更新时间均一致"""
+        expected = self._run(BacktestService())
+        actual = self._run(VectorBacktestService())
+        
+        self.assertGreater(len(expected[0]), 10)
+        self.assertTrue(any(row[-2] for row in expected[4]))
+        self.assertEqual(actual[0], expected[0])
+        self.assertEqual(actual[1], expected[1])
+        self.assertEqual(actual[2], expected[2])
+        self.assertEqual(actual[3], expected[3])
+        self.assertEqual(actual[4], expected[4])
+        self.assertTrue(expected[5])
+        self.assertEqual(actual[5], expected[5])
+
+
+class ParameterSweepTest(SyntheticMarketTestCase):
+    """参数扫描：每个组合的指标与单独运行向量化回测一致"""
+    
+    def test_build_grid(self):
+        """参数网格展开，不支持的参数报错"""
+        grid = build_grid('龙回头', {'hold_timeout_days': {'start': 10, 'stop': 20, 'step': 5}})
+        self.assertEqual(grid, {'capital_per_stock_ratio': [0.1], 'hold_timeout_days': [10, 15, 20]})
+        with self.assertRaises(ValueError):
+            build_grid('龙回头', {'profit_target': [0.1]})
+    
+    def test_sweep_matches_single_runs(self):
+        """每个参数组合的指标与单独运行向量化回测一致，排名按收益率降序"""
+        sweep = ParameterSweep.objects.create(
+            strategy_name='扫描测试', strategy_type='龙回头',
+            start_date=self.start_date, end_date=self.end_date, initial_capital=Decimal('1000000'),
+            param_grid=build_grid('龙回头', {'capital_per_stock_ratio': [0.1, 0.2], 'hold_timeout_days': [10, 15]}),
+            options={'workers': 2}, total_combinations=4
+        )
+        ParameterSweepService().run_sweep(sweep)
+        sweep.refresh_from_db()
+        self.assertEqual(sweep.status, 'SUCCESS')
+        self.assertEqual(len(sweep.results['rows']), 4)
+        
+        for row in sweep.results['rows']:
+            ratio, hold_days, total_return, max_drawdown, win_rate, total_trades, _ = row
+            result = VectorBacktestService().run_backtest(
+                strategy_name='单独回测', start_date=self.start_date, end_date=self.end_date,
+                initial_capital=Decimal('1000000'), capital_per_stock_ratio=Decimal(str(ratio)),
+                hold_timeout_days=hold_days
+            )
+            PolicyDetails.objects.update(
+                first_buy_time=None, take_profit_time=None, stop_loss_time=None,
+                current_status='L', holding_profit=0
+            )
+            backtest = PortfolioBacktest.objects.get(id=result['result_id'])
+            self.assertGreater(total_trades, 0)
+            self.assertEqual(total_trades, backtest.total_trades)
+            self.assertAlmostEqual(total_return, float(backtest.total_return), places=4)
+            self.assertAlmostEqual(max_drawdown, float(backtest.max_drawdown), places=4)
+            self.assertAlmostEqual(win_rate, float(backtest.win_rate), places=4)
+        
+        ranked = ParameterSweepService.rank_results(sweep.results)
+        returns = [entry['total_return'] for entry in ranked]
+        self.assertEqual(returns, sorted(returns, reverse=True))
+        self.assertEqual(ranked[0]['rank'], 1)
+
+
+class WalkForwardTest(SyntheticMarketTestCase):
+    """滚动回测：窗口切分、样本外结果与单独运行一致"""
+    
+    def test_split_windows(self):
+        """按交易日切分样本内 / 样本外窗口，最后一个样本外区间可以不足长度"""
+        days = [date(2024, 1, 1) + timedelta(days=i) for i in range(10)]
+        windows = split_windows(days, 4, 3)
+        self.assertEqual(len(windows), 2)
+        self.assertEqual(windows[0]['in_sample_end'], days[3])
+        self.assertEqual(windows[0]['out_of_sample_start'], days[4])
+        self.assertEqual(windows[1]['in_sample_start'], days[3])
+        self.assertEqual(windows[1]['out_of_sample_end'], days[9])
+    
+    def test_walk_forward(self):
+        """滚动回测完成，样本外资产曲线连续，第一个样本外窗口与单独回测一致"""
+        run = WalkForwardRun.objects.create(
+            strategy_name='滚动测试', strategy_type='龙回头',
+            start_date=self.start_date, end_date=self.end_date, initial_capital=Decimal('1000000'),
+            param_grid=build_grid('龙回头', {'capital_per_stock_ratio': [0.1, 0.2], 'hold_timeout_days': [5, 10]}),
+            in_sample_days=20, out_of_sample_days=10, options={'workers': 2}
+        )
+        WalkForwardService().run_walk_forward(run)
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'SUCCESS')
+        self.assertGreater(len(run.windows), 1)
+        self.assertTrue(all('best_params' in window for window in run.windows))
+        self.assertEqual(run.equity_curve[0][0], run.windows[0]['out_of_sample_start'])
+        self.assertEqual(run.equity_curve[-1][0], run.windows[-1]['out_of_sample_end'])
+        
+        # 第一个样本外窗口与用最优参数单独回测该区间的结果一致
+        window = run.windows[0]
+        result = VectorBacktestService().run_backtest(
+            strategy_name='单独回测', start_date=date.fromisoformat(window['out_of_sample_start']),
+            end_date=date.fromisoformat(window['out_of_sample_end']), initial_capital=Decimal('1000000'),
+            capital_per_stock_ratio=Decimal(str(window['best_params']['capital_per_stock_ratio'])),
+            hold_timeout_days=window['best_params']['hold_timeout_days']
+        )
+        backtest = PortfolioBacktest.objects.get(id=result['result_id'])
+        self.assertEqual(window['out_of_sample']['total_trades'], backtest.total_trades)
+        self.assertAlmostEqual(window['out_of_sample']['total_return'], float(backtest.total_return), places=4)
+
+
+class ResultCacheTest(SyntheticMarketTestCase):
+    """回测结果缓存：请求哈希、数据版本与执行中登记"""
+    
+    def _canonical(self, strategy_type='龙回头', **params):
+        filters = {'strategy_name': '缓存测试', 'strategy_type': strategy_type,
+                   'start_date': self.start_date, 'end_date': self.end_date}
+        backtest_params = {'engine': 'vector', 'total_capital': 1000000, 'capital_per_stock_ratio': 0.1,
+                           'hold_timeout_days': 10, 'workers': 2, **params}
+        return result_cache.canonical_request(filters, backtest_params)
+    
+    def test_request_hash(self):
+        """请求哈希忽略标签、并行度与数值类型，随引擎和参数变化"""
+        canonical = self._canonical()
+        version = result_cache.data_version(canonical)
+        digest = result_cache.request_hash(canonical, version)
+        # 标签、并行度、数值类型不影响哈希
+        self.assertEqual(digest, result_cache.request_hash(
+            self._canonical(total_capital=1000000.0, workers=4, capital_per_stock_ratio=Decimal('0.1')), version
+        ))
+        self.assertNotEqual(digest, result_cache.request_hash(self._canonical(engine='custom'), version))
+        self.assertNotEqual(digest, result_cache.request_hash(self._canonical(hold_timeout_days=15), version))
+        # Tushare 数据源没有数据版本，不参与缓存
+        self.assertIsNone(result_cache.data_version(self._canonical('连续涨停', engine='backtrader', data_source='tushare')))
+        self.assertIsNotNone(result_cache.data_version(self._canonical('连续涨停', engine='backtrader', data_source='oracle')))
+    
+    def test_data_version_ignores_backtest_writeback(self):
+        """回测回写执行结果不改变数据版本，修改信号输入列才改变"""
+        canonical = self._canonical()
+        version = result_cache.data_version(canonical)
+        result = VectorBacktestService().run_backtest(
+            strategy_name='缓存测试', start_date=self.start_date, end_date=self.end_date,
+            initial_capital=Decimal('1000000'), capital_per_stock_ratio=Decimal('0.1'), hold_timeout_days=10
+        )
+        # 回测回写的执行结果不改变数据版本，修改信号输入列才改变
+        self.assertEqual(result_cache.data_version(canonical), version)
+        digest = result_cache.request_hash(canonical, version)
+        result_cache.save_request_hash(result['result_id'], digest, version)
+        self.assertEqual(result_cache.find_result(digest).id, result['result_id'])
+        
+        policy = PolicyDetails.objects.first()
+        policy.first_buy_point += Decimal('0.01')
+        policy.save()
+        self.assertNotEqual(result_cache.data_version(canonical), version)
+    
+    def test_inflight(self):
+        """执行中登记只能由持有者清除"""
+        self.assertEqual(result_cache.claim_inflight('abc', 'task-1'), 'task-1')
+        self.assertEqual(result_cache.claim_inflight('abc', 'task-2'), 'task-1')
+        result_cache.release_inflight('abc', 'task-2')
+        self.assertEqual(result_cache.claim_inflight('abc', 'task-3'), 'task-1')
+        result_cache.release_inflight('abc', 'task-1')
+        self.assertEqual(result_cache.claim_inflight('abc', 'task-3'), 'task-3')
+        result_cache.release_inflight('abc', 'task-3')
+
+
+class FeedFramesTest(TestCase):
+    """Backtrader 数据源构建与复用测试"""
+    
+    def setUp(self):
+        """两只股票 5 个交易日的行情，其中一只停牌一天"""
+        rows = []
+        for n, code in enumerate(['000001.SZ', '600000.SH']):
+            for i in range(5):
+                if n == 1 and i == 2:
+                    continue  # 停牌
+                close = 10 + n + i
+                rows.append((code, date(2024, 1, 1) + timedelta(days=i), close - 0.5, close + 0.5, close - 1, close, 100 * (i + 1)))
+        self.fields = ('open', 'high', 'low', 'close', 'volume')
+        self.panel = PricePanel.from_rows(rows, self.fields)
+        self.frame = pd.DataFrame(rows, columns=['stock_id', 'trade_date', *self.fields])
+        self.frame['trade_date'] = pd.to_datetime(self.frame['trade_date'])
+    
+    def test_split_panel_and_frame(self):
+        """测试面板与 DataFrame 拆分结果一致，且使用真实开盘价"""
+        from_panel = split_feed_frames(self.panel, date(2024, 1, 2), date(2024, 1, 31))
+        from_frame = split_feed_frames(self.frame, date(2024, 1, 2), date(2024, 1, 31))
+        
+        self.assertEqual(list(from_panel), ['000001.SZ', '600000.SH'])
+        for code in from_panel:
+            pd.testing.assert_frame_equal(from_panel[code], from_frame[code])
+        feed = from_panel['600000.SH']
+        self.assertEqual(feed.index.strftime('%Y-%m-%d').tolist(), ['2024-01-02', '2024-01-04', '2024-01-05'])
+        self.assertEqual(feed['open'].tolist(), [11.5, 13.5, 14.5])
+        self.assertEqual(feed['volume'].tolist(), [200.0, 400.0, 500.0])
+    
+    def test_pool_reuse(self):
+        """测试归还后的数据源在同一数据版本下复用，版本变化后清空旧数据源并重新构建"""
+        pool = FeedPool(capacity=10)
+        loads = []
+        
+        def loader(codes):
+            loads.append(list(codes))
+            return self.panel
+        
+        args = (['000001.SZ', '600000.SH', '999999.SH'], date(2024, 1, 1), date(2024, 1, 31))
+        first = pool.checkout(loader, *args, version=1)
+        self.assertEqual(list(first), ['000001.SZ', '600000.SH'])
+        pool.checkin(first)
+        
+        second = pool.checkout(loader, *args, version=1)
+        self.assertIs(second['000001.SZ'], first['000001.SZ'])
+        self.assertEqual(loads, [['000001.SZ', '600000.SH', '999999.SH'], ['999999.SH']])
+        pool.checkin(second)
+        
+        third = pool.checkout(loader, *args, version=2)
+        self.assertIsNot(third['000001.SZ'], first['000001.SZ'])
+        # 版本变化时清空池，旧版本的数据源归还后也不再保留
+        self.assertEqual(len(pool._feeds), 0)
+        pool.checkin(second)
+        self.assertEqual(len(pool._feeds), 0)
+        pool.checkin(third)
+        self.assertEqual(len(pool._feeds), 2)
+    
+    def test_pool_disabled_by_default(self):
+        """测试默认配置（BACKTEST_FEED_POOL_SIZE=0）下不保留数据源"""
+        pool = FeedPool()
+        with override_settings(BACKTEST_FEED_POOL_SIZE=0):
+            feeds = pool.checkout(lambda codes: self.panel, ['000001.SZ'], date(2024, 1, 1), date(2024, 1, 31), version=1)
+            pool.checkin(feeds)
+        self.assertEqual(len(pool._feeds), 0)
+
+
+class OracleDataWindowsTest(TestCase):
+    """批量窗口加载与逐只加载结果一致"""
+    
+    def setUp(self):
+        """两只股票 80 个交易日的随机日线"""
+        rng = random.Random(3)
+        days = [d.date() for d in pd.bdate_range('2024-01-02', periods=80)]
+        for ts_code in ('000001.SZ', '600000.SH'):
+            stock = Code.objects.create(
+                ts_code=ts_code, symbol=ts_code[:6], name=ts_code, list_date=date(2000, 1, 1), list_status='L'
+            )
+            close = 10.0
+            bars = []
+            for trade_date in days:
+                close = round(close * (1.1 if rng.random() < 0.2 else rng.uniform(0.95, 1.05)), 2)
+                bars.append(StockDailyData(
+                    stock=stock, trade_date=trade_date, open=close, high=round(close * 1.02, 2),
+                    low=round(close * 0.98, 2), close=close, volume=rng.randint(1000, 9999), amount=0
+                ))
+            StockDailyData.objects.bulk_create(bars)
+    
+    def test_windows_match_single_queries(self):
+        """批量区间查询与逐只股票查询的日线窗口一致"""
+        service = OracleDataService()
+        requests = [
+            ('000001.SZ', date(2024, 2, 1)),
+            ('600000.SH', '2024-03-01'),
+            ('000001.SZ', date(2024, 4, 1)),
+            ('999999.SH', date(2024, 2, 1)),
+        ]
+        windows = service.get_stock_daily_windows(requests, days_before=25, days_after=40)
+        
+        self.assertIsNone(windows[3])
+        for (stock_id, anchor_date), arrays in zip(requests[:3], windows):
+            expected = service.get_stock_daily_data(stock_id, anchor_date, days_before=25, days_after=40)
+            self.assertEqual(list(arrays), ['trade_date'] + list(expected.columns))
+            self.assertTrue(np.array_equal(arrays['trade_date'], expected.index.to_numpy()))
+            for column in expected.columns:
+                self.assertTrue(np.array_equal(arrays[column], expected[column].to_numpy()), column)
+
+
+class LimitBreakParallelTest(TestCase):
+    """连续涨停策略：进程池并行与串行结果一致"""
+    
+    PARAMS = {
+        'initial_capital': 1000000.0,
+        'commission': 0.001,
+        'profit_target': 0.10,
+        'stop_loss': 0.05,
+        'max_hold_days': 30,
+        'lookback_days': 15,
+        'max_wait_days': 100,
+        'position_pct': 0.02,
+    }
+    
+    @staticmethod
+    def make_frame(seed, n_days=160):
+        """随机行情，约四分之一的交易日涨停"""
+        rng = np.random.default_rng(seed)
+        returns = rng.normal(0, 0.03, n_days)
+        up_limit = rng.random(n_days) < 0.25
+        returns[up_limit] = 0.1
+        close = 10 * np.cumprod(1 + returns)
+        open_ = close * (1 + rng.normal(0, 0.02, n_days))
+        open_[up_limit] = close[up_limit] / 1.1 * 1.02
+        return pd.DataFrame({
+            'open': open_,
+            'high': np.maximum(open_, close) * 1.01,
+            'low': np.minimum(open_, close) * 0.97,
+            'close': close,
+            'volume': 1e6,
+            'up_limit': up_limit.astype(float),
+        }, index=pd.bdate_range('2024-01-02', periods=n_days))
+    
+    def test_parallel_matches_serial(self):
+        """进程池并行回测与串行回测的结果一致"""
+        tasks = [(f'S{seed:02d}', frame_to_arrays(self.make_frame(seed))) for seed in range(14, 24)]
+        serial = list(run_stocks(iter(tasks), self.PARAMS, workers=1))
+        parallel = list(run_stocks(iter(tasks), self.PARAMS, workers=2))
+        
+        self.assertGreater(sum(len(trades) for _, trades, _, _ in serial), 0)
+        self.assertEqual(parallel, serial)
+    
+    def test_resolve_workers_clamped(self):
+        """进程数不超过 BACKTEST_MAX_WORKERS，请求超过上限时校验失败"""
+        with override_settings(BACKTEST_WORKERS=8, BACKTEST_MAX_WORKERS=2):
+            self.assertEqual(resolve_workers(None), 2)
+            self.assertEqual(resolve_workers(64), 2)
+            self.assertEqual(resolve_workers(0), min(os.cpu_count() or 1, 2))
+            self.assertEqual(resolve_workers(1), 1)
+        
+        field = BacktestParamsSerializer().fields['workers']
+        self.assertEqual(field.max_value, settings.BACKTEST_MAX_WORKERS)
+
+
 def run_manual_test():
     """手动测试函数"""
     from django.core.management import call_command
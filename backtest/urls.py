@@ -1,5 +1,8 @@
 from django.urls import path
-from .views import PortfolioBacktestResultListView, BatchPortfolioBacktestView, TradeLogListView, PortfolioBacktestDeleteView
+from .views import (
+    PortfolioBacktestResultListView, BatchPortfolioBacktestView, TradeLogListView, PortfolioBacktestDeleteView,
+    ParameterSweepView, ParameterSweepResultView, WalkForwardView, WalkForwardDetailView
+)
 
 app_name = 'backtest'
 
@@ -15,5 +18,13 @@ urlpatterns = [
     
     # 删除指定的回测记录
     path('portfolio/<int:backtest_id>/delete/', PortfolioBacktestDeleteView.as_view(), name='delete-backtest'),
+    
+    # 参数扫描：启动扫描、按指标排名查看结果
+    path('sweep/run/', ParameterSweepView.as_view(), name='run-parameter-sweep'),
+    path('sweep/<int:sweep_id>/results/', ParameterSweepResultView.as_view(), name='parameter-sweep-results'),
+    
+    # 滚动（walk-forward）回测：启动、查看窗口结果与样本外资产曲线
+    path('walk-forward/run/', WalkForwardView.as_view(), name='run-walk-forward'),
+    path('walk-forward/<int:walk_forward_id>/', WalkForwardDetailView.as_view(), name='walk-forward-detail'),
 ]
 
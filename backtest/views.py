@@ -3,9 +3,16 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import IsAuthenticated
-from .models import PortfolioBacktest, TradeLog
-from .serializers import BatchBacktestRequestSerializer, PortfolioBacktestSerializer, TradeLogSerializer
-from .tasks import run_portfolio_backtest
+from decimal import Decimal
+from celery.utils import uuid
+from .models import ParameterSweep, PortfolioBacktest, TradeLog, WalkForwardRun
+from .serializers import (
+    BatchBacktestRequestSerializer, ParameterSweepRequestSerializer, ParameterSweepSerializer,
+    PortfolioBacktestSerializer, TradeLogSerializer, WalkForwardRequestSerializer, WalkForwardRunSerializer
+)
+from .services import result_cache
+from .services.parameter_sweep_service import DEFAULT_RANKING, SWEEP_METRICS, ParameterSweepService
+from .tasks import run_parameter_sweep, run_portfolio_backtest, run_walk_forward
 
 class PortfolioBacktestResultListView(ListAPIView):
     """获取所有组合回测结果的列表视图。"""
@@ -17,6 +24,9 @@ class PortfolioBacktestResultListView(ListAPIView):
 class BatchPortfolioBacktestView(APIView):
     """
     执行新的、基于投资组合的批量回测任务。
+
+    相同请求（引擎、参数、日期区间与数据版本均相同）已有结果时直接返回结果ID；
+    相同请求正在执行时返回该任务的ID，不重复启动任务。
     """
     permission_classes = [IsAuthenticated]
     def post(self, request, *args, **kwargs):
@@ -28,10 +38,34 @@ class BatchPortfolioBacktestView(APIView):
         filters = validated_data['filters']
         backtest_params = validated_data['backtest_params']
 
+        task_id = uuid()
+        request_hash = None
+        canonical = result_cache.canonical_request(filters, backtest_params)
+        version = result_cache.data_version(canonical)
+        if version is not None:
+            request_hash = result_cache.request_hash(canonical, version)
+            cached = result_cache.find_result(request_hash)
+            if cached is not None:
+                return Response(
+                    {"message": "相同回测已有结果", "result_id": cached.id, "request_hash": request_hash, "cached": True},
+                    status=status.HTTP_200_OK
+                )
+            owner = result_cache.claim_inflight(request_hash, task_id)
+            if owner is not None and owner != task_id:
+                return Response(
+                    {"message": "相同回测正在执行", "task_id": owner, "request_hash": request_hash, "cached": False},
+                    status=status.HTTP_202_ACCEPTED
+                )
+
         # 启动新的组合回测任务
-        task = run_portfolio_backtest.delay(
-            filters=filters,
-            backtest_params=backtest_params
+        task = run_portfolio_backtest.apply_async(
+            kwargs={
+                'filters': filters,
+                'backtest_params': backtest_params,
+                'request_hash': request_hash,
+                'data_version': version,
+            },
+            task_id=task_id
         )
 
         return Response(
@@ -72,3 +106,142 @@ class PortfolioBacktestDeleteView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+
+class ParameterSweepView(APIView):
+    """
+    启动参数扫描（网格搜索）任务：数据只加载一次，全部参数组合并行回测，只保存各组合的汇总指标。
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = ParameterSweepRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        param_grid = data['param_grid']
+        total_combinations = 1
+        for values in param_grid.values():
+            total_combinations *= len(values)
+
+        sweep = ParameterSweep.objects.create(
+            strategy_name=data['strategy_name'],
+            strategy_type=data['strategy_type'],
+            start_date=data['start_date'],
+            end_date=data['end_date'],
+            initial_capital=Decimal(str(data['total_capital'])),
+            param_grid=param_grid,
+            options={
+                'commission': data['commission'],
+                'data_source': data['data_source'],
+                'db_alias': data['db_alias'],
+                'workers': data.get('workers'),
+            },
+            total_combinations=total_combinations,
+        )
+        task = run_parameter_sweep.delay(sweep.id)
+        sweep.task_id = task.id
+        sweep.save(update_fields=['task_id'])
+
+        return Response(
+            {
+                "message": "参数扫描任务已启动",
+                "task_id": task.id,
+                "sweep_id": sweep.id,
+                "param_grid": param_grid,
+                "total_combinations": total_combinations,
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+class ParameterSweepResultView(APIView):
+    """
+    获取参数扫描结果，按指标排名。
+
+    查询参数:
+        order_by: 逗号分隔的排序指标，前缀 '-' 表示从高到低，默认 -total_return,-max_drawdown,-win_rate
+                  （max_drawdown 为负数，越接近 0 越好）
+        limit: 最多返回条数
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, sweep_id, *args, **kwargs):
+        try:
+            sweep = ParameterSweep.objects.get(id=sweep_id)
+        except ParameterSweep.DoesNotExist:
+            return Response({"error": "参数扫描记录不存在"}, status=status.HTTP_404_NOT_FOUND)
+
+        order_by = request.query_params.get('order_by')
+        order_by = [key.strip() for key in order_by.split(',') if key.strip()] if order_by else list(DEFAULT_RANKING)
+        invalid = [key for key in order_by if key.lstrip('-') not in SWEEP_METRICS]
+        if invalid:
+            return Response(
+                {"error": f"无效的排序指标: {', '.join(invalid)}，可选: {', '.join(SWEEP_METRICS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        limit = request.query_params.get('limit')
+        try:
+            limit = int(limit) if limit else None
+        except ValueError:
+            return Response({"error": "limit 必须是整数"}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = ParameterSweepSerializer(sweep).data
+        data['order_by'] = order_by
+        data['results'] = ParameterSweepService.rank_results(sweep.results, order_by, limit)
+        return Response(data)
+
+
+class WalkForwardView(APIView):
+    """
+    启动滚动（walk-forward）回测：样本内扫描参数、样本外应用最优参数，拼接样本外资产曲线。
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = WalkForwardRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        run = WalkForwardRun.objects.create(
+            strategy_name=data['strategy_name'],
+            strategy_type=data['strategy_type'],
+            start_date=data['start_date'],
+            end_date=data['end_date'],
+            initial_capital=Decimal(str(data['total_capital'])),
+            param_grid=data['param_grid'],
+            in_sample_days=data['in_sample_days'],
+            out_of_sample_days=data['out_of_sample_days'],
+            objective=data['objective'],
+            options={
+                'db_alias': data['db_alias'],
+                'workers': data.get('workers'),
+            },
+        )
+        task = run_walk_forward.delay(run.id)
+        run.task_id = task.id
+        run.save(update_fields=['task_id'])
+
+        return Response(
+            {
+                "message": "滚动回测任务已启动",
+                "task_id": task.id,
+                "walk_forward_id": run.id,
+                "param_grid": data['param_grid'],
+            },
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+class WalkForwardDetailView(APIView):
+    """获取滚动回测的各窗口结果与拼接后的样本外资产曲线"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, walk_forward_id, *args, **kwargs):
+        try:
+            run = WalkForwardRun.objects.get(id=walk_forward_id)
+        except WalkForwardRun.DoesNotExist:
+            return Response({"error": "滚动回测记录不存在"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(WalkForwardRunSerializer(run).data)
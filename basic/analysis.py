@@ -4,6 +4,70 @@ from basic.models import StockDailyData, PolicyDetails
 from django.db import transaction
 from datetime import datetime, timedelta
 from decimal import Decimal
+from basic.services.market_data import chunked, load_bars_frame
+from basic.services.price_panel import PricePanel
+from basic.services.strategy_rollup_service import StrategyRollupService
+from basic.services.data_version import SIGNALS, bump_version_on_commit
+
+
+def bulk_save_signals(signals, db_alias='default'):
+    """批量保存策略信号
+    
+    先按 (股票, 日期, 策略类型) 过滤掉已存在的信号，再 bulk_create 写入，
+    并登记到策略统计汇总、递增信号数据版本号（bulk_create 不触发模型信号）。
+    
+    Args:
+        signals (list): 信号字典列表，stock 为股票代码
+        db_alias (str): 数据库别名
+        
+    Returns:
+        int: 新写入的信号数量
+    """
+    if not signals:
+        return 0
+
+    stock_codes = sorted({signal['stock'] for signal in signals})
+    strategy_types = {signal['strategy_type'] for signal in signals}
+    dates = [signal['date'] for signal in signals]
+
+    existing = set()
+    for chunk in chunked(stock_codes):
+        existing.update(
+            PolicyDetails.objects.using(db_alias).filter(
+                stock_id__in=chunk,
+                strategy_type__in=strategy_types,
+                date__range=[min(dates), max(dates)]
+            ).values_list('stock_id', 'date', 'strategy_type')
+        )
+
+    def to_decimal(value):
+        return Decimal(str(round(float(value), 2)))
+
+    objects = []
+    for signal in signals:
+        key = (signal['stock'], signal['date'], signal['strategy_type'])
+        if key in existing:
+            continue
+        existing.add(key)
+        objects.append(PolicyDetails(
+            stock_id=signal['stock'],
+            date=signal['date'],
+            first_buy_point=to_decimal(signal['first_buy_point']),
+            second_buy_point=to_decimal(signal['second_buy_point']) if signal.get('second_buy_point') is not None else None,
+            stop_loss_point=to_decimal(signal['stop_loss_point']),
+            take_profit_point=to_decimal(signal['take_profit_point']),
+            strategy_type=signal['strategy_type'],
+            signal_strength=to_decimal(signal.get('signal_strength', 0.8)),
+        ))
+
+    with transaction.atomic(using=db_alias):
+        PolicyDetails.objects.using(db_alias).bulk_create(objects, batch_size=500)
+        StrategyRollupService(db_alias).apply_created(objects)
+        if objects:
+            bump_version_on_commit(SIGNALS, db_alias)
+
+    return len(objects)
+
 
 class TechnicalAnalysis:
     @staticmethod
@@ -12,40 +76,92 @@ class TechnicalAnalysis:
         return data['close'].rolling(window=period).mean()
 
     @staticmethod
-    def generate_signals(stock_code, start_date, end_date):
+    def generate_signals(stock_code, start_date, end_date, short_window=5, long_window=10):
         """生成交易信号"""
-        daily_data = StockDailyData.objects.filter(
-            stock__ts_code=stock_code,
-            trade_date__range=[start_date, end_date]
-        ).order_by('trade_date')
-        
-        # 将数据转换为DataFrame进行分析
-        df = pd.DataFrame(list(daily_data.values()))
-        
-        # 计算技术指标
-        df['MA5'] = TechnicalAnalysis.calculate_ma(df, 5)
-        df['MA10'] = TechnicalAnalysis.calculate_ma(df, 10)
+        return TechnicalAnalysis.generate_market_signals(
+            start_date, end_date,
+            stock_codes=[stock_code],
+            short_window=short_window,
+            long_window=long_window,
+            lookback=False
+        )
+
+    @staticmethod
+    def generate_market_signals(start_date, end_date, stock_codes=None,
+                                short_window=5, long_window=10, lookback=True):
+        """全市场向量化生成均线金叉信号
         
-        # 生成交易信号
-        signals = []
-        for index, row in df.iterrows():
-            if index < 1:
-                continue
-                
-            # 示例：当5日均线上穿10日均线时产生买入信号
-            if (df['MA5'][index-1] <= df['MA10'][index-1] and 
-                df['MA5'][index] > df['MA10'][index]):
-                signals.append({
-                    'stock': stock_code,
-                    'date': row['trade_date'],
-                    'first_buy_point': row['close'],
-                    'stop_loss_point': row['low'] * 0.95,
-                    'take_profit_point': row['close'] * 1.1,
-                    'strategy_type': 'MA_CROSS',
-                    'signal_strength': 0.8
-                })
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+            stock_codes (list, optional): 股票代码列表，为空表示全市场
+            short_window (int): 短期均线周期
+            long_window (int): 长期均线周期
+            lookback (bool): 是否向前多加载数据用于计算均线（单日扫描时需要）
+            
+        Returns:
+            list: 交易信号列表（按股票、日期排序）
+            
+        功能说明：
+        短期均线由下方（含相等）上穿长期均线时产生买入信号，
+        均线按股票分组滚动计算，交叉用分组 shift 的布尔掩码判断。
+        """
+        if short_window >= long_window:
+            raise ValueError("短期均线周期必须小于长期均线周期")
+
+        start = pd.Timestamp(start_date)
+        load_start = start - timedelta(days=long_window * 3) if lookback else start
+        df = load_bars_frame(stock_codes, load_start.date(), end_date, fields=('low', 'close'))
+        if df.empty:
+            return []
+
+        stocks = df['stock_id']
+        close_by_stock = df['close'].groupby(stocks, sort=False)
+
+        def moving_average(window):
+            result = close_by_stock.rolling(window=window).mean()
+            return result.reset_index(level=0, drop=True).sort_index()
+
+        ma_short = moving_average(short_window)
+        ma_long = moving_average(long_window)
+        prev_short = ma_short.groupby(stocks, sort=False).shift(1)
+        prev_long = ma_long.groupby(stocks, sort=False).shift(1)
+
+        # NaN 参与比较均为 False，与逐行判断一致
+        mask = (prev_short <= prev_long) & (ma_short > ma_long) & (df['trade_date'] >= start)
+        hits = df[mask]
+
+        return [
+            {
+                'stock': stock_code,
+                'date': trade_date.date(),
+                'first_buy_point': close,
+                'stop_loss_point': low * 0.95,
+                'take_profit_point': close * 1.1,
+                'strategy_type': 'MA_CROSS',
+                'signal_strength': 0.8
+            }
+            for stock_code, trade_date, close, low in zip(
+                hits['stock_id'], hits['trade_date'], hits['close'], hits['low']
+            )
+        ]
+
+    @staticmethod
+    def scan_market(start_date, end_date, stock_codes=None, short_window=5, long_window=10):
+        """全市场均线金叉扫描并批量保存信号
         
-        return signals 
+        Returns:
+            dict: 信号数量和新写入数量
+        """
+        signals = TechnicalAnalysis.generate_market_signals(
+            start_date, end_date,
+            stock_codes=stock_codes,
+            short_window=short_window,
+            long_window=long_window
+        )
+        created = bulk_save_signals(signals)
+        return {'signals': len(signals), 'created': created}
+
 
 class ContinuousLimitStrategy:
     """连续涨停策略分析类
@@ -65,38 +181,23 @@ class ContinuousLimitStrategy:
         self.SUCCESS_PROFIT_THRESHOLD = 0.075  # 成功盈利阈值
         self.TAKE_PROFIT_MULTIPLIER = 1.075  # 止盈倍数
 
-    def is_limit_up(self, row):
-        """判断是否涨停
-        
-        Args:
-            row (dict): 包含股票价格数据的字典
-            
-        Returns:
-            bool: True表示涨停，False表示非涨停
-        """
-        return (row['close'] - row['pre_close']) / row['pre_close'] >= self.LIMIT_UP_THRESHOLD
-
-    def is_negative_day(self, row):
-        """判断是否收阴"""
-        return row['close'] < row['open']
-
-    def calculate_buy_points(self, data):
-        """计算买点价格
+    @staticmethod
+    def calculate_buy_points(highest, lowest):
+        """根据信号前区间的最高价、最低价计算关键价格点位
         
         Args:
-            data (DataFrame): 包含历史价格数据的DataFrame
+            highest: 区间最高价（标量或按信号对齐的 Series）
+            lowest: 区间最低价（同上）
             
         Returns:
             dict: 包含各个关键价格点位的字典
             {
-                'first_buy_point': float,  # 第一买点
-                'second_buy_point': float, # 第二买点
-                'stop_loss_point': float,  # 止损点
-                'take_profit_point': float # 止盈点
+                'first_buy_point': 第一买点,
+                'second_buy_point': 第二买点,
+                'stop_loss_point': 止损点,
+                'take_profit_point': 止盈点
             }
         """
-        highest = data['high'].max()
-        lowest = data['low'].min()
         return {
             'first_buy_point': highest,
             'second_buy_point': (highest + lowest) / 2,
@@ -114,56 +215,90 @@ class ContinuousLimitStrategy:
             
         Returns:
             list: 包含交易信号的列表
+        """
+        return self.analyze_market(start_date, end_date, stock_codes=[stock_code])
+
+    def analyze_market(self, start_date, end_date, stock_codes=None):
+        """全市场向量化分析交易信号
+        
+        Args:
+            start_date (str): 开始日期
+            end_date (str): 结束日期
+            stock_codes (list, optional): 股票代码列表，为空表示全市场
+            
+        Returns:
+            list: 包含交易信号的列表（按股票、日期排序）
             
         功能说明：
-        1. 获取指定日期范围内的股票数据
-        2. 寻找符合策略条件的交易信号：
-           - 连续两天涨停
-           - 之后连续两天收阴
-           - 前10天内无涨停
-        3. 计算相关价格点位
+        1. 一次查询加载全部股票的日线面板（按股票、日期排序）
+        2. 在面板上按股票分组计算：
+           - 涨停标记：收盘价相对前一日收盘价（分组 shift）的涨幅达到阈值
+           - 连续两天涨停，之后连续两天收阴
+           - 前10天内无涨停：涨停标记的10日滚动求和（向后错开2天）为0
+        3. 买点取信号日前第2~4个交易日的最高价/最低价（3日滚动极值向后错开2天）
         """
-        daily_data = StockDailyData.objects.filter(
-            stock__ts_code=stock_code,
-            trade_date__range=[start_date, end_date]
-        ).order_by('trade_date')
-        
-        df = pd.DataFrame(list(daily_data.values()))
-        if len(df) < 12:  # 确保有足够的数据进行分析
+        df = load_bars_frame(stock_codes, start_date, end_date, fields=('open', 'high', 'low', 'close'))
+        if df.empty:
+            return []
+
+        stocks = df['stock_id']
+        grouped = df.groupby(stocks, sort=False)
+
+        prev_close = grouped['close'].shift(1)
+        limit_up = ((df['close'] - prev_close) / prev_close >= self.LIMIT_UP_THRESHOLD).fillna(False)
+        negative = df['close'] < df['open']
+
+        def shift(series, periods):
+            return series.groupby(stocks, sort=False).shift(periods)
+
+        def rolling(series, window, func):
+            result = getattr(series.groupby(stocks, sort=False).rolling(window, min_periods=1), func)()
+            return result.reset_index(level=0, drop=True).sort_index()
+
+        position = grouped.cumcount()
+        size = grouped['close'].transform('size')
+
+        # 前10天（信号日前第2~11个交易日）涨停次数
+        prior_limit_ups = shift(rolling(limit_up.astype(int), 10, 'sum'), 2)
+
+        mask = (
+            limit_up
+            & shift(limit_up, 1).fillna(False).astype(bool)
+            & shift(negative, -1).fillna(False).astype(bool)
+            & shift(negative, -2).fillna(False).astype(bool)
+            & (prior_limit_ups == 0)
+            & (position >= 2)
+            & (position <= size - 3)
+            & (size >= 12)  # 确保有足够的数据进行分析
+        )
+        if not mask.any():
             return []
 
+        points = self.calculate_buy_points(
+            shift(rolling(df['high'], 3, 'max'), 2)[mask],
+            shift(rolling(df['low'], 3, 'min'), 2)[mask]
+        )
+        hits = df.loc[mask, ['stock_id', 'trade_date']]
+
         signals = []
-        for i in range(2, len(df)-2):
-            # 检查连续两天涨停
-            if (self.is_limit_up(df.iloc[i]) and 
-                self.is_limit_up(df.iloc[i-1])):
-                
-                # 检查之后是否出现连续两天收阴
-                if (self.is_negative_day(df.iloc[i+1]) and 
-                    self.is_negative_day(df.iloc[i+2])):
-                    
-                    # 检查前10天是否有涨停
-                    previous_10_days = df.iloc[i-11:i-1]
-                    has_limit_up = any(self.is_limit_up(row) for _, row in previous_10_days.iterrows())
-                    
-                    if not has_limit_up:
-                        # 分析前3天非涨停的数据
-                        buy_points = self.calculate_buy_points(df.iloc[i-4:i-1])
-                        signals.append({
-                            'stock': stock_code,
-                            'date': df.iloc[i]['trade_date'],
-                            **buy_points,
-                            'strategy_type': 'CONTINUOUS_LIMIT_UP',
-                            'signal_strength': 0.9
-                        })
-        
+        for stock_code, trade_date, *values in zip(hits['stock_id'], hits['trade_date'], *points.values()):
+            signals.append({
+                'stock': stock_code,
+                'date': trade_date.date(),
+                **dict(zip(points, values)),
+                'strategy_type': 'CONTINUOUS_LIMIT_UP',
+                'signal_strength': 0.9
+            })
+
         return signals
 
     def save_signals(self, signals):
-        """保存信号到数据库"""
-        with transaction.atomic():
-            for signal in signals:
-                PolicyDetails.objects.create(**signal)
+        """保存信号到数据库（批量写入，已存在的信号跳过）
+        
+        Returns:
+            int: 新写入的信号数量
+        """
+        return bulk_save_signals(signals)
 
     def update_historical_signals(self, days=30):
         """更新历史信号状态
@@ -178,33 +313,41 @@ class ContinuousLimitStrategy:
         4. 更新止盈价格
         """
         cutoff_date = datetime.now() - timedelta(days=days)
-        signals = PolicyDetails.objects.filter(
+        signals = list(PolicyDetails.objects.filter(
             date__gte=cutoff_date,
             strategy_type='龙回头'
+        ))
+        if not signals:
+            return
+
+        # 一次加载全部相关股票自最早信号日以来的行情，替代逐信号查询
+        panel = PricePanel.load(
+            {signal.stock_id for signal in signals},
+            start_date=min(signal.date for signal in signals),
+            fields=('low', 'close')
         )
 
         for signal in signals:
             # 获取买点后的价格数据
-            subsequent_data = StockDailyData.objects.filter(
-                stock=signal.stock,
-                trade_date__gt=signal.date
-            ).order_by('trade_date')
-
-            if not subsequent_data:
+            rows = panel.stock_rows(signal.stock_id)
+            rows = rows[panel.days[rows] > np.datetime64(signal.date)]
+            if not len(rows):
                 continue
+            stock_idx = panel.code_index[signal.stock_id]
 
             # 初始化变量
             holding_price = Decimal('0')
-            latest_close = Decimal(str(subsequent_data.latest('trade_date').close))
+            latest_close = Decimal(str(panel.close[rows[-1], stock_idx]))
 
-            # 遍历后续数据计算持仓价格
-            for data in subsequent_data:
-                if Decimal(str(data.low)) <= signal.first_buy_point:
-                    if Decimal(str(data.low)) > signal.second_buy_point:
-                        holding_price = signal.first_buy_point
-                    else:
-                        holding_price = (signal.first_buy_point + signal.second_buy_point) / Decimal('2')
-                    break
+            # 第一个触及第一买点的交易日决定持仓价格
+            lows = panel.low[rows, stock_idx]
+            touched = np.flatnonzero(lows <= float(signal.first_buy_point))
+            if len(touched):
+                low = Decimal(str(lows[touched[0]]))
+                if low > signal.second_buy_point:
+                    holding_price = signal.first_buy_point
+                else:
+                    holding_price = (signal.first_buy_point + signal.second_buy_point) / Decimal('2')
 
             # 如果已经有持仓价格，更新相关数据
             if holding_price > Decimal('0'):
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BasicConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'basic'
+
+    def ready(self):
+        # 注册模型信号（策略统计汇总增量维护）
+        from . import signals  # noqa: F401
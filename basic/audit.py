@@ -0,0 +1,154 @@
+"""
+浏览记录（审计日志）异步批量写入
+
+中间件只把事件放入进程内环形缓冲区，后台线程每积累 batch_size 条或每隔 flush_interval
+毫秒用 bulk_create 批量写入 BrowseRecord，请求路径上不再有数据库往返。
+缓冲区满时丢弃最旧的事件并计数；指标按进程统计（每个 worker 进程各有一个缓冲区）。
+"""
+from collections import deque
+from typing import Dict, Optional
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class AuditBuffer:
+    """审计事件环形缓冲区与后台批量写入器
+
+    Args:
+        capacity: 缓冲区容量，满时丢弃最旧的事件
+        batch_size: 每次 bulk_create 的最大条数，积累到该数量时立即唤醒写入线程
+        flush_interval_ms: 定时写入间隔（毫秒）
+        autostart: 首次写入事件时是否自动启动后台线程；为 False 时由调用方负责 flush
+    """
+
+    def __init__(self, capacity: int = 10000, batch_size: int = 200,
+                 flush_interval_ms: int = 1000, autostart: bool = True):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.autostart = autostart
+
+        self._events = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self.received = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_at = None
+
+    def push(self, event: Dict):
+        """放入一条事件（不访问数据库）"""
+        with self._lock:
+            if len(self._events) >= self.capacity:
+                self.dropped += 1
+            self._events.append(event)
+            self.received += 1
+            full = len(self._events) >= self.batch_size
+        if self.autostart:
+            self._ensure_started()
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """把缓冲区中的事件全部写入数据库，返回写入条数"""
+        from .models import BrowseRecord
+
+        total = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    count = min(len(self._events), self.batch_size)
+                    batch = [self._events.popleft() for _ in range(count)]
+                if not batch:
+                    break
+                try:
+                    BrowseRecord.objects.bulk_create([BrowseRecord(**event) for event in batch])
+                    total += len(batch)
+                    with self._lock:
+                        self.written += len(batch)
+                except Exception as e:
+                    # 写入失败的批次直接丢弃，避免反复重试阻塞后续事件
+                    with self._lock:
+                        self.failed += len(batch)
+                    logger.error(f"浏览记录批量写入失败 ({len(batch)} 条): {str(e)}")
+                    break
+            with self._lock:
+                self.flushes += 1
+                self.last_flush_at = time.time()
+        return total
+
+    def metrics(self) -> Dict:
+        """缓冲区深度、丢弃数等指标（当前进程）"""
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'depth': len(self._events),
+                'capacity': self.capacity,
+                'batch_size': self.batch_size,
+                'flush_interval_ms': int(self.flush_interval * 1000),
+                'received': self.received,
+                'dropped': self.dropped,
+                'written': self.written,
+                'failed': self.failed,
+                'flushes': self.flushes,
+                'last_flush_at': self.last_flush_at,
+                'flusher_alive': bool(self._thread and self._thread.is_alive() and self._pid == os.getpid()),
+            }
+
+    def _ensure_started(self):
+        # fork 出的子进程（gunicorn / celery worker）需要重新启动自己的写入线程
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"浏览记录写入线程异常: {str(e)}")
+            finally:
+                close_old_connections()
+
+
+_buffer: Optional[AuditBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_audit_buffer() -> AuditBuffer:
+    """进程内共享的审计缓冲区（参数来自 settings.AUDIT_*）"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = AuditBuffer(
+                    capacity=getattr(settings, 'AUDIT_BUFFER_SIZE', 10000),
+                    batch_size=getattr(settings, 'AUDIT_BATCH_SIZE', 200),
+                    flush_interval_ms=getattr(settings, 'AUDIT_FLUSH_INTERVAL_MS', 1000),
+                    autostart=getattr(settings, 'AUDIT_ASYNC', True),
+                )
+                # 进程正常退出时写入剩余事件
+                atexit.register(_buffer.flush)
+    return _buffer
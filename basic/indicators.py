@@ -0,0 +1,224 @@
+"""
+技术指标定义与注册表
+
+每个指标以状态机的方式逐日更新：update(state, bar) 只依赖上一交易日的状态和当日K线，
+时间复杂度 O(1)，状态可序列化为 JSON 持久化到 IndicatorState。
+"""
+from typing import Dict, List, Optional, Tuple
+
+
+class Indicator:
+    """技术指标基类
+
+    子类需实现：
+    - outputs: 输出值名称列表
+    - init_state(): 初始状态（JSON 可序列化）
+    - update(state, bar): 用当日K线更新状态，返回 (新状态, {输出名: 值})，预热期内不输出
+    """
+
+    key = ''
+    description = ''
+
+    @property
+    def outputs(self) -> List[str]:
+        return [self.key]
+
+    def init_state(self) -> Dict:
+        raise NotImplementedError
+
+    def update(self, state: Dict, bar: Dict) -> Tuple[Dict, Dict[str, float]]:
+        raise NotImplementedError
+
+    def describe(self) -> Dict:
+        return {
+            'key': self.key,
+            'description': self.description,
+            'outputs': self.outputs,
+            'params': {k: v for k, v in vars(self).items() if not k.startswith('_')},
+        }
+
+
+class SMA(Indicator):
+    """简单移动平均：保存窗口内收盘价和滚动和"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.key = f'SMA{period}'
+        self.description = f'{period}日简单移动平均'
+
+    def init_state(self):
+        return {'window': [], 'sum': 0.0}
+
+    def update(self, state, bar):
+        window = state['window']
+        window.append(bar['close'])
+        state['sum'] += bar['close']
+        if len(window) > self.period:
+            state['sum'] -= window.pop(0)
+        if len(window) < self.period:
+            return state, {}
+        return state, {self.key: state['sum'] / self.period}
+
+
+class EMA(Indicator):
+    """指数移动平均：以前 period 日的简单平均作为初值，之后递推"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.key = f'EMA{period}'
+        self.description = f'{period}日指数移动平均'
+
+    def init_state(self):
+        return {'count': 0, 'sum': 0.0, 'ema': None}
+
+    @staticmethod
+    def step(ema: Optional[float], count: int, total: float, value: float, period: int):
+        """EMA 单步递推，返回 (ema, count, total)；预热期内 ema 为 None"""
+        count += 1
+        if ema is None:
+            total += value
+            if count == period:
+                ema = total / period
+            return ema, count, total
+        alpha = 2 / (period + 1)
+        return ema + alpha * (value - ema), count, total
+
+    def update(self, state, bar):
+        state['ema'], state['count'], state['sum'] = self.step(
+            state['ema'], state['count'], state['sum'], bar['close'], self.period
+        )
+        if state['ema'] is None:
+            return state, {}
+        return state, {self.key: state['ema']}
+
+
+class RSI(Indicator):
+    """相对强弱指标（Wilder 平滑）"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.key = f'RSI{period}'
+        self.description = f'{period}日相对强弱指标（Wilder 平滑）'
+
+    def init_state(self):
+        return {'prev_close': None, 'count': 0, 'avg_gain': 0.0, 'avg_loss': 0.0}
+
+    def update(self, state, bar):
+        close = bar['close']
+        prev_close = state['prev_close']
+        state['prev_close'] = close
+        if prev_close is None:
+            return state, {}
+
+        change = close - prev_close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        state['count'] += 1
+        if state['count'] <= self.period:
+            # 预热期累加，满 period 个变化后取平均
+            state['avg_gain'] += gain / self.period
+            state['avg_loss'] += loss / self.period
+            if state['count'] < self.period:
+                return state, {}
+        else:
+            state['avg_gain'] = (state['avg_gain'] * (self.period - 1) + gain) / self.period
+            state['avg_loss'] = (state['avg_loss'] * (self.period - 1) + loss) / self.period
+
+        if state['avg_loss'] == 0:
+            return state, {self.key: 100.0}
+        rs = state['avg_gain'] / state['avg_loss']
+        return state, {self.key: 100 - 100 / (1 + rs)}
+
+
+class MACD(Indicator):
+    """MACD：快慢 EMA 之差及其信号线"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+        self.key = 'MACD'
+        self.description = f'MACD({fast},{slow},{signal})'
+
+    @property
+    def outputs(self):
+        return ['MACD', 'MACD_SIGNAL', 'MACD_HIST']
+
+    def init_state(self):
+        return {
+            'fast': [None, 0, 0.0],
+            'slow': [None, 0, 0.0],
+            'signal': [None, 0, 0.0],
+        }
+
+    def update(self, state, bar):
+        close = bar['close']
+        state['fast'] = list(EMA.step(*state['fast'], close, self.fast))
+        state['slow'] = list(EMA.step(*state['slow'], close, self.slow))
+        fast_ema, slow_ema = state['fast'][0], state['slow'][0]
+        if fast_ema is None or slow_ema is None:
+            return state, {}
+
+        macd = fast_ema - slow_ema
+        state['signal'] = list(EMA.step(*state['signal'], macd, self.signal))
+        signal = state['signal'][0]
+        if signal is None:
+            return state, {'MACD': macd}
+        return state, {'MACD': macd, 'MACD_SIGNAL': signal, 'MACD_HIST': macd - signal}
+
+
+class ATR(Indicator):
+    """平均真实波幅（Wilder 平滑）"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.key = f'ATR{period}'
+        self.description = f'{period}日平均真实波幅'
+
+    def init_state(self):
+        return {'prev_close': None, 'count': 0, 'atr': 0.0}
+
+    def update(self, state, bar):
+        prev_close = state['prev_close']
+        if prev_close is None:
+            true_range = bar['high'] - bar['low']
+        else:
+            true_range = max(bar['high'], prev_close) - min(bar['low'], prev_close)
+        state['prev_close'] = bar['close']
+
+        state['count'] += 1
+        if state['count'] <= self.period:
+            state['atr'] += true_range / self.period
+            if state['count'] < self.period:
+                return state, {}
+        else:
+            state['atr'] = (state['atr'] * (self.period - 1) + true_range) / self.period
+        return state, {self.key: state['atr']}
+
+
+# 指标注册表：key -> 指标定义
+INDICATORS: Dict[str, Indicator] = {}
+
+
+def register(indicator: Indicator) -> Indicator:
+    """注册指标定义"""
+    INDICATORS[indicator.key] = indicator
+    return indicator
+
+
+for _indicator in (SMA(5), SMA(10), SMA(20), SMA(60), EMA(12), EMA(26), RSI(14), MACD(), ATR(14)):
+    register(_indicator)
+
+
+def get_indicators(keys=None) -> List[Indicator]:
+    """按 key 获取指标定义，为空时返回全部已注册指标"""
+    if not keys:
+        return list(INDICATORS.values())
+    unknown = [key for key in keys if key not in INDICATORS]
+    if unknown:
+        raise ValueError(f"未注册的指标: {', '.join(unknown)}")
+    return [INDICATORS[key] for key in keys]
+
+
+def output_names(keys=None) -> List[str]:
+    """指标输出值名称列表"""
+    return [name for indicator in get_indicators(keys) for name in indicator.outputs]
@@ -0,0 +1,153 @@
+"""
+基于 Redis 的分布式锁
+
+- 获取：SET key token NX PX ttl，原子地创建带过期时间的锁，token 标识持有者
+- 释放 / 续期：Lua 脚本先比较 token 再 DEL / PEXPIRE，只能操作自己持有的锁
+- 心跳：持有期间后台线程每 ttl/3 续期一次，长任务不会中途丢锁；进程崩溃后锁在 ttl 内自动过期
+"""
+from typing import Optional
+import logging
+import threading
+import time
+import uuid
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 锁的默认过期时间（秒），持有期间由心跳续期
+DEFAULT_LOCK_TTL = 60
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis_client() -> redis.Redis:
+    """进程内共享的 Redis 客户端（连接 settings.REDIS_URL）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+class DistributedLock:
+    """Redis 分布式锁
+
+    用法：
+        with DistributedLock('daily_data_update') as lock:
+            if not lock.acquired:
+                return
+            ...
+
+    Args:
+        name: 锁名称
+        ttl: 锁过期时间（秒）
+        heartbeat: 持有期间是否自动续期
+        client: Redis 客户端，默认使用 get_redis_client()
+    """
+
+    def __init__(self, name: str, ttl: int = DEFAULT_LOCK_TTL, heartbeat: bool = True,
+                 client: Optional[redis.Redis] = None):
+        self.key = f'lock:{name}'
+        self.ttl_ms = int(ttl * 1000)
+        self.heartbeat = heartbeat
+        self.client = client or get_redis_client()
+        self.token = uuid.uuid4().hex
+        self.acquired = False
+        self.lost = False
+        self._release_script = self.client.register_script(RELEASE_SCRIPT)
+        self._renew_script = self.client.register_script(RENEW_SCRIPT)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def acquire(self, blocking: bool = False, timeout: Optional[float] = None) -> bool:
+        """
+        获取锁
+
+        Args:
+            blocking: 锁被占用时是否等待，默认立即返回
+            timeout: 等待的最长时间（秒），仅 blocking=True 时有效，None 表示一直等待
+
+        Returns:
+            bool: 是否获取成功
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        delay = 0.05
+        while True:
+            if self.client.set(self.key, self.token, nx=True, px=self.ttl_ms):
+                self.acquired = True
+                self.lost = False
+                if self.heartbeat:
+                    self._start_heartbeat()
+                return True
+            if not blocking:
+                return False
+            remaining = deadline - time.monotonic() if deadline is not None else delay
+            if remaining <= 0:
+                return False
+            # 指数退避，避免多个等待者频繁轮询
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 1.0)
+
+    def renew(self) -> bool:
+        """续期锁，锁已过期或被其他持有者占用时返回 False"""
+        return bool(self._renew_script(keys=[self.key], args=[self.token, self.ttl_ms]))
+
+    def release(self) -> bool:
+        """释放锁，只删除自己持有的锁"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if not self.acquired:
+            return False
+        self.acquired = False
+        try:
+            released = bool(self._release_script(keys=[self.key], args=[self.token]))
+        except redis.RedisError as e:
+            logger.error(f"释放锁 {self.key} 失败: {str(e)}")
+            return False
+        if not released:
+            logger.warning(f"锁 {self.key} 已过期或被其他任务持有，无需释放")
+        return released
+
+    def _start_heartbeat(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._heartbeat, name=f'{self.key}-heartbeat', daemon=True)
+        self._thread.start()
+
+    def _heartbeat(self):
+        interval = self.ttl_ms / 3000
+        while not self._stop.wait(interval):
+            try:
+                if not self.renew():
+                    self.lost = True
+                    logger.error(f"锁 {self.key} 续期失败：锁已过期或被其他任务持有")
+                    return
+            except redis.RedisError as e:
+                # 连接错误时保留锁，下一次心跳重试
+                logger.warning(f"锁 {self.key} 续期出错: {str(e)}")
+
+    def __enter__(self) -> 'DistributedLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
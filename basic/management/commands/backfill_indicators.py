@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from basic.services.indicator_service import IndicatorService
+
+
+class Command(BaseCommand):
+    help = '回放历史日线计算技术指标，可指定股票和指标。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stocks', help='股票代码，逗号分隔，不指定则为全部股票', required=False)
+        parser.add_argument('--indicators', help='指标 key，逗号分隔，不指定则为全部已注册指标', required=False)
+        parser.add_argument('--reset', action='store_true', help='清空已有状态和指标值后重算')
+
+    def handle(self, *args, **options):
+        stocks = [s.strip() for s in options['stocks'].split(',')] if options['stocks'] else None
+        keys = [k.strip() for k in options['indicators'].split(',')] if options['indicators'] else None
+
+        try:
+            service = IndicatorService(keys)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS('正在回放历史数据计算技术指标...'))
+        result = service.backfill(stocks, reset=options['reset'])
+        self.stdout.write(self.style.SUCCESS(
+            f"计算完成，股票 {result['stocks']} 只，写入指标值 {result['values']} 条。"
+        ))
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from basic.services.browse_analytics import BrowseAnalyticsService
+
+
+class Command(BaseCommand):
+    help = '按自然日分段清理保留期之前的浏览记录。'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='保留天数，默认使用 BROWSE_RECORD_RETENTION_DAYS 配置'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days'] or settings.BROWSE_RECORD_RETENTION_DAYS
+        if days <= 0:
+            raise CommandError('保留天数必须为正整数')
+
+        self.stdout.write(self.style.SUCCESS(f'正在清理 {days} 天之前的浏览记录...'))
+        deleted = BrowseAnalyticsService().purge(days)
+        self.stdout.write(self.style.SUCCESS(f'清理完成，共删除 {deleted} 条记录。'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from basic.services.strategy_rollup_service import StrategyRollupService
+from datetime import datetime
+
+
+class Command(BaseCommand):
+    help = '根据策略信号表重建策略统计汇总桶，可指定信号日期范围。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='信号开始日期 (YYYY-MM-DD)，不指定则不限', required=False)
+        parser.add_argument('--end-date', help='信号结束日期 (YYYY-MM-DD)，不指定则不限', required=False)
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date() if options['start_date'] else None
+            end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date() if options['end_date'] else None
+        except ValueError:
+            raise CommandError('日期格式无效，请使用 YYYY-MM-DD 格式')
+
+        self.stdout.write(self.style.SUCCESS('正在重建策略统计汇总桶...'))
+        count = StrategyRollupService().rebuild(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(f'重建完成，共 {count} 个汇总桶。'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from basic.services.success_rate_service import SuccessRateService
+from datetime import datetime
+
+
+class Command(BaseCommand):
+    help = '根据已结束的策略信号重建历史成功率分桶，可选先为历史信号补算形态特征。'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backfill-features',
+            action='store_true',
+            help='重建前为缺少形态特征的信号补算特征'
+        )
+        parser.add_argument(
+            '--start-date',
+            help='补算特征的信号开始日期 (YYYY-MM-DD)，不指定则不限',
+            required=False
+        )
+
+    def handle(self, *args, **options):
+        service = SuccessRateService()
+
+        if options['backfill_features']:
+            try:
+                start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date() if options['start_date'] else None
+            except ValueError:
+                raise CommandError('日期格式无效，请使用 YYYY-MM-DD 格式')
+            self.stdout.write(self.style.SUCCESS('正在补算历史信号的形态特征...'))
+            updated = service.backfill_features(start_date)
+            self.stdout.write(self.style.SUCCESS(f'补算完成，共 {updated} 个信号。'))
+
+        self.stdout.write(self.style.SUCCESS('正在重建历史成功率分桶...'))
+        count = service.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'重建完成，共 {count} 个分桶。'))
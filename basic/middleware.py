@@ -1,33 +1,27 @@
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.utils import timezone
+
+from basic.audit import get_audit_buffer
+
+# 不记录的接口：查看日志和审计指标本身，避免无限循环生成记录
+EXCLUDED_PATHS = ('/api/auth/browse_records/', '/api/auth/audit_metrics/')
+
 
 class BrowseRecordMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        # 先执行 response 流程，以便在 DRF 进行 JWT 鉴权解析后获取真实的 user
+        # 先执行 response 流程，DRF 完成 JWT 鉴权后会把认证用户写回 request.user
         response = self.get_response(request)
 
         # 过滤只记录 /api/ 下的请求
         if request.path.startswith('/api/') and request.method != 'OPTIONS':
-            # 过滤查看日志本身的接口，避免无限循环生成记录
-            if '/api/auth/browse_records/' in request.path:
+            if any(path in request.path for path in EXCLUDED_PATHS):
                 return response
-                
-            user = None
-            # 尝试使用 DRF JWTAuthentication 手动提取 user
-            try:
-                auth = JWTAuthentication()
-                header = auth.get_header(request)
-                if header:
-                    raw_token = auth.get_raw_token(header)
-                    validated_token = auth.get_validated_token(raw_token)
-                    user = auth.get_user(validated_token)
-            except Exception:
-                pass
-                
-            if not user and request.user and request.user.is_authenticated:
-                user = request.user
+
+            # 直接复用已认证的用户，不再重复解析 JWT
+            user = getattr(request, 'user', None)
+            user_id = user.pk if user is not None and user.is_authenticated else None
 
             # 获取 IP
             x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -35,17 +29,18 @@ class BrowseRecordMiddleware:
                 ip = x_forwarded_for.split(',')[0].strip()
             else:
                 ip = request.META.get('REMOTE_ADDR', '')
-                
-            from basic.models import BrowseRecord
-            try:
-                BrowseRecord.objects.create(
-                    user=user,
-                    path=request.path,
-                    method=request.method,
-                    ip=ip,
-                    user_agent=request.META.get('HTTP_USER_AGENT', '')[:500]
-                )
-            except Exception:
-                pass
-                
+
+            # 放入缓冲区，由后台线程批量写入（AUDIT_ASYNC 关闭时在请求线程中立即写入）
+            buffer = get_audit_buffer()
+            buffer.push({
+                'user_id': user_id,
+                'path': request.path[:255],
+                'method': request.method,
+                'ip': ip[:50],
+                'user_agent': request.META.get('HTTP_USER_AGENT', '')[:500],
+                'created_at': timezone.now(),
+            })
+            if not buffer.autostart:
+                buffer.flush()
+
         return response
@@ -23,6 +23,9 @@ class PolicyDetails(models.Model):
     - second_buy_time: 第二买点时间
     - take_profit_time: 止盈时间
     - stop_loss_time: 止损时间
+    - limit_up_streak: 信号生成时最近15个交易日的最长连续涨停天数
+    - gap_pct: 信号生成日的跳空幅度（开盘价相对前收盘价，百分比）
+    - buy_distance_pct: 信号生成日收盘价距第一买点的距离（百分比）
     - created_at: 记录创建时间
     - updated_at: 记录更新时间
     """
@@ -96,6 +99,25 @@ class PolicyDetails(models.Model):
         blank=True,
         verbose_name="止损时间"
     )
+    limit_up_streak = models.IntegerField(
+        null=True,
+        blank=True,
+        verbose_name="连续涨停天数"
+    )
+    gap_pct = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="跳空幅度"
+    )
+    buy_distance_pct = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="距买点距离"
+    )
     created_at = models.DateTimeField(
         default=timezone.now,
         verbose_name="创建时间"
@@ -111,7 +133,8 @@ class PolicyDetails(models.Model):
         unique_together = ('stock', 'date', 'strategy_type')
         ordering = ['-date', 'stock']  # 添加默认排序
         indexes = [
-            models.Index(fields=['-date']),
+            # 同时作为列表键集分页 (date, id) 的索引
+            models.Index(fields=['-date', '-id']),
             models.Index(fields=['strategy_type']),
             models.Index(fields=['current_status']),
         ]
@@ -209,6 +232,10 @@ class StockDailyData(models.Model):
         verbose_name = "股票日线数据"
         verbose_name_plural = "股票日线数据"
         unique_together = ('stock', 'trade_date')
+        indexes = [
+            # 按日期截面查询和 (trade_date, stock_id) 键集分页
+            models.Index(fields=['trade_date', 'stock']),
+        ]
 
 
 class TradingCalendar(models.Model):
@@ -310,6 +337,142 @@ class StrategyStats(models.Model):
         return f"{self.date} - {'全市场' if not self.stock else self.stock.name}"
 
 
+class StrategyStatsRollup(models.Model):
+    """策略统计汇总桶模型
+
+    按 (信号日期, 策略类型, 股票) 预先聚合信号结果，信号状态变化时增量更新，
+    任意时间窗口的统计通过对桶求和得到，无需重新分析全部信号。
+
+    字段说明：
+    - date: 信号日期
+    - strategy_type: 策略类型
+    - stock: 关联的股票代码（为空表示全市场汇总）
+    - total_signals: 信号数
+    - first_buy_success: 第一买点成功数
+    - second_buy_success: 第二买点成功数
+    - failed_signals: 失败信号数
+    - total_hold_days: 已结束信号的总持仓天数
+    - max_drawdown: 失败信号的最大亏损（百分比，只增不减）
+    - profit_0_3 ~ profit_above_10: 成功信号的盈利分布
+    """
+
+    date = models.DateField(verbose_name="信号日期")
+    strategy_type = models.CharField(max_length=50, verbose_name="策略类型")
+    stock = models.ForeignKey(
+        'Code',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="股票",
+        help_text="为空时表示全市场汇总，有值时表示单个股票的汇总"
+    )
+    total_signals = models.IntegerField(default=0, verbose_name="信号数")
+    first_buy_success = models.IntegerField(default=0, verbose_name="第一买点成功数")
+    second_buy_success = models.IntegerField(default=0, verbose_name="第二买点成功数")
+    failed_signals = models.IntegerField(default=0, verbose_name="失败信号数")
+    total_hold_days = models.IntegerField(default=0, verbose_name="总持仓天数")
+    max_drawdown = models.DecimalField(
+        max_digits=20,
+        decimal_places=2,
+        default=0,
+        verbose_name="最大回撤"
+    )
+    profit_0_3 = models.IntegerField(default=0, verbose_name="0-3%盈利数量")
+    profit_3_5 = models.IntegerField(default=0, verbose_name="3-5%盈利数量")
+    profit_5_7 = models.IntegerField(default=0, verbose_name="5-7%盈利数量")
+    profit_7_10 = models.IntegerField(default=0, verbose_name="7-10%盈利数量")
+    profit_above_10 = models.IntegerField(default=0, verbose_name="10%以上盈利数量")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "策略统计汇总"
+        verbose_name_plural = "策略统计汇总"
+        unique_together = ('date', 'strategy_type', 'stock')
+        ordering = ['-date', 'strategy_type']
+        indexes = [
+            models.Index(fields=['strategy_type', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.strategy_type} - {'全市场' if not self.stock_id else self.stock_id}"
+
+
+class SignalOutcomeBucket(models.Model):
+    """信号历史结果分桶模型
+
+    按 (策略类型, 连续涨停桶, 跳空幅度桶, 距买点距离桶) 统计已结束信号的成功次数，
+    新信号生成时据此查表得到历史成功率。
+
+    字段说明：
+    - strategy_type: 策略类型
+    - streak_bucket: 连续涨停天数桶
+    - gap_bucket: 跳空幅度桶
+    - distance_bucket: 距买点距离桶
+    - resolved_count: 已结束信号数
+    - success_count: 成功信号数
+    """
+
+    strategy_type = models.CharField(max_length=50, verbose_name="策略类型")
+    streak_bucket = models.IntegerField(verbose_name="连续涨停桶")
+    gap_bucket = models.IntegerField(verbose_name="跳空幅度桶")
+    distance_bucket = models.IntegerField(verbose_name="距买点距离桶")
+    resolved_count = models.IntegerField(default=0, verbose_name="已结束信号数")
+    success_count = models.IntegerField(default=0, verbose_name="成功信号数")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "信号结果分桶"
+        verbose_name_plural = "信号结果分桶"
+        unique_together = ('strategy_type', 'streak_bucket', 'gap_bucket', 'distance_bucket')
+
+    def __str__(self):
+        return f"{self.strategy_type} ({self.streak_bucket}, {self.gap_bucket}, {self.distance_bucket})"
+
+
+class StockIndicatorValue(models.Model):
+    """股票技术指标值模型
+
+    按 (股票, 交易日, 指标输出名) 存储逐日增量计算的技术指标值（长表）。
+    """
+
+    stock = models.ForeignKey('Code', on_delete=models.CASCADE, verbose_name="股票")
+    trade_date = models.DateField(verbose_name="交易日期")
+    name = models.CharField(max_length=30, verbose_name="指标名称")
+    value = models.FloatField(verbose_name="指标值")
+
+    class Meta:
+        verbose_name = "技术指标值"
+        verbose_name_plural = "技术指标值"
+        unique_together = ('stock', 'trade_date', 'name')
+        indexes = [
+            models.Index(fields=['name', 'trade_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.stock_id} - {self.trade_date} - {self.name}"
+
+
+class IndicatorState(models.Model):
+    """技术指标增量计算状态模型
+
+    保存每只股票每个指标截至 last_date 的递推状态，新交易日只需在此基础上更新一步。
+    """
+
+    stock = models.ForeignKey('Code', on_delete=models.CASCADE, verbose_name="股票")
+    indicator = models.CharField(max_length=30, verbose_name="指标")
+    last_date = models.DateField(verbose_name="最后计算日期")
+    state = models.JSONField(verbose_name="递推状态")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "技术指标状态"
+        verbose_name_plural = "技术指标状态"
+        unique_together = ('stock', 'indicator')
+
+    def __str__(self):
+        return f"{self.stock_id} - {self.indicator} ({self.last_date})"
+
+
 class StockAnalysis(models.Model):
     stock = models.ForeignKey('Code', on_delete=models.CASCADE)
     analysis_date = models.DateField()
@@ -341,13 +504,21 @@ class BrowseRecord(models.Model):
     method = models.CharField(verbose_name='请求方式', max_length=10)
     ip = models.CharField(verbose_name='IP地址', max_length=50, default='')
     user_agent = models.TextField(verbose_name='浏览器UA', default='')
-    created_at = models.DateTimeField(verbose_name='浏览时间', auto_now_add=True)
+    # 由中间件在请求时记录，批量写入时不能用 auto_now_add（会变成写入时间）
+    created_at = models.DateTimeField(verbose_name='浏览时间', default=timezone.now, editable=False)
 
     class Meta:
         db_table = 'browse_records'
         verbose_name = '浏览记录表'
         verbose_name_plural = '浏览记录表'
         ordering = ['-created_at']
+        indexes = [
+            # 按时间范围扫描、过期清理和最新记录分页
+            models.Index(fields=['created_at']),
+            # 按用户 / 路径在时间范围内聚合
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['path', 'created_at']),
+        ]
 
 
 
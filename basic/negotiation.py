@@ -0,0 +1,18 @@
+"""
+内容协商：行情接口的 format 参数表示数据格式（json/columnar/arrow），不参与 DRF 渲染器选择
+"""
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class _NoFormatOverrideSettings:
+    """只关闭 URL_FORMAT_OVERRIDE 的设置代理"""
+    URL_FORMAT_OVERRIDE = None
+
+    def __getattr__(self, name):
+        from rest_framework.settings import api_settings
+        return getattr(api_settings, name)
+
+
+class DataFormatNegotiation(DefaultContentNegotiation):
+    """忽略 ?format= 的内容协商，渲染器只按 Accept 头选择"""
+    settings = _NoFormatOverrideSettings()
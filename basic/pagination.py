@@ -0,0 +1,108 @@
+"""
+键集分页
+
+DRF 自带的 CursorPagination 只用排序的第一个字段定位，同一日期内靠 OFFSET 跳过重复值；
+策略信号每个交易日有大量记录，因此这里按 (date, id) 复合键定位，任意深度的分页代价相同。
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class DateIdCursorPagination(BasePagination):
+    """按 (date 降序, id 降序) 的键集分页
+
+    游标编码最后（或第一）一行的 (date, id) 以及翻页方向，
+    下一页：date < d 或 (date = d 且 id < i)；上一页反向查询后再倒序。
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    invalid_cursor_message = 'cursor 无效'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        reverse = False
+        if cursor:
+            direction, cursor_date, cursor_id = self.decode_cursor(cursor)
+            reverse = direction == 'p'
+            if reverse:
+                queryset = queryset.filter(Q(date__gt=cursor_date) | Q(date=cursor_date, id__gt=cursor_id))
+            else:
+                queryset = queryset.filter(Q(date__lt=cursor_date) | Q(date=cursor_date, id__lt=cursor_id))
+
+        ordering = ('date', 'id') if reverse else ('-date', '-id')
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # 正向翻页时：有更多数据才有下一页，带游标才有上一页；反向翻页相反
+        self.has_next = has_more if not reverse else bool(cursor)
+        self.has_previous = bool(cursor) if not reverse else has_more
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def encode_cursor(self, direction, row):
+        raw = f"{direction}|{row.date.strftime('%Y-%m-%d')}|{row.pk}"
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, cursor_date, cursor_id = urlsafe_b64decode(padded.encode()).decode().split('|')
+            if direction not in ('n', 'p'):
+                raise ValueError
+            return direction, datetime.strptime(cursor_date, '%Y-%m-%d').date(), int(cursor_id)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor('n', self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor('p', self.page[0]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
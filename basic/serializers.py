@@ -2,7 +2,18 @@ from rest_framework import serializers
 from .models import PolicyDetails, Code, TradingCalendar, StrategyStats
 from datetime import date
 
-class PolicyDetailsSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """支持只输出部分字段：序列化器初始化时传入 fields=[...]"""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class PolicyDetailsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """策略详情序列化器"""
     first_buy_time = serializers.DateField(format="%Y-%m-%d", required=False, allow_null=True)
     second_buy_time = serializers.DateField(format="%Y-%m-%d", required=False, allow_null=True)
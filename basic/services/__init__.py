@@ -2,5 +2,11 @@
 Basic应用服务层
 """
 from .strategy_service import StrategyService, StrategySignal
+from .trade_stats_service import TradeStatsService
+from .strategy_rollup_service import StrategyRollupService
+from .success_rate_service import SuccessRateIndex, SuccessRateService
+from .indicator_service import IndicatorService
+from .price_panel import PricePanel
 
-__all__ = ['StrategyService', 'StrategySignal']
+__all__ = ['StrategyService', 'StrategySignal', 'TradeStatsService', 'StrategyRollupService',
+           'SuccessRateIndex', 'SuccessRateService', 'IndicatorService', 'PricePanel']
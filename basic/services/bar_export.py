@@ -0,0 +1,256 @@
+"""
+日线数据导出：键集分页游标、流式 JSON 序列化和列式（并行数组 / Arrow IPC）输出
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import date, datetime
+import base64
+import json
+import logging
+
+from django.db.models import Q, QuerySet
+
+from ..models import Code
+from .market_data import chunked
+
+logger = logging.getLogger(__name__)
+
+# 导出列（与 StockDailyDataUpdateView 原有返回字段一致）
+EXPORT_FIELDS = (
+    'stock_id', 'trade_date', 'open', 'high', 'low', 'close',
+    'volume', 'amount', 'up_limit', 'down_limit',
+)
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'amount', 'up_limit', 'down_limit')
+
+# 流式输出时每次写出的行数
+STREAM_CHUNK_SIZE = 2000
+
+
+class InvalidCursor(ValueError):
+    """分页游标无效"""
+
+
+def encode_cursor(trade_date: date, stock_id: str) -> str:
+    """将最后一行的 (trade_date, stock_id) 编码为不透明游标"""
+    raw = f"{trade_date.strftime('%Y-%m-%d')}|{stock_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[date, str]:
+    """解码游标，返回 (trade_date, stock_id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        trade_date, stock_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|', 1)
+        return datetime.strptime(trade_date, '%Y-%m-%d').date(), stock_id
+    except Exception:
+        raise InvalidCursor('cursor 无效')
+
+
+def order_for_export(queryset: QuerySet) -> QuerySet:
+    """导出统一按 (trade_date 降序, stock_id 升序) 排序，与键集游标一致"""
+    return queryset.order_by('-trade_date', 'stock_id')
+
+
+def apply_cursor(queryset: QuerySet, cursor: Optional[str]) -> QuerySet:
+    """过滤出游标之后的行：日期更早，或同一日期下股票代码更大"""
+    if not cursor:
+        return queryset
+    trade_date, stock_id = decode_cursor(cursor)
+    return queryset.filter(Q(trade_date__lt=trade_date) | Q(trade_date=trade_date, stock_id__gt=stock_id))
+
+
+def code_names(codes: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """股票代码到名称的映射（代替 select_related 逐行加载 Code 对象）
+
+    Args:
+        codes: 只查询这些股票代码，为空表示全部股票（一次查询）
+    """
+    if codes is None:
+        return dict(Code.objects.values_list('ts_code', 'name'))
+    names = {}
+    for chunk in chunked(sorted(set(codes))):
+        names.update(Code.objects.filter(ts_code__in=chunk).values_list('ts_code', 'name'))
+    return names
+
+
+def to_float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def row_to_dict(row: tuple, names: Dict[str, str]) -> Dict:
+    """将 EXPORT_FIELDS 顺序的 values_list 行转换为接口返回格式"""
+    stock_id, trade_date, open_, high, low, close, volume, amount, up_limit, down_limit = row
+    return {
+        'stock_code': stock_id,
+        'stock_name': names.get(stock_id),
+        'trade_date': trade_date.strftime('%Y-%m-%d'),
+        'open': to_float(open_),
+        'high': to_float(high),
+        'low': to_float(low),
+        'close': to_float(close),
+        'volume': volume,
+        'amount': to_float(amount),
+        'up_limit': to_float(up_limit),
+        'down_limit': to_float(down_limit),
+    }
+
+
+def fetch_rows(queryset: QuerySet, limit: int, cursor: Optional[str] = None) -> Tuple[List[tuple], Optional[str]]:
+    """
+    读取一页 values_list 原始行
+
+    Returns:
+        (EXPORT_FIELDS 顺序的行元组列表, 下一页游标；没有更多数据时为 None)
+    """
+    queryset = apply_cursor(order_for_export(queryset), cursor)
+    rows = list(queryset.values_list(*EXPORT_FIELDS)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1][1], rows[-1][0]) if has_more and rows else None
+    return rows, next_cursor
+
+
+def fetch_page(queryset: QuerySet, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    读取一页数据（逐行对象格式）
+
+    Returns:
+        (行列表, 下一页游标；没有更多数据时为 None)
+    """
+    rows, next_cursor = fetch_rows(queryset, limit, cursor)
+    names = code_names({row[0] for row in rows}) if rows else {}
+    return [row_to_dict(row, names) for row in rows], next_cursor
+
+
+def float_column(values) -> List[Optional[float]]:
+    return [float(v) if v is not None else None for v in values]
+
+
+def rows_to_columns(rows: List[tuple]) -> Dict[str, list]:
+    """
+    将 values_list 行转置为并行数组（不构造逐行字典）
+
+    Returns:
+        {'stock_code': [...], 'trade_date': [...], 'open': [...], ...}
+    """
+    if not rows:
+        return {field: [] for field in ('stock_code',) + EXPORT_FIELDS[1:]}
+
+    columns = dict(zip(EXPORT_FIELDS, zip(*rows)))
+    result = {
+        'stock_code': list(columns['stock_id']),
+        'trade_date': [d.strftime('%Y-%m-%d') for d in columns['trade_date']],
+        'volume': list(columns['volume']),
+    }
+    for field in PRICE_FIELDS:
+        result[field] = float_column(columns[field])
+    return {field: result[field] for field in ('stock_code',) + EXPORT_FIELDS[1:]}
+
+
+def columnar_payload(rows: List[tuple]) -> Dict:
+    """列式返回数据：并行数组 + 只出现一次的股票名称映射"""
+    columns = rows_to_columns(rows)
+    codes = list(dict.fromkeys(columns['stock_code']))
+    names = code_names(codes) if codes else {}
+    columns['stock_names'] = {code: names.get(code) for code in codes}
+    return columns
+
+
+def fetch_grouped_columns(
+    queryset: QuerySet,
+    stock_codes: Iterable[str],
+    max_rows: Optional[int] = None
+) -> Optional[Dict[str, Dict[str, list]]]:
+    """
+    一次（按 Oracle IN 列表上限分块）查询多只股票的日线，按股票分组返回列式数据
+
+    Args:
+        queryset: 已按日期过滤的 StockDailyData 查询集
+        stock_codes: 股票代码列表
+        max_rows: 最多读取的行数，超过时返回 None
+
+    Returns:
+        {ts_code: {'trade_date': [...], 'open': [...], ...}}，按日期升序；没有数据的股票不出现
+    """
+    rows: List[tuple] = []
+    for chunk in chunked(sorted(set(stock_codes))):
+        chunk_qs = queryset.filter(stock_id__in=chunk).order_by('stock_id', 'trade_date').values_list(*EXPORT_FIELDS)
+        if max_rows is not None:
+            chunk_qs = chunk_qs[:max_rows - len(rows) + 1]
+        rows.extend(chunk_qs)
+        if max_rows is not None and len(rows) > max_rows:
+            return None
+
+    grouped: Dict[str, List[tuple]] = {}
+    for row in rows:
+        grouped.setdefault(row[0], []).append(row)
+
+    result = {}
+    for code, stock_rows in grouped.items():
+        columns = rows_to_columns(stock_rows)
+        del columns['stock_code']
+        result[code] = columns
+    return result
+
+
+def arrow_available() -> bool:
+    """是否安装了可选依赖 pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def arrow_ipc(rows: List[tuple]) -> bytes:
+    """
+    将行序列化为 Apache Arrow IPC 流（需要可选依赖 pyarrow）
+    """
+    import pyarrow as pa
+
+    columns = dict(zip(EXPORT_FIELDS, zip(*rows))) if rows else {field: () for field in EXPORT_FIELDS}
+    arrays = {
+        'stock_code': pa.array(columns['stock_id'], type=pa.string()),
+        'trade_date': pa.array(columns['trade_date'], type=pa.date32()),
+        'volume': pa.array(columns['volume'], type=pa.int64()),
+    }
+    for field in PRICE_FIELDS:
+        arrays[field] = pa.array(float_column(columns[field]), type=pa.float64())
+    table = pa.table({field: arrays[field] for field in ('stock_code',) + EXPORT_FIELDS[1:]})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def stream_json(queryset: QuerySet, cursor: Optional[str] = None) -> Iterator[str]:
+    """
+    以常量内存流式输出 {"status", "message", "data": [...]} 结构的 JSON
+
+    使用服务端游标逐块读取 values_list，不构造模型实例，也不在内存中保留全部行；
+    股票名称按块查询，只查询之前的块中没有出现过的股票代码。
+    """
+    queryset = apply_cursor(order_for_export(queryset), cursor)
+    names: Dict[str, str] = {}
+    known = set()
+
+    def encode(rows: List[tuple]) -> str:
+        missing = {row[0] for row in rows} - known
+        if missing:
+            names.update(code_names(missing))
+            known.update(missing)
+        return ','.join(json.dumps(row_to_dict(row, names), ensure_ascii=False) for row in rows)
+
+    yield '{"status": "success", "message": "流式导出", "data": ['
+    buffer = []
+    first = True
+    for row in queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=STREAM_CHUNK_SIZE):
+        buffer.append(row)
+        if len(buffer) >= STREAM_CHUNK_SIZE:
+            yield ('' if first else ',') + encode(buffer)
+            first = False
+            buffer = []
+    if buffer:
+        yield ('' if first else ',') + encode(buffer)
+    yield ']}'
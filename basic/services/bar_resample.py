@@ -0,0 +1,148 @@
+"""
+K线周期重采样：把日线聚合为周线、月线或 N 日线
+
+一次查询加载全部股票的日线，按 (股票, 周期) 计算分桶边界后用 NumPy reduceat 向量化聚合，
+结果按 (股票, 周期, 日期范围, 日线数据版本号) 缓存。
+"""
+from typing import Dict, Iterable, Union
+from datetime import date
+import logging
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+
+from .data_version import BARS, get_version
+from .market_data import load_bars_frame
+
+logger = logging.getLogger(__name__)
+
+RESAMPLE_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount')
+
+CACHE_KEY = 'resampled_bars:{}:{}:{}:{}:{}'
+CACHE_TIMEOUT = 24 * 3600
+
+
+def parse_period(value: str) -> Union[str, int]:
+    """
+    解析周期参数
+
+    Returns:
+        'W'（周线）、'M'（月线）或正整数 N（每 N 个交易日一根K线）
+    """
+    value = (value or '').strip().upper()
+    if value in ('W', 'M'):
+        return value
+    if value.endswith('D'):
+        value = value[:-1]
+    if value.isdigit() and int(value) > 0:
+        return int(value)
+    raise ValueError('period 仅支持 W、M 或正整数 N（N 日线）')
+
+
+def bucket_ids(frame: pd.DataFrame, period: Union[str, int]) -> np.ndarray:
+    """每行日线所属的周期编号（同一股票内单调不减）"""
+    days = frame['trade_date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    if period == 'W':
+        # 1970-01-01 是星期四，偏移 3 天使每周从星期一开始
+        return (days + 3) // 7
+    if period == 'M':
+        return frame['trade_date'].to_numpy().astype('datetime64[M]').astype(np.int64)
+    # N 日线：以日期范围内该股票的第一根日线为起点，每 N 根一组
+    return frame.groupby('stock_id', sort=False).cumcount().to_numpy() // period
+
+
+def resample_frame(frame: pd.DataFrame, period: Union[str, int]) -> Dict[str, Dict[str, list]]:
+    """
+    将按 (stock_id, trade_date) 排序的日线聚合为周期K线
+
+    Returns:
+        {ts_code: {'trade_date': [...周期最后交易日], 'start_date': [...], 'open': [...], 'high': [...],
+                   'low': [...], 'close': [...], 'volume': [...], 'amount': [...], 'days': [...]}}
+    """
+    if frame.empty:
+        return {}
+
+    codes = frame['stock_id'].to_numpy()
+    buckets = bucket_ids(frame, period)
+    n = len(frame)
+
+    new_bucket = np.ones(n, dtype=bool)
+    new_bucket[1:] = (codes[1:] != codes[:-1]) | (buckets[1:] != buckets[:-1])
+    starts = np.flatnonzero(new_bucket)
+    ends = np.append(starts[1:], n) - 1
+
+    dates = frame['trade_date'].dt.strftime('%Y-%m-%d').to_numpy()
+    columns = {
+        'trade_date': dates[ends],
+        'start_date': dates[starts],
+        'open': frame['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(frame['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(frame['low'].to_numpy(), starts),
+        'close': frame['close'].to_numpy()[ends],
+        'volume': np.add.reduceat(frame['volume'].to_numpy(), starts),
+        'amount': np.round(np.add.reduceat(frame['amount'].to_numpy(), starts), 2),
+        'days': ends - starts + 1,
+    }
+
+    # 按股票切分（bucket 行按股票连续排列）
+    bucket_codes = codes[starts]
+    split_at = np.flatnonzero(bucket_codes[1:] != bucket_codes[:-1]) + 1
+    bounds = np.concatenate(([0], split_at, [len(starts)]))
+
+    result = {}
+    for begin, finish in zip(bounds[:-1], bounds[1:]):
+        result[bucket_codes[begin]] = {name: values[begin:finish].tolist() for name, values in columns.items()}
+    return result
+
+
+class BarResampleService:
+    """K线周期重采样服务类"""
+
+    def __init__(self, db_alias='default'):
+        self.db_alias = db_alias
+
+    def get_bars(
+        self,
+        stock_codes: Iterable[str],
+        period: Union[str, int],
+        start_date: date,
+        end_date: date
+    ) -> Dict[str, Dict[str, list]]:
+        """
+        获取多只股票的周期K线，已缓存的股票直接返回，其余一次查询计算
+
+        Returns:
+            {ts_code: 列式K线}，没有数据的股票不出现在结果中
+        """
+        stock_codes = sorted(set(stock_codes))
+        version = get_version(BARS)
+        keys = {
+            code: CACHE_KEY.format(version, code, period, start_date.isoformat(), end_date.isoformat())
+            for code in stock_codes
+        }
+
+        cached = {}
+        if version is not None:
+            try:
+                hits = cache.get_many(list(keys.values()))
+                cached = {code: hits[key] for code, key in keys.items() if key in hits}
+            except Exception as e:
+                logger.warning(f"读取K线缓存失败: {str(e)}")
+
+        missing = [code for code in stock_codes if code not in cached]
+        if missing:
+            frame = load_bars_frame(missing, start_date, end_date, fields=RESAMPLE_FIELDS, db_alias=self.db_alias)
+            computed = resample_frame(frame, period)
+            if version is not None:
+                # 没有数据的股票也缓存空结果，避免重复查询
+                try:
+                    cache.set_many(
+                        {keys[code]: computed.get(code, {}) for code in missing},
+                        CACHE_TIMEOUT
+                    )
+                except Exception as e:
+                    logger.warning(f"写入K线缓存失败: {str(e)}")
+            cached.update(computed)
+
+        return {code: cached[code] for code in stock_codes if cached.get(code)}
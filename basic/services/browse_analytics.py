@@ -0,0 +1,159 @@
+"""
+浏览记录分析服务：数据库端聚合统计（按路径 / 用户 / IP / 小时）和按日分段的过期数据清理
+"""
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+import base64
+import json
+import logging
+
+from django.contrib.auth.models import User
+from django.db.models import Count, F, Max, Q, Value
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+from ..models import BrowseRecord
+
+logger = logging.getLogger(__name__)
+
+# 分组维度 -> 分组表达式（匿名用户的 user_id 记为 0）
+GROUP_EXPRESSIONS = {
+    'path': lambda: F('path'),
+    'user': lambda: Coalesce('user_id', Value(0)),
+    'ip': lambda: F('ip'),
+    'hour': lambda: TruncHour('created_at'),
+}
+
+
+class InvalidCursor(ValueError):
+    """分页游标无效"""
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list):
+            raise ValueError
+        return values
+    except Exception:
+        raise InvalidCursor('cursor 无效')
+
+
+class BrowseAnalyticsService:
+    """浏览记录分析服务类"""
+
+    def aggregate(
+        self,
+        group_by: str,
+        start: datetime,
+        end: datetime,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        在数据库端按维度聚合请求数
+
+        Args:
+            group_by: 'path' / 'user' / 'ip' 按请求数降序；'hour' 按小时倒序
+            start / end: 时间范围 [start, end)
+            limit: 每页条数
+            cursor: 上一页返回的游标
+
+        Returns:
+            ([{'key', 'label', 'count', 'users', 'last_seen'}], 下一页游标)
+        """
+        if group_by not in GROUP_EXPRESSIONS:
+            raise ValueError(f"不支持的分组维度: {group_by}")
+
+        queryset = (
+            BrowseRecord.objects
+            .filter(created_at__gte=start, created_at__lt=end)
+            .annotate(key=GROUP_EXPRESSIONS[group_by]())
+            .values('key')
+            .annotate(count=Count('id'), users=Count('user_id', distinct=True), last_seen=Max('created_at'))
+        )
+
+        if group_by == 'hour':
+            if cursor:
+                (hour,) = decode_cursor(cursor)
+                queryset = queryset.filter(key__lt=datetime.fromisoformat(hour))
+            queryset = queryset.order_by('-key')
+        else:
+            if cursor:
+                count, key = decode_cursor(cursor)
+                queryset = queryset.filter(Q(count__lt=count) | Q(count=count, key__gt=key))
+            queryset = queryset.order_by('-count', 'key')
+
+        rows = list(queryset[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = encode_cursor(
+                [last['key'].isoformat()] if group_by == 'hour' else [last['count'], last['key']]
+            )
+        return self._format(group_by, rows), next_cursor
+
+    def _format(self, group_by: str, rows: List[Dict]) -> List[Dict]:
+        usernames = {}
+        if group_by == 'user':
+            usernames = dict(User.objects.filter(
+                id__in=[row['key'] for row in rows if row['key']]
+            ).values_list('id', 'username'))
+
+        results = []
+        for row in rows:
+            key = row['key']
+            if group_by == 'hour':
+                label = timezone.localtime(key).strftime('%Y-%m-%d %H:00')
+                key = label
+            elif group_by == 'user':
+                label = usernames.get(key, 'Anonymous') if key else 'Anonymous'
+            else:
+                label = key
+            results.append({
+                'key': key,
+                'label': label,
+                'count': row['count'],
+                'users': row['users'],
+                'last_seen': timezone.localtime(row['last_seen']).strftime('%Y-%m-%d %H:%M:%S'),
+            })
+        return results
+
+    def purge(self, retention_days: int) -> int:
+        """
+        删除保留期之前的浏览记录
+
+        按自然日分段删除（每段一个短事务，走 created_at 索引），避免一次性删除大量行长时间锁表。
+
+        Returns:
+            删除的记录数
+        """
+        cutoff = timezone.now() - timedelta(days=retention_days)
+        oldest = (
+            BrowseRecord.objects.filter(created_at__lt=cutoff)
+            .order_by('created_at').values_list('created_at', flat=True).first()
+        )
+        if oldest is None:
+            return 0
+
+        deleted = 0
+        window_start = timezone.localtime(oldest).replace(hour=0, minute=0, second=0, microsecond=0)
+        while window_start < cutoff:
+            window_end = min(window_start + timedelta(days=1), cutoff)
+            count, _ = BrowseRecord.objects.filter(
+                created_at__gte=window_start, created_at__lt=window_end
+            ).delete()
+            deleted += count
+            window_start = window_end
+
+        logger.info(f"清理 {cutoff:%Y-%m-%d %H:%M} 之前的浏览记录 {deleted} 条")
+        return deleted
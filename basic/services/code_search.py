@@ -0,0 +1,238 @@
+"""
+股票代码搜索索引：按代码 / 名称 / 拼音首字母的前缀与模糊匹配（输入联想）
+
+索引在进程内构建一次（全部 Code 约数千条），查询只做二分查找和少量内存扫描；
+Code 变化时递增 'codes' 数据版本号，各进程在下次查询时发现版本变化后重建索引。
+"""
+from typing import Dict, Iterator, List, Optional
+from bisect import bisect_left, bisect_right
+from itertools import product
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from pypinyin import Style, pinyin
+
+from ..models import Code
+from .data_version import CODES, get_version
+
+logger = logging.getLogger(__name__)
+
+# 股票名称中常见的多音字：除词语读音外，其余读音的首字母也建索引
+POLYPHONES = {
+    '行': 'HX', '长': 'CZ', '重': 'CZ', '乐': 'LY', '厦': 'SX', '藏': 'CZ',
+    '传': 'CZ', '朝': 'CZ', '都': 'DD', '区': 'QO', '单': 'DS', '晟': 'SC',
+}
+
+# 多音字组合过多时只保留前若干种
+MAX_INITIAL_VARIANTS = 8
+
+# 检查数据版本号的最小间隔（秒），避免每次查询都访问缓存
+VERSION_CHECK_INTERVAL = 10
+
+
+def _is_hanzi(char: str) -> bool:
+    return '\u3400' <= char <= '\u9fff' or '\uf900' <= char <= '\ufaff' or '\U00020000' <= char <= '\U0003134f'
+
+
+def char_initials(char: str, reading: Optional[str] = None) -> Optional[str]:
+    """
+    单个字符的拼音首字母（可能多个，词语读音在前）
+
+    Args:
+        char: 字符（已做 NFKC 规范化，全角字母数字转为半角）
+        reading: pypinyin 按词语给出的首字母，非汉字或无法识别时为 None
+
+    Returns:
+        首字母字符串；字母数字原样返回大写，标点等返回空串；无法识别的字符返回 None
+    """
+    if char.isascii():
+        return char.upper() if char.isalnum() else ''
+    if not _is_hanzi(char):
+        return None if char.isalnum() else ''
+    if reading is None:
+        return None
+    return ''.join(dict.fromkeys(reading.upper() + POLYPHONES.get(char, '')))
+
+
+def pinyin_initials(name: str) -> List[str]:
+    """
+    名称的拼音首字母组合，如 平安银行 -> ['PAYH', 'PAYX']
+
+    读音取自 pypinyin（覆盖全部汉字，按词语确定多音字读音）；
+    任何字符无法识别时不生成首字母，避免缩短的首字母误匹配其他前缀。
+    """
+    name = unicodedata.normalize('NFKC', name)
+    readings = pinyin(name, style=Style.FIRST_LETTER, errors=lambda text: [[None] for _ in text])
+    options = []
+    for char, (reading,) in zip(name, readings):
+        initials = char_initials(char, reading)
+        if initials is None:
+            return []
+        if initials:
+            options.append(initials)
+
+    variants = []
+    for combo in product(*options):
+        variants.append(''.join(combo))
+        if len(variants) >= MAX_INITIAL_VARIANTS:
+            break
+    return variants
+
+
+class _Blob:
+    """把多行文本拼成一个字符串，用 str.find / 正则在 C 层扫描，再按行偏移映射回股票"""
+
+    def __init__(self, lines: List[str], owners: List[int]):
+        self.text = '\n'.join(lines)
+        self.owners = owners
+        self.offsets = []
+        offset = 0
+        for line in lines:
+            self.offsets.append(offset)
+            offset += len(line) + 1
+
+    def owner(self, pos: int) -> int:
+        return self.owners[bisect_right(self.offsets, pos) - 1]
+
+    def contains(self, query: str) -> Iterator[int]:
+        """包含 query 的行"""
+        pos = self.text.find(query)
+        while pos >= 0:
+            line = bisect_right(self.offsets, pos) - 1
+            yield self.owners[line]
+            next_line = self.offsets[line + 1] if line + 1 < len(self.offsets) else len(self.text)
+            pos = self.text.find(query, next_line)
+
+    def subsequence(self, query: str) -> Iterator[int]:
+        """query 的字符按顺序出现（可不连续）的行"""
+        pattern = re.compile('[^\n]*?'.join(re.escape(char) for char in query))
+        for match in pattern.finditer(self.text):
+            yield self.owner(match.start())
+
+
+class CodeSearchIndex:
+    """股票搜索索引
+
+    匹配优先级：代码完全匹配 > 代码前缀 > 拼音首字母前缀 > 名称前缀 > 名称包含 > 按序模糊匹配。
+    前缀匹配按层在排序键上二分查找，凑满 limit 条即停止，常见查询不需要扫描全部股票。
+    """
+
+    def __init__(self, entries: List[Dict]):
+        self.entries = entries
+        self.exact = {}
+        code_keys, initial_keys, name_keys = [], [], []
+        for idx, entry in enumerate(entries):
+            for code in {entry['ts_code'].upper(), entry['symbol'].upper()}:
+                self.exact.setdefault(code, idx)
+                code_keys.append((code, idx))
+            for initials in entry['initials']:
+                initial_keys.append((initials, idx))
+            name_keys.append((entry['name'], idx))
+        self.tiers = []
+        for keys in (code_keys, initial_keys, name_keys):
+            keys.sort()
+            self.tiers.append(([key for key, _ in keys], [idx for _, idx in keys]))
+        self.names = _Blob([key for key, _ in name_keys], [idx for _, idx in name_keys])
+        self.initials = _Blob([key for key, _ in initial_keys], [idx for _, idx in initial_keys])
+
+    @classmethod
+    def build(cls) -> 'CodeSearchIndex':
+        entries = [
+            {
+                'ts_code': ts_code,
+                'symbol': symbol,
+                'name': name,
+                'industry': industry,
+                'list_status': list_status,
+                'initials': pinyin_initials(name),
+            }
+            for ts_code, symbol, name, industry, list_status in Code.objects.order_by('ts_code').values_list(
+                'ts_code', 'symbol', 'name', 'industry', 'list_status'
+            )
+        ]
+        return cls(entries)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        搜索股票
+
+        Args:
+            query: 代码、名称或拼音首字母（不区分大小写）
+            limit: 最多返回条数
+
+        Returns:
+            [{'ts_code', 'symbol', 'name', 'industry', 'list_status'}]，按匹配优先级排序
+        """
+        query = query.strip().upper()
+        if not query or limit <= 0:
+            return []
+
+        found: List[int] = []
+        seen = set()
+
+        def add(idx: int) -> bool:
+            if idx not in seen:
+                seen.add(idx)
+                found.append(idx)
+            return len(found) >= limit
+
+        if query in self.exact and add(self.exact[query]):
+            return self._format(found)
+
+        # 前缀匹配：每层的键已排序，二分定位后顺序读取
+        for key_strings, indexes in self.tiers:
+            pos = bisect_left(key_strings, query)
+            while pos < len(key_strings) and key_strings[pos].startswith(query):
+                if add(indexes[pos]):
+                    return self._format(found)
+                pos += 1
+
+        # 前缀结果不足时再做名称包含和按序模糊匹配
+        for idx in self.names.contains(query):
+            if add(idx):
+                return self._format(found)
+        for blob in (self.initials, self.names):
+            for idx in blob.subsequence(query):
+                if add(idx):
+                    return self._format(found)
+        return self._format(found)
+
+    def _format(self, indexes: List[int]) -> List[Dict]:
+        return [
+            {field: self.entries[idx][field] for field in ('ts_code', 'symbol', 'name', 'industry', 'list_status')}
+            for idx in indexes
+        ]
+
+
+_index: Optional[CodeSearchIndex] = None
+_index_version: Optional[int] = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def invalidate_index():
+    """标记本进程的索引需要重建（Code 变化时由模型信号调用）"""
+    global _index, _checked_at
+    _index = None
+    _checked_at = 0.0
+
+
+def get_search_index() -> CodeSearchIndex:
+    """进程内共享的搜索索引，数据版本变化后自动重建"""
+    global _index, _index_version, _checked_at
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+        return _index
+
+    with _index_lock:
+        version = get_version(CODES)
+        if _index is None or version != _index_version:
+            started = time.perf_counter()
+            _index = CodeSearchIndex.build()
+            _index_version = version
+            logger.info(f"股票搜索索引已构建: {len(_index.entries)} 只股票，耗时 {time.perf_counter() - started:.3f}s")
+        _checked_at = now
+        return _index
@@ -0,0 +1,145 @@
+"""
+数据版本号与版本化响应缓存
+
+写入方（模型信号、批量写入、形态扫描）在数据变化后递增版本号；
+读取接口的缓存键包含版本号，版本变化后旧缓存自然失效，无需依赖 TTL 猜测过期时间。
+同时返回 ETag，客户端携带 If-None-Match 且版本未变时直接返回 304。
+"""
+from typing import Callable, Optional
+import hashlib
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+# 策略信号（PolicyDetails）数据版本
+SIGNALS = 'signals'
+# 日线数据（StockDailyData）数据版本
+BARS = 'bars'
+# 股票代码（Code）数据版本
+CODES = 'codes'
+
+VERSION_KEY = 'data_version:{}'
+RESPONSE_KEY = 'versioned_response:{}:{}:{}'
+
+# 缓存条目的过期时间只用于回收内存，正确性由版本号保证
+RESPONSE_TIMEOUT = 24 * 3600
+
+
+def _initial_version() -> int:
+    # 以毫秒时间戳作为初值：缓存被清空后新版本号不会与旧 ETag 重复
+    return int(time.time() * 1000)
+
+
+def get_version(namespace: str = SIGNALS) -> Optional[int]:
+    """读取数据版本号，不存在时初始化；缓存不可用时返回 None"""
+    key = VERSION_KEY.format(namespace)
+    try:
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, _initial_version(), timeout=None)
+            version = cache.get(key)
+        return int(version) if version is not None else None
+    except Exception as e:
+        logger.warning(f"读取数据版本号失败 ({namespace}): {str(e)}")
+        return None
+
+
+def bump_version(namespace: str = SIGNALS) -> Optional[int]:
+    """递增数据版本号，使该命名空间下的缓存响应全部失效"""
+    key = VERSION_KEY.format(namespace)
+    try:
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # 版本号尚未初始化（或已被淘汰）
+            cache.add(key, _initial_version(), timeout=None)
+            return cache.incr(key)
+    except Exception as e:
+        logger.warning(f"递增数据版本号失败 ({namespace}): {str(e)}")
+        return None
+
+
+def bump_version_on_commit(namespace: str = SIGNALS, using: Optional[str] = None):
+    """在当前事务提交后递增版本号（避免读取方在提交前按新版本缓存旧数据）"""
+    transaction.on_commit(lambda: bump_version(namespace), using=using)
+
+
+def request_fingerprint(request) -> str:
+    """协议 + 主机 + 路径 + 排序后的查询参数 + 渲染格式的摘要
+
+    分页响应中的 next/previous 是绝对链接，协议和主机不同的请求不能共用缓存。
+    """
+    params = sorted((key, request.query_params.getlist(key)) for key in request.query_params.keys())
+    renderer = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+    raw = f"{request.scheme}://{request.get_host()}{request.path}|{params}|{renderer}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def etag_matches(request, etag: str) -> bool:
+    """If-None-Match 是否包含当前 ETag（弱比较）"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    current = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+def versioned_response(
+    request,
+    build: Callable[[], Response],
+    namespace: str = SIGNALS,
+    timeout: int = RESPONSE_TIMEOUT
+) -> Response:
+    """
+    按 (查询参数, 数据版本号) 缓存 GET 响应
+
+    Args:
+        request: DRF 请求
+        build: 缓存未命中时生成响应的函数，只有 200 响应会被缓存
+        namespace: 数据版本命名空间
+        timeout: 缓存条目过期时间（秒）
+
+    Returns:
+        Response: 版本未变且客户端 ETag 一致时为 304，否则为缓存或新生成的响应
+    """
+    version = get_version(namespace)
+    if version is None:
+        return build()
+
+    fingerprint = request_fingerprint(request)
+    etag = f'W/"{namespace}-{version}-{fingerprint[:16]}"'
+
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        key = RESPONSE_KEY.format(namespace, version, fingerprint)
+        payload = cache.get(key)
+        if payload is None:
+            response = build()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            try:
+                cache.set(key, response.data, timeout)
+            except Exception as e:
+                logger.warning(f"写入响应缓存失败: {str(e)}")
+        else:
+            response = Response(payload)
+
+    response['ETag'] = etag
+    # 允许客户端保存副本，但每次使用前必须用 ETag 重新验证
+    response['Cache-Control'] = 'private, no-cache'
+    return response
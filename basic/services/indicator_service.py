@@ -0,0 +1,222 @@
+"""
+技术指标服务：按交易日增量维护技术指标，并提供读取接口
+"""
+from typing import Dict, Iterable, List, Optional
+from collections import defaultdict
+from datetime import date, timedelta
+import logging
+import math
+
+from django.db import transaction
+
+from ..indicators import get_indicators, output_names
+from ..models import IndicatorState, StockDailyData, StockIndicatorValue
+from .market_data import chunked, load_bars_frame
+
+logger = logging.getLogger(__name__)
+
+# 冷启动（无状态）股票每批回放的股票数量，控制单次加载的历史数据量
+COLD_START_BATCH = 200
+
+
+class IndicatorService:
+    """技术指标服务类
+
+    每只股票每个指标保存一份递推状态（IndicatorState），新交易日只用当天K线更新一步；
+    缺失的交易日会按顺序补算。没有状态的股票需要从全部历史回放（冷启动），
+    只在 backfill 中进行，每日更新跳过这些股票。
+    """
+
+    def __init__(self, indicator_keys: Optional[Iterable[str]] = None, db_alias='default'):
+        self.indicators = get_indicators(list(indicator_keys) if indicator_keys else None)
+        self.db_alias = db_alias
+
+    def update_for_date(self, trade_date: date) -> Dict:
+        """
+        用指定交易日的日线更新已有状态的股票的指标（每日数据入库后调用）
+
+        没有状态的股票不在这里回放全部历史，计入 skipped，由 backfill（backfill_indicators 命令 / 任务）补算。
+
+        Returns:
+            dict: 更新的股票数、写入的指标值数量和跳过的股票数
+        """
+        stock_ids = list(
+            StockDailyData.objects.using(self.db_alias)
+            .filter(trade_date=trade_date)
+            .values_list('stock_id', flat=True)
+        )
+        result = self.advance(stock_ids, trade_date, cold_start=False)
+        if result['skipped']:
+            logger.warning(f"{result['skipped']} 只股票没有指标状态，已跳过，需要运行 backfill_indicators 补算")
+        return result
+
+    def backfill(self, stock_ids: Optional[List[str]] = None, reset: bool = False) -> Dict:
+        """
+        回放历史数据计算指标
+
+        Args:
+            stock_ids: 股票代码列表，为空表示全部有日线数据的股票
+            reset: 是否清空已有状态和指标值后重算
+        """
+        if stock_ids is None:
+            stock_ids = list(
+                StockDailyData.objects.using(self.db_alias)
+                .values_list('stock_id', flat=True).distinct()
+            )
+        end_date = StockDailyData.objects.using(self.db_alias).order_by('-trade_date').values_list(
+            'trade_date', flat=True
+        ).first()
+        if not stock_ids or end_date is None:
+            return {'stocks': 0, 'values': 0, 'skipped': 0}
+
+        if reset:
+            keys = [indicator.key for indicator in self.indicators]
+            with transaction.atomic(using=self.db_alias):
+                for chunk in chunked(sorted(stock_ids)):
+                    IndicatorState.objects.using(self.db_alias).filter(
+                        stock_id__in=chunk, indicator__in=keys
+                    ).delete()
+                    StockIndicatorValue.objects.using(self.db_alias).filter(
+                        stock_id__in=chunk, name__in=output_names(keys)
+                    ).delete()
+
+        return self.advance(stock_ids, end_date)
+
+    def advance(self, stock_ids: Iterable[str], end_date: date, cold_start: bool = True) -> Dict:
+        """
+        将指定股票的指标状态推进到 end_date
+
+        Args:
+            cold_start: 是否为没有状态的股票回放全部历史；为 False 时跳过这些股票
+        """
+        stock_ids = sorted(set(stock_ids))
+        if not stock_ids:
+            return {'stocks': 0, 'values': 0, 'skipped': 0}
+
+        keys = [indicator.key for indicator in self.indicators]
+        states = {}
+        for chunk in chunked(stock_ids):
+            for state in IndicatorState.objects.using(self.db_alias).filter(
+                stock_id__in=chunk, indicator__in=keys
+            ):
+                states[(state.stock_id, state.indicator)] = state
+
+        # 按各股票最早的状态日期分组：已有状态的股票通常都停在上一交易日，一次查询即可
+        warm_groups = defaultdict(list)
+        cold = []
+        for stock_id in stock_ids:
+            last_dates = [states[(stock_id, key)].last_date if (stock_id, key) in states else None for key in keys]
+            if any(last is None for last in last_dates):
+                cold.append(stock_id)
+            elif min(last_dates) < end_date:
+                warm_groups[min(last_dates)].append(stock_id)
+
+        total_values = 0
+        for last_date, group in warm_groups.items():
+            bars = load_bars_frame(
+                group, last_date + timedelta(days=1), end_date,
+                fields=('high', 'low', 'close'), db_alias=self.db_alias
+            )
+            total_values += self._apply(bars, states)
+
+        skipped = 0 if cold_start else len(cold)
+        if not cold_start:
+            cold = []
+        for start in range(0, len(cold), COLD_START_BATCH):
+            batch = cold[start:start + COLD_START_BATCH]
+            bars = load_bars_frame(
+                batch, None, end_date,
+                fields=('high', 'low', 'close'), db_alias=self.db_alias
+            )
+            total_values += self._apply(bars, states)
+
+        updated = len(stock_ids) - skipped
+        logger.info(f"技术指标更新至 {end_date}: 股票 {updated} 只，写入指标值 {total_values} 条")
+        return {'stocks': updated, 'values': total_values, 'skipped': skipped}
+
+    def _apply(self, bars, states: Dict) -> int:
+        """用一批K线（按股票、日期排序）推进状态并写入指标值"""
+        if bars.empty:
+            return 0
+
+        values = []
+        touched = []
+        for stock_id, group in bars.groupby('stock_id', sort=False):
+            rows = list(zip(
+                group['trade_date'].dt.date, group['high'], group['low'], group['close']
+            ))
+            for indicator in self.indicators:
+                record = states.get((stock_id, indicator.key))
+                if record is None:
+                    record = IndicatorState(
+                        stock_id=stock_id, indicator=indicator.key,
+                        last_date=None, state=indicator.init_state()
+                    )
+                    states[(stock_id, indicator.key)] = record
+
+                state = record.state
+                for trade_date, high, low, close in rows:
+                    if record.last_date is not None and trade_date <= record.last_date:
+                        continue
+                    state, outputs = indicator.update(state, {'high': high, 'low': low, 'close': close})
+                    record.last_date = trade_date
+                    for name, value in outputs.items():
+                        if math.isfinite(value):
+                            values.append(StockIndicatorValue(
+                                stock_id=stock_id, trade_date=trade_date, name=name, value=value
+                            ))
+                record.state = state
+                touched.append(record)
+
+        with transaction.atomic(using=self.db_alias):
+            StockIndicatorValue.objects.using(self.db_alias).bulk_create(values, batch_size=2000)
+            existing = [record for record in touched if record.pk]
+            new = [record for record in touched if not record.pk]
+            IndicatorState.objects.using(self.db_alias).bulk_update(
+                existing, ['last_date', 'state'], batch_size=500
+            )
+            IndicatorState.objects.using(self.db_alias).bulk_create(new, batch_size=500)
+
+        return len(values)
+
+    def read(
+        self,
+        stock_code: Optional[str] = None,
+        names: Optional[List[str]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        trade_date: Optional[date] = None
+    ) -> List[Dict]:
+        """
+        读取指标值，按 (股票, 交易日) 合并为一行
+
+        Args:
+            stock_code: 股票代码（单只股票的时间序列）
+            names: 指标输出名列表，为空表示全部
+            start_date / end_date: 日期范围
+            trade_date: 指定交易日（全市场截面）
+
+        Returns:
+            [{'stock_code', 'trade_date', <指标名>: 值, ...}]
+        """
+        queryset = StockIndicatorValue.objects.using(self.db_alias).all()
+        if stock_code:
+            queryset = queryset.filter(stock_id=stock_code)
+        if trade_date:
+            queryset = queryset.filter(trade_date=trade_date)
+        if start_date:
+            queryset = queryset.filter(trade_date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(trade_date__lte=end_date)
+        if names:
+            queryset = queryset.filter(name__in=names)
+
+        rows = {}
+        for stock_id, row_date, name, value in queryset.order_by('stock_id', 'trade_date').values_list(
+            'stock_id', 'trade_date', 'name', 'value'
+        ).iterator(chunk_size=5000):
+            key = (stock_id, row_date)
+            if key not in rows:
+                rows[key] = {'stock_code': stock_id, 'trade_date': row_date.strftime('%Y-%m-%d')}
+            rows[key][name] = round(value, 4)
+        return list(rows.values())
@@ -0,0 +1,80 @@
+"""
+行情数据批量加载：以单条 values_list 查询读取日线数据，避免逐股票/逐信号查询
+"""
+from typing import Iterable, Iterator, List, Optional, Sequence
+from datetime import date
+import logging
+
+import pandas as pd
+
+from ..models import StockDailyData
+
+logger = logging.getLogger(__name__)
+
+# Oracle 的 IN 列表最多 1000 项，超过需要拆分
+ORACLE_IN_LIMIT = 1000
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount', 'up_limit', 'down_limit')
+
+
+def chunked(items: Sequence, size: int = ORACLE_IN_LIMIT) -> Iterator[Sequence]:
+    """按固定大小切分序列（用于拆分 IN 列表）"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def load_bars_frame(
+    stock_ids: Optional[Iterable[str]],
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    fields: Sequence[str] = ('open', 'high', 'low', 'close'),
+    db_alias: str = 'default'
+) -> pd.DataFrame:
+    """
+    批量加载日线数据为一个 DataFrame
+
+    直接读取 stock_id 外键列（即 ts_code），不 JOIN Code 表，也不构造模型实例。
+
+    Args:
+        stock_ids: 股票代码集合，None 表示全市场
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+        fields: 需要的价格字段
+        db_alias: 数据库别名
+
+    Returns:
+        按 (stock_id, trade_date) 排序的 DataFrame，价格列为 float
+    """
+    columns = ['stock_id', 'trade_date'] + list(fields)
+
+    base_qs = StockDailyData.objects.using(db_alias)
+    if start_date:
+        base_qs = base_qs.filter(trade_date__gte=start_date)
+    if end_date:
+        base_qs = base_qs.filter(trade_date__lte=end_date)
+
+    rows: List[tuple] = []
+    if stock_ids is None:
+        rows.extend(base_qs.values_list(*columns).iterator(chunk_size=5000))
+    else:
+        stock_ids = sorted(set(stock_ids))
+        for chunk in chunked(stock_ids):
+            rows.extend(
+                base_qs.filter(stock_id__in=chunk).values_list(*columns).iterator(chunk_size=5000)
+            )
+
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    if df.empty:
+        return df
+
+    for field in fields:
+        if field == 'volume':
+            df[field] = df[field].astype('int64')
+        else:
+            df[field] = df[field].astype(float)
+    df['trade_date'] = pd.to_datetime(df['trade_date'])
+    df.sort_values(['stock_id', 'trade_date'], inplace=True, kind='mergesort')
+    df.reset_index(drop=True, inplace=True)
+
+    logger.info(f"批量加载日线数据 {len(df)} 条，股票 {df['stock_id'].nunique()} 只")
+    return df
@@ -0,0 +1,193 @@
+"""
+稠密行情面板：(交易日 × 股票) 的连续 NumPy 数组
+
+替代 StrategyService.get_price_data 返回的 {date: {stock: {...}}} 嵌套字典。
+一次 values_list 查询直接读取 stock_id 外键列（即 ts_code，不 JOIN Code 表），
+各价格字段存为二维 float 数组，缺失（停牌、未上市）为 NaN；代码和日期到下标的映射均为 O(1)。
+数组按列（股票）连续存储，逐股票切片（生成数据源、扫描卖出条件）不需要复制。
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+from datetime import date
+import logging
+
+import numpy as np
+
+from ..models import StockDailyData
+from .market_data import chunked
+
+logger = logging.getLogger(__name__)
+
+PANEL_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'up_limit')
+
+# 兼容旧接口 get_price_data 的字段
+LEGACY_FIELDS = ('close', 'high', 'low')
+
+
+class DayPrices:
+    """某个交易日的只读视图，接口与旧嵌套字典的单日字典一致：prices.get(code, {}) -> {'close', ...}"""
+
+    def __init__(self, panel: 'PricePanel', day_idx: int, fields: Sequence[str]):
+        self.panel = panel
+        self.day_idx = day_idx
+        self.fields = fields
+
+    def get(self, stock_code: str, default=None):
+        bar = self.panel.bar(self.day_idx, stock_code, self.fields)
+        return bar if bar is not None else default
+
+    def __contains__(self, stock_code: str) -> bool:
+        stock_idx = self.panel.code_index.get(stock_code)
+        return stock_idx is not None and bool(self.panel.has_data[self.day_idx, stock_idx])
+
+    def __getitem__(self, stock_code: str) -> Dict[str, float]:
+        bar = self.get(stock_code)
+        if bar is None:
+            raise KeyError(stock_code)
+        return bar
+
+
+class PricePanel:
+    """行情面板
+
+    Attributes:
+        days: 交易日（datetime64[D]，升序）
+        dates: 交易日（datetime.date 列表，与 days 一一对应）
+        ordinals: 交易日自 1970-01-01 起的天数，用于计算自然日间隔
+        codes: 股票代码列表（升序）
+        date_index / code_index: 日期、代码到下标的映射
+        has_data: 当日该股票是否有行情
+        open / high / low / close / volume / up_limit: (交易日 × 股票) float 数组
+    """
+
+    def __init__(self, days: np.ndarray, codes: List[str], arrays: Dict[str, np.ndarray]):
+        self.days = days
+        self.dates = days.astype(object).tolist()
+        self.ordinals = days.astype(np.int64)
+        self.codes = codes
+        self.date_index = {value: idx for idx, value in enumerate(self.dates)}
+        self.code_index = {code: idx for idx, code in enumerate(codes)}
+        self.fields = tuple(arrays)
+        for field, values in arrays.items():
+            setattr(self, field, values)
+        if 'close' in arrays:
+            self.has_data = ~np.isnan(arrays['close'])
+        else:
+            self.has_data = ~np.isnan(next(iter(arrays.values())))
+
+    @classmethod
+    def empty(cls, fields: Sequence[str] = PANEL_FIELDS) -> 'PricePanel':
+        days = np.array([], dtype='datetime64[D]')
+        return cls(days, [], {field: np.empty((0, 0), order='F') for field in fields})
+
+    @classmethod
+    def from_rows(cls, rows: List[tuple], fields: Sequence[str] = PANEL_FIELDS) -> 'PricePanel':
+        """
+        由 (stock_id, trade_date, *fields) 行构建面板
+
+        Args:
+            rows: 查询结果行，顺序不限
+            fields: 行中价格字段的顺序
+        """
+        if not rows:
+            return cls.empty(fields)
+
+        columns = list(zip(*rows))
+        codes, stock_idx = np.unique(np.array(columns[0], dtype=object).astype(str), return_inverse=True)
+        days, day_idx = np.unique(np.array(columns[1], dtype='datetime64[D]'), return_inverse=True)
+
+        shape = (len(days), len(codes))
+        arrays = {}
+        for offset, field in enumerate(fields, start=2):
+            matrix = np.full(shape, np.nan, order='F')
+            matrix[day_idx, stock_idx] = np.array(columns[offset], dtype=np.float64)
+            arrays[field] = matrix
+        return cls(days, codes.tolist(), arrays)
+
+    @classmethod
+    def load(
+        cls,
+        stock_codes: Optional[Iterable[str]],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        fields: Sequence[str] = PANEL_FIELDS,
+        db_alias: str = 'default'
+    ) -> 'PricePanel':
+        """
+        读取日线数据为面板（每 1000 只股票一条 values_list 查询，受 Oracle IN 列表长度限制）
+
+        Args:
+            stock_codes: 股票代码集合，None 表示全市场
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+            fields: 需要的价格字段
+            db_alias: 数据库别名
+        """
+        columns = ['stock_id', 'trade_date'] + list(fields)
+
+        base_qs = StockDailyData.objects.using(db_alias)
+        if start_date:
+            base_qs = base_qs.filter(trade_date__gte=start_date)
+        if end_date:
+            base_qs = base_qs.filter(trade_date__lte=end_date)
+
+        rows: List[tuple] = []
+        if stock_codes is None:
+            rows.extend(base_qs.values_list(*columns).iterator(chunk_size=5000))
+        else:
+            for chunk in chunked(sorted(set(stock_codes))):
+                rows.extend(base_qs.filter(stock_id__in=chunk).values_list(*columns).iterator(chunk_size=5000))
+
+        panel = cls.from_rows(rows, fields)
+        logger.info(f"加载行情面板: {len(rows)} 条记录，{len(panel.dates)} 个交易日 × {len(panel.codes)} 只股票")
+        return panel
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.codes
+
+    def day_index(self, values: Iterable[date]) -> np.ndarray:
+        """一组日期对应的交易日下标，不是交易日时为 -1"""
+        targets = np.array(list(values), dtype='datetime64[D]')
+        if not len(self.days):
+            return np.full(len(targets), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.days, targets), len(self.days) - 1)
+        return np.where(self.days[pos] == targets, pos, -1)
+
+    def bar(self, day_idx: int, stock_code: str, fields: Sequence[str] = LEGACY_FIELDS) -> Optional[Dict[str, float]]:
+        """单根日线 {field: value}，无行情时返回 None"""
+        stock_idx = self.code_index.get(stock_code)
+        if stock_idx is None or not self.has_data[day_idx, stock_idx]:
+            return None
+        return {field: float(getattr(self, field)[day_idx, stock_idx]) for field in fields}
+
+    def truncate(self, end_date: date, start_date: Optional[date] = None) -> 'PricePanel':
+        """只保留 [start_date, end_date]（含）内交易日的面板（数组为视图，不复制）"""
+        begin = int(np.searchsorted(self.days, np.datetime64(start_date), side='left')) if start_date else 0
+        stop = int(np.searchsorted(self.days, np.datetime64(end_date), side='right'))
+        if begin == 0 and stop == len(self.days):
+            return self
+        return PricePanel(
+            self.days[begin:stop], self.codes, {field: getattr(self, field)[begin:stop] for field in self.fields}
+        )
+
+    def day_prices(self, day_idx: int, fields: Sequence[str] = LEGACY_FIELDS) -> DayPrices:
+        """某个交易日全部股票的视图（按需取值，不预先构造字典）"""
+        return DayPrices(self, day_idx, fields)
+
+    def stock_rows(self, stock_code: str) -> np.ndarray:
+        """某只股票有行情的交易日下标"""
+        stock_idx = self.code_index.get(stock_code)
+        if stock_idx is None:
+            return np.array([], dtype=np.int64)
+        return np.flatnonzero(self.has_data[:, stock_idx])
+
+    def to_nested(self, fields: Sequence[str] = LEGACY_FIELDS) -> Dict[date, Dict[str, Dict[str, float]]]:
+        """转换为旧接口的嵌套字典 {date: {stock_code: {field: value}}}"""
+        nested = {}
+        day_idx, stock_idx = np.nonzero(self.has_data)
+        values = [getattr(self, field)[day_idx, stock_idx].tolist() for field in fields]
+        for pos, (d, s) in enumerate(zip(day_idx.tolist(), stock_idx.tolist())):
+            nested.setdefault(self.dates[d], {})[self.codes[s]] = {
+                field: column[pos] for field, column in zip(fields, values)
+            }
+        return nested
@@ -0,0 +1,308 @@
+"""
+策略统计汇总服务：按 (信号日期, 策略类型, 股票) 维护预聚合桶，信号状态变化时增量更新
+"""
+from typing import Dict, Iterable, Optional, Tuple
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+import logging
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum
+from django.db.models.functions import Greatest
+
+from ..models import PolicyDetails, StrategyStatsRollup
+
+logger = logging.getLogger(__name__)
+
+# 参与汇总计算的信号字段
+SNAPSHOT_FIELDS = (
+    'date', 'strategy_type', 'stock_id', 'current_status', 'holding_price',
+    'take_profit_point', 'stop_loss_point', 'first_buy_time', 'second_buy_time',
+    'take_profit_time', 'stop_loss_time',
+)
+
+COUNT_FIELDS = (
+    'total_signals', 'first_buy_success', 'second_buy_success', 'failed_signals',
+    'total_hold_days', 'profit_0_3', 'profit_3_5', 'profit_5_7', 'profit_7_10',
+    'profit_above_10',
+)
+
+PROFIT_BUCKETS = (
+    ('profit_0_3', '0-3%'),
+    ('profit_3_5', '3-5%'),
+    ('profit_5_7', '5-7%'),
+    ('profit_7_10', '7-10%'),
+    ('profit_above_10', '>10%'),
+)
+
+
+def snapshot(signal) -> Dict:
+    """提取信号中参与汇总的字段"""
+    return {field: getattr(signal, field) for field in SNAPSHOT_FIELDS}
+
+
+def profit_bucket(profit_rate: float) -> str:
+    """盈利率所属的分布桶（与 ManualStrategyAnalysisView._update_profit_distribution 一致）"""
+    if profit_rate <= 3:
+        return 'profit_0_3'
+    if profit_rate <= 5:
+        return 'profit_3_5'
+    if profit_rate <= 7:
+        return 'profit_5_7'
+    if profit_rate <= 10:
+        return 'profit_7_10'
+    return 'profit_above_10'
+
+
+def contribution(snap: Dict) -> Tuple[Dict[str, int], Optional[Decimal]]:
+    """
+    计算单个信号对汇总桶的贡献
+
+    Returns:
+        (计数增量, 失败信号亏损百分比或 None)
+    """
+    counts = {'total_signals': 1}
+    drawdown = None
+
+    status = snap['current_status']
+    if status not in ('S', 'F'):
+        return counts, drawdown
+
+    end_time = snap['take_profit_time'] if status == 'S' else snap['stop_loss_time']
+    if snap['first_buy_time'] and end_time:
+        counts['total_hold_days'] = max((end_time - snap['first_buy_time']).days, 0)
+
+    holding_price = float(snap['holding_price'] or 0)
+
+    if status == 'S':
+        counts['second_buy_success' if snap['second_buy_time'] else 'first_buy_success'] = 1
+        if holding_price > 0 and snap['take_profit_point'] is not None:
+            profit_rate = round((float(snap['take_profit_point']) - holding_price) / holding_price * 100, 2)
+            counts[profit_bucket(profit_rate)] = 1
+    else:
+        counts['failed_signals'] = 1
+        if holding_price > 0 and snap['stop_loss_point'] is not None:
+            loss = round((holding_price - float(snap['stop_loss_point'])) / holding_price * 100, 2)
+            if loss > 0:
+                drawdown = Decimal(str(loss))
+
+    return counts, drawdown
+
+
+class StrategyRollupService:
+    """策略统计汇总服务类
+
+    汇总桶以信号日期为维度：某个时间窗口的统计即该窗口内生成的信号的结果之和。
+    stock 为空的桶是全市场汇总；开启 STRATEGY_ROLLUP_PER_STOCK 时同时维护单股票桶。
+    max_drawdown 只增不减（信号从失败回滚时不会降低），需要精确值时可重建。
+    """
+
+    def __init__(self, db_alias='default'):
+        self.db_alias = db_alias
+        self.per_stock = getattr(settings, 'STRATEGY_ROLLUP_PER_STOCK', False)
+
+    def _keys(self, snap: Dict):
+        yield (snap['date'], snap['strategy_type'], None)
+        if self.per_stock and snap['stock_id']:
+            yield (snap['date'], snap['strategy_type'], snap['stock_id'])
+
+    def apply_transition(self, old: Optional[Dict], new: Optional[Dict]):
+        """
+        根据信号的旧状态和新状态增量更新汇总桶
+
+        Args:
+            old: 变化前的字段快照，新建信号为 None
+            new: 变化后的字段快照，删除信号为 None
+        """
+        deltas = defaultdict(lambda: defaultdict(int))
+        drawdowns = {}
+
+        for snap, sign in ((old, -1), (new, 1)):
+            if snap is None:
+                continue
+            counts, drawdown = contribution(snap)
+            for key in self._keys(snap):
+                for field, value in counts.items():
+                    deltas[key][field] += sign * value
+                if sign > 0 and drawdown is not None:
+                    drawdowns[key] = drawdown
+
+        for key in set(deltas) | set(drawdowns):
+            changes = {field: value for field, value in deltas[key].items() if value}
+            if changes or key in drawdowns:
+                self._apply(key, changes, drawdowns.get(key))
+
+    def apply_created(self, signals: Iterable):
+        """
+        批量登记新建的信号（用于 bulk_create 等不触发模型信号的路径）
+
+        Args:
+            signals: PolicyDetails 实例或字段快照的可迭代对象
+        """
+        deltas = defaultdict(lambda: defaultdict(int))
+        drawdowns = {}
+
+        for signal in signals:
+            snap = signal if isinstance(signal, dict) else snapshot(signal)
+            counts, drawdown = contribution(snap)
+            for key in self._keys(snap):
+                for field, value in counts.items():
+                    deltas[key][field] += value
+                if drawdown is not None and drawdown > drawdowns.get(key, Decimal('0')):
+                    drawdowns[key] = drawdown
+
+        for key, changes in deltas.items():
+            self._apply(key, dict(changes), drawdowns.get(key))
+
+    def _apply(self, key, changes: Dict[str, int], drawdown: Optional[Decimal]):
+        """对单个汇总桶做原子增量更新，不存在时创建"""
+        bucket_date, strategy_type, stock_id = key
+        queryset = StrategyStatsRollup.objects.using(self.db_alias).filter(
+            date=bucket_date, strategy_type=strategy_type
+        )
+        queryset = queryset.filter(stock_id=stock_id) if stock_id else queryset.filter(stock__isnull=True)
+
+        updates = {field: F(field) + value for field, value in changes.items()}
+        if drawdown is not None:
+            updates['max_drawdown'] = Greatest(F('max_drawdown'), drawdown)
+
+        if queryset.update(**updates):
+            return
+
+        defaults = {field: value for field, value in changes.items() if value > 0}
+        if not defaults and drawdown is None:
+            logger.warning(f"汇总桶 {key} 不存在，忽略扣减: {changes}")
+            return
+        if drawdown is not None:
+            defaults['max_drawdown'] = drawdown
+        try:
+            with transaction.atomic(using=self.db_alias):
+                StrategyStatsRollup.objects.using(self.db_alias).create(
+                    date=bucket_date, strategy_type=strategy_type, stock_id=stock_id, **defaults
+                )
+        except IntegrityError:
+            # 并发创建同一个桶时退回到增量更新
+            queryset.update(**updates)
+
+    def window_stats(
+        self,
+        start_date: date,
+        end_date: date,
+        strategy_type: Optional[str] = None,
+        stock_code: Optional[str] = None
+    ) -> Dict:
+        """
+        汇总时间窗口内的策略统计
+
+        Args:
+            start_date: 信号开始日期（含）
+            end_date: 信号结束日期（含）
+            strategy_type: 策略类型，为空表示全部策略
+            stock_code: 股票代码，为空表示全市场
+
+        Returns:
+            与 ManualStrategyAnalysisView.analyze_signals 结构一致的统计字典，另含 success_rate
+        """
+        if stock_code and not self.per_stock:
+            # 未维护单股票桶时，直接从该股票的信号计算（数据量很小）
+            return self._stats_from_signals(start_date, end_date, strategy_type, stock_code)
+
+        queryset = StrategyStatsRollup.objects.using(self.db_alias).filter(
+            date__range=[start_date, end_date]
+        )
+        if strategy_type:
+            queryset = queryset.filter(strategy_type=strategy_type)
+        if stock_code:
+            queryset = queryset.filter(stock_id=stock_code)
+        else:
+            queryset = queryset.filter(stock__isnull=True)
+
+        aggregates = queryset.aggregate(
+            max_drawdown=Max('max_drawdown'),
+            **{field: Sum(field) for field in COUNT_FIELDS}
+        )
+        totals = {field: aggregates[field] or 0 for field in COUNT_FIELDS}
+        return self._format_stats(totals, aggregates['max_drawdown'] or 0)
+
+    def _stats_from_signals(self, start_date, end_date, strategy_type, stock_code) -> Dict:
+        queryset = PolicyDetails.objects.using(self.db_alias).filter(
+            date__range=[start_date, end_date], stock_id=stock_code
+        )
+        if strategy_type:
+            queryset = queryset.filter(strategy_type=strategy_type)
+
+        totals = dict.fromkeys(COUNT_FIELDS, 0)
+        max_drawdown = Decimal('0')
+        for snap in queryset.values(*SNAPSHOT_FIELDS):
+            counts, drawdown = contribution(snap)
+            for field, value in counts.items():
+                totals[field] += value
+            if drawdown is not None:
+                max_drawdown = max(max_drawdown, drawdown)
+        return self._format_stats(totals, max_drawdown)
+
+    @staticmethod
+    def _format_stats(totals: Dict[str, int], max_drawdown) -> Dict:
+        total = totals['total_signals']
+        success = totals['first_buy_success'] + totals['second_buy_success']
+        return {
+            'first_buy_success': totals['first_buy_success'],
+            'second_buy_success': totals['second_buy_success'],
+            'failed': totals['failed_signals'],
+            'total': total,
+            'total_hold_days': totals['total_hold_days'],
+            'avg_hold_days': round(totals['total_hold_days'] / total, 2) if total else 0,
+            'max_drawdown': float(max_drawdown),
+            'success_rate': round(success / total * 100, 2) if total else 0.00,
+            'profit_distribution': {label: totals[field] for field, label in PROFIT_BUCKETS},
+        }
+
+    def rebuild(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+        """
+        根据信号表重建汇总桶
+
+        Args:
+            start_date: 信号开始日期（含），为空表示不限
+            end_date: 信号结束日期（含），为空表示不限
+
+        Returns:
+            重建的汇总桶数量
+        """
+        signals = PolicyDetails.objects.using(self.db_alias).all()
+        rollups = StrategyStatsRollup.objects.using(self.db_alias).all()
+        if start_date:
+            signals = signals.filter(date__gte=start_date)
+            rollups = rollups.filter(date__gte=start_date)
+        if end_date:
+            signals = signals.filter(date__lte=end_date)
+            rollups = rollups.filter(date__lte=end_date)
+
+        buckets = defaultdict(lambda: defaultdict(int))
+        drawdowns = {}
+        for snap in signals.values(*SNAPSHOT_FIELDS).iterator(chunk_size=5000):
+            counts, drawdown = contribution(snap)
+            for key in self._keys(snap):
+                for field, value in counts.items():
+                    buckets[key][field] += value
+                if drawdown is not None and drawdown > drawdowns.get(key, Decimal('0')):
+                    drawdowns[key] = drawdown
+
+        objects = [
+            StrategyStatsRollup(
+                date=bucket_date,
+                strategy_type=strategy_type,
+                stock_id=stock_id,
+                max_drawdown=drawdowns.get((bucket_date, strategy_type, stock_id), Decimal('0')),
+                **counts
+            )
+            for (bucket_date, strategy_type, stock_id), counts in buckets.items()
+        ]
+
+        with transaction.atomic(using=self.db_alias):
+            rollups.delete()
+            StrategyStatsRollup.objects.using(self.db_alias).bulk_create(objects, batch_size=1000)
+
+        logger.info(f"重建策略统计汇总桶 {len(objects)} 个")
+        return len(objects)
@@ -1,15 +1,28 @@
 """
 策略服务层：封装策略数据访问和业务逻辑
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence
 from datetime import date, timedelta
+from django.db import transaction
 from django.db.models import Q
-from ..models import PolicyDetails, StockDailyData, Code
+from django.utils import timezone
+from ..models import PolicyDetails, Code
+from .data_version import SIGNALS, bump_version_on_commit
+from .market_data import chunked
+from .price_panel import LEGACY_FIELDS, PANEL_FIELDS, PricePanel
+from .strategy_rollup_service import SNAPSHOT_FIELDS, StrategyRollupService
+from .success_rate_service import FEATURE_FIELDS, SuccessRateService
 import logging
 from decimal import Decimal
 
 logger = logging.getLogger(__name__)
 
+# 执行结果会修改的策略字段
+RESULT_FIELDS = [
+    'first_buy_time', 'second_buy_time', 'take_profit_time',
+    'stop_loss_time', 'current_status', 'holding_profit',
+]
+
 
 class StrategySignal:
     """策略信号数据传输对象（DTO）"""
@@ -119,6 +132,22 @@ class StrategyService:
         
         return signals
     
+    def get_price_panel(
+        self,
+        stock_codes: List[str],
+        start_date: date,
+        end_date: date,
+        fields: Sequence[str] = PANEL_FIELDS
+    ) -> PricePanel:
+        """
+        获取指定股票在指定时间范围的行情面板（回测引擎与信号评估共用）
+        
+        Returns:
+            PricePanel: (交易日 × 股票) 数组，缺失为 NaN
+        """
+        logger.info(f"获取 {len(stock_codes)} 只股票的行情面板")
+        return PricePanel.load(stock_codes, start_date, end_date, fields=fields, db_alias=self.db_alias)
+    
     def get_price_data(
         self,
         stock_codes: List[str],
@@ -126,38 +155,39 @@ class StrategyService:
         end_date: date
     ) -> Dict[date, Dict[str, Dict]]:
         """
-        获取指定股票在指定时间范围的价格数据
+        获取指定股票在指定时间范围的价格数据（兼容旧接口，新代码请使用 get_price_panel）
         
         Returns:
             {date: {stock_code: {'close': price, 'high': price, 'low': price}}}
         """
-        logger.info(f"获取 {len(stock_codes)} 只股票的价格数据")
-        
-        daily_data = StockDailyData.objects.filter(
-            stock__ts_code__in=stock_codes,
-            trade_date__range=(start_date, end_date)
-        ).values('trade_date', 'stock__ts_code', 'close', 'high', 'low')
-        
-        # 转换为嵌套字典
-        price_map = {}
-        record_count = 0
-        for record in daily_data:
-            trade_date = record['trade_date']
-            stock_code = record['stock__ts_code']
-            
-            if trade_date not in price_map:
-                price_map[trade_date] = {}
-            
-            price_map[trade_date][stock_code] = {
-                'close': float(record['close']),
-                'high': float(record['high']),
-                'low': float(record['low']),
-            }
-            record_count += 1
-        
-        logger.info(f"获取到 {record_count} 条价格记录，覆盖 {len(price_map)} 个交易日")
-        return price_map
+        panel = self.get_price_panel(stock_codes, start_date, end_date, fields=LEGACY_FIELDS)
+        return panel.to_nested()
     
+    @staticmethod
+    def _apply_result(policy, result_type: str, execution_date: date, profit_rate: Optional[float] = None):
+        """把一次执行结果写入策略对象（不保存）"""
+        # 更新对应的执行时间
+        if result_type == 'first_buy':
+            policy.first_buy_time = execution_date
+        elif result_type == 'second_buy':
+            policy.second_buy_time = execution_date
+        elif result_type == 'take_profit':
+            policy.take_profit_time = execution_date
+            policy.current_status = 'S'
+        elif result_type in ['stop_loss', 'timeout']:
+            if result_type == 'stop_loss':
+                policy.stop_loss_time = execution_date
+            policy.current_status = 'F'
+        
+        # 更新盈利情况
+        if profit_rate is not None:
+            policy.holding_profit = Decimal(str(profit_rate * 100))
+
+    @staticmethod
+    def _snapshot(policy: PolicyDetails) -> Dict:
+        """统计汇总桶与成功率分桶所用的字段快照（与 basic.signals 的快照一致）"""
+        return {field: getattr(policy, field) for field in SNAPSHOT_FIELDS + FEATURE_FIELDS}
+
     def update_strategy_result(
         self,
         stock_code: str,
@@ -194,26 +224,8 @@ class StrategyService:
                 date=signal_date
             )
             
-            # 更新对应的执行时间
-            if result_type == 'first_buy':
-                policy.first_buy_time = execution_date
-                logger.info(f"更新策略 {stock_code} 第一买点时间: {execution_date}")
-            elif result_type == 'second_buy':
-                policy.second_buy_time = execution_date
-                logger.info(f"更新策略 {stock_code} 第二买点时间: {execution_date}")
-            elif result_type == 'take_profit':
-                policy.take_profit_time = execution_date
-                policy.current_status = 'S'
-                logger.info(f"更新策略 {stock_code} 止盈时间: {execution_date}")
-            elif result_type in ['stop_loss', 'timeout']:
-                if result_type == 'stop_loss':
-                    policy.stop_loss_time = execution_date
-                policy.current_status = 'F'
-                logger.info(f"更新策略 {stock_code} 止损/超时: {execution_date}")
-            
-            # 更新盈利情况
-            if profit_rate is not None:
-                policy.holding_profit = Decimal(str(profit_rate * 100))
+            self._apply_result(policy, result_type, execution_date, profit_rate)
+            logger.info(f"更新策略 {stock_code} {result_type}: {execution_date}")
             
             policy.save()
             
@@ -225,3 +237,52 @@ class StrategyService:
             if 'not connected' in str(e).lower():
                 logger.error("数据库连接已断开，跳过策略状态更新")
             # 不抛出异常，让回测继续
+    
+    def bulk_update_strategy_results(self, results: List[tuple]) -> int:
+        """
+        批量更新策略执行结果（一次查询读取、一次 bulk_update 写回）
+        
+        Args:
+            results: [(policy_id, result_type, execution_date, profit_rate)]，按发生顺序排列，
+                     同一策略的多条结果依次应用
+        
+        Returns:
+            更新的策略数量
+        """
+        if not results:
+            return 0
+        
+        policy_ids = list({policy_id for policy_id, *_ in results})
+        policies = {}
+        for chunk in chunked(policy_ids):
+            policies.update(PolicyDetails.objects.using(self.db_alias).in_bulk(chunk))
+        before = {policy_id: self._snapshot(policy) for policy_id, policy in policies.items()}
+        
+        # bulk_update 不会触发 auto_now，与 policy.save() 一样为应用了结果的策略刷新更新时间
+        now = timezone.now()
+        for policy_id, result_type, execution_date, profit_rate in results:
+            policy = policies.get(policy_id)
+            if policy is None:
+                logger.warning(f"策略不存在: id={policy_id}")
+                continue
+            self._apply_result(policy, result_type, execution_date, profit_rate)
+            policy.updated_at = now
+        
+        # bulk_update 不触发模型信号：在同一事务中按变化前后的快照更新统计汇总桶和成功率分桶，
+        # 并手动递增信号数据版本号（与 policy.save() 路径的结果一致）
+        rollup_service = StrategyRollupService(self.db_alias)
+        success_rate_service = SuccessRateService(self.db_alias)
+        with transaction.atomic(using=self.db_alias):
+            PolicyDetails.objects.using(self.db_alias).bulk_update(
+                list(policies.values()), RESULT_FIELDS + ['updated_at'], batch_size=500
+            )
+            for policy_id, policy in policies.items():
+                after = self._snapshot(policy)
+                if after == before[policy_id]:
+                    continue
+                rollup_service.apply_transition(before[policy_id], after)
+                success_rate_service.apply_transition(before[policy_id], after)
+                policy._rollup_snapshot = after
+        bump_version_on_commit(SIGNALS, using=self.db_alias)
+        logger.info(f"批量更新策略执行结果: {len(results)} 条，涉及策略 {len(policies)} 个")
+        return len(policies)
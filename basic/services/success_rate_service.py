@@ -0,0 +1,260 @@
+"""
+历史成功率服务：按形态特征分桶统计已结束信号的结果，新信号生成时 O(1) 查表评分
+"""
+from typing import Dict, Iterable, Optional, Tuple
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+import logging
+
+import pandas as pd
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from ..models import PolicyDetails, SignalOutcomeBucket
+from .data_version import SIGNALS, bump_version
+from .market_data import load_bars_frame
+
+logger = logging.getLogger(__name__)
+
+FEATURE_FIELDS = ('limit_up_streak', 'gap_pct', 'buy_distance_pct')
+
+# 分桶边界（百分比），落在 [edges[i-1], edges[i]) 的值属于第 i 个桶
+GAP_EDGES = (-3, -1, 1, 3)
+DISTANCE_EDGES = (0, 5, 10, 20)
+MAX_STREAK_BUCKET = 4
+
+# 贝叶斯平滑强度：样本少的桶向策略整体成功率收缩
+PRIOR_WEIGHT = 5
+
+# 计算特征所需的回看自然日数（覆盖15个交易日）
+FEATURE_LOOKBACK_DAYS = 40
+
+
+def feature_key(strategy_type: str, streak, gap_pct, distance_pct) -> Optional[Tuple]:
+    """将形态特征映射为分桶键，特征缺失时返回 None"""
+    if streak is None or gap_pct is None or distance_pct is None:
+        return None
+    return (
+        strategy_type,
+        min(int(streak), MAX_STREAK_BUCKET),
+        bisect_right(GAP_EDGES, float(gap_pct)),
+        bisect_right(DISTANCE_EDGES, float(distance_pct)),
+    )
+
+
+def compute_features(bars: pd.DataFrame, first_buy_point) -> Optional[Dict]:
+    """
+    根据信号日及之前的日线计算形态特征
+
+    Args:
+        bars: 单只股票按日期升序的日线（需包含 open/close/up_limit 列），最后一行为信号日
+        first_buy_point: 第一买点价格
+
+    Returns:
+        {'limit_up_streak', 'gap_pct', 'buy_distance_pct'}，数据不足时返回 None
+    """
+    if bars is None or len(bars) < 2 or not first_buy_point:
+        return None
+
+    recent = bars.iloc[-15:]
+    is_limit = (recent['close'] >= recent['up_limit']).to_numpy() & recent['up_limit'].notna().to_numpy()
+    streak = longest = 0
+    for flag in is_limit:
+        streak = streak + 1 if flag else 0
+        longest = max(longest, streak)
+
+    prev_close = float(bars['close'].iloc[-2])
+    last_open = float(bars['open'].iloc[-1])
+    last_close = float(bars['close'].iloc[-1])
+    first_buy_point = float(first_buy_point)
+
+    gap_pct = (last_open - prev_close) / prev_close * 100 if prev_close else 0.0
+    distance_pct = (last_close - first_buy_point) / first_buy_point * 100
+
+    return {
+        'limit_up_streak': int(longest),
+        'gap_pct': Decimal(str(round(gap_pct, 2))),
+        'buy_distance_pct': Decimal(str(round(distance_pct, 2))),
+    }
+
+
+def load_feature_bars(stock_ids: Iterable[str], trade_date: date) -> Dict[str, pd.DataFrame]:
+    """一次查询加载一批股票计算特征所需的日线，按股票拆分"""
+    frame = load_bars_frame(
+        stock_ids,
+        start_date=trade_date - timedelta(days=FEATURE_LOOKBACK_DAYS),
+        end_date=trade_date,
+        fields=('open', 'close', 'up_limit'),
+    )
+    if frame.empty:
+        return {}
+    return {stock_id: group for stock_id, group in frame.groupby('stock_id', sort=False)}
+
+
+class SuccessRateIndex:
+    """历史成功率查找表
+
+    启动一次扫描时通过 load() 一次查询载入全部分桶，之后每个信号的评分都是字典查找。
+    """
+
+    def __init__(self, buckets: Dict[Tuple, Tuple[int, int]]):
+        self.buckets = buckets
+        self.strategy_totals = defaultdict(lambda: [0, 0])
+        for key, (success, resolved) in buckets.items():
+            totals = self.strategy_totals[key[0]]
+            totals[0] += success
+            totals[1] += resolved
+
+    @classmethod
+    def load(cls, db_alias='default') -> 'SuccessRateIndex':
+        rows = SignalOutcomeBucket.objects.using(db_alias).values_list(
+            'strategy_type', 'streak_bucket', 'gap_bucket', 'distance_bucket',
+            'success_count', 'resolved_count'
+        )
+        return cls({tuple(row[:4]): (row[4], row[5]) for row in rows})
+
+    def score(self, strategy_type: str, features: Optional[Dict]) -> Optional[Dict]:
+        """
+        查表计算信号的历史成功率和信号强度
+
+        Returns:
+            {'success_rate': 0-100, 'signal_strength': 0-1, 'samples': 样本数}，无历史数据时返回 None
+        """
+        if not features:
+            return None
+        key = feature_key(strategy_type, *(features[field] for field in FEATURE_FIELDS))
+        success_total, resolved_total = self.strategy_totals.get(strategy_type, (0, 0))
+        if key is None or resolved_total == 0:
+            return None
+
+        prior = success_total / resolved_total
+        success, resolved = self.buckets.get(key, (0, 0))
+        rate = (success + PRIOR_WEIGHT * prior) / (resolved + PRIOR_WEIGHT)
+
+        return {
+            'success_rate': Decimal(str(round(rate * 100, 2))),
+            'signal_strength': Decimal(str(round(rate, 2))),
+            'samples': resolved,
+        }
+
+
+class SuccessRateService:
+    """历史成功率分桶维护服务"""
+
+    def __init__(self, db_alias='default'):
+        self.db_alias = db_alias
+
+    @staticmethod
+    def _outcome(snap: Optional[Dict]) -> Optional[Tuple[Tuple, int]]:
+        """已结束且带特征的信号返回 (分桶键, 是否成功)"""
+        if not snap or snap.get('current_status') not in ('S', 'F'):
+            return None
+        key = feature_key(snap['strategy_type'], *(snap.get(field) for field in FEATURE_FIELDS))
+        if key is None:
+            return None
+        return key, int(snap['current_status'] == 'S')
+
+    def apply_transition(self, old: Optional[Dict], new: Optional[Dict]):
+        """根据信号的旧状态和新状态增量更新分桶"""
+        old_outcome = self._outcome(old)
+        new_outcome = self._outcome(new)
+        if old_outcome == new_outcome:
+            return
+        if old_outcome:
+            self._apply(old_outcome[0], -1, -old_outcome[1])
+        if new_outcome:
+            self._apply(new_outcome[0], 1, new_outcome[1])
+
+    def _apply(self, key: Tuple, resolved: int, success: int):
+        strategy_type, streak_bucket, gap_bucket, distance_bucket = key
+        queryset = SignalOutcomeBucket.objects.using(self.db_alias).filter(
+            strategy_type=strategy_type,
+            streak_bucket=streak_bucket,
+            gap_bucket=gap_bucket,
+            distance_bucket=distance_bucket
+        )
+        updates = {'resolved_count': F('resolved_count') + resolved, 'success_count': F('success_count') + success}
+        if queryset.update(**updates) or resolved < 0:
+            return
+        try:
+            with transaction.atomic(using=self.db_alias):
+                SignalOutcomeBucket.objects.using(self.db_alias).create(
+                    strategy_type=strategy_type,
+                    streak_bucket=streak_bucket,
+                    gap_bucket=gap_bucket,
+                    distance_bucket=distance_bucket,
+                    resolved_count=resolved,
+                    success_count=success
+                )
+        except IntegrityError:
+            queryset.update(**updates)
+
+    def rebuild(self) -> int:
+        """根据已结束的信号重建全部分桶，返回分桶数量"""
+        counts = defaultdict(lambda: [0, 0])
+        resolved = PolicyDetails.objects.using(self.db_alias).filter(
+            current_status__in=['S', 'F'],
+            limit_up_streak__isnull=False
+        ).values('strategy_type', 'current_status', *FEATURE_FIELDS)
+
+        for snap in resolved.iterator(chunk_size=5000):
+            outcome = self._outcome(snap)
+            if outcome is None:
+                continue
+            key, success = outcome
+            counts[key][0] += 1
+            counts[key][1] += success
+
+        objects = [
+            SignalOutcomeBucket(
+                strategy_type=key[0],
+                streak_bucket=key[1],
+                gap_bucket=key[2],
+                distance_bucket=key[3],
+                resolved_count=resolved_count,
+                success_count=success_count
+            )
+            for key, (resolved_count, success_count) in counts.items()
+        ]
+        with transaction.atomic(using=self.db_alias):
+            SignalOutcomeBucket.objects.using(self.db_alias).all().delete()
+            SignalOutcomeBucket.objects.using(self.db_alias).bulk_create(objects, batch_size=1000)
+
+        logger.info(f"重建信号结果分桶 {len(objects)} 个")
+        return len(objects)
+
+    def backfill_features(self, start_date: Optional[date] = None) -> int:
+        """
+        为缺少形态特征的历史信号补算特征（每个信号日期一次日线查询）
+
+        Returns:
+            补算的信号数量
+        """
+        queryset = PolicyDetails.objects.using(self.db_alias).filter(limit_up_streak__isnull=True)
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+
+        by_date = defaultdict(list)
+        for signal in queryset.only('id', 'stock_id', 'date', 'first_buy_point').iterator(chunk_size=2000):
+            by_date[signal.date].append(signal)
+
+        updated = 0
+        for signal_date, signals in sorted(by_date.items()):
+            bars_by_stock = load_feature_bars({s.stock_id for s in signals}, signal_date)
+            changed = []
+            for signal in signals:
+                features = compute_features(bars_by_stock.get(signal.stock_id), signal.first_buy_point)
+                if features:
+                    for field, value in features.items():
+                        setattr(signal, field, value)
+                    changed.append(signal)
+            if changed:
+                PolicyDetails.objects.using(self.db_alias).bulk_update(changed, FEATURE_FIELDS, batch_size=500)
+                updated += len(changed)
+
+        if updated:
+            bump_version(SIGNALS)
+        logger.info(f"补算形态特征 {updated} 个信号")
+        return updated
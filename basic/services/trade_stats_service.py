@@ -0,0 +1,163 @@
+"""
+交易统计服务：批量计算信号的持仓天数、最大有利偏移（MFE）、最大不利偏移（MAE）和最终收益
+"""
+from typing import Dict, Iterable, Union
+import logging
+
+import numpy as np
+import pandas as pd
+from django.db.models import QuerySet
+
+from ..models import PolicyDetails
+from .market_data import chunked, load_bars_frame
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_FIELDS = (
+    'id', 'stock_id', 'first_buy_time', 'holding_price', 'current_status',
+    'take_profit_point', 'stop_loss_point', 'take_profit_time', 'stop_loss_time',
+)
+
+
+def empty_stats() -> Dict:
+    """未买入或无数据时的统计结果"""
+    return {
+        'holding_days': 0,
+        'max_profit': 0,
+        'max_drawdown': 0,
+        'final_profit': 0
+    }
+
+
+class TradeStatsService:
+    """交易统计服务类
+
+    与 StockDataFetcher.calculate_trading_stats 的口径一致：
+    - holding_days: 已结束信号为买入到止盈/止损的天数，进行中信号为买入到最新交易日的天数
+    - max_profit: 持仓期间最高价相对持仓价的涨幅（MFE，百分比）
+    - max_drawdown: 持仓期间最低价相对持仓价的跌幅（MAE，百分比）
+    持仓期间为买入日至止盈/止损日（已结束信号）或最新交易日（进行中信号）。
+    - final_profit: 止盈价/止损价/最新收盘价相对持仓价的收益（百分比）
+
+    所有信号只需一次信号查询和一次日线查询（按 Oracle IN 上限拆分）。
+    """
+
+    def __init__(self, db_alias='default'):
+        self.db_alias = db_alias
+
+    def calculate_batch(
+        self,
+        signals: Union[QuerySet, Iterable[int]]
+    ) -> Dict[int, Dict]:
+        """
+        批量计算交易统计指标
+
+        Args:
+            signals: PolicyDetails 查询集，或信号 id 列表
+
+        Returns:
+            {signal_id: {'holding_days', 'max_profit', 'max_drawdown', 'final_profit'}}
+        """
+        signals_df = self._load_signals(signals)
+        if signals_df.empty:
+            return {}
+
+        result = {int(signal_id): empty_stats() for signal_id in signals_df['id']}
+
+        bought = signals_df[signals_df['first_buy_time'].notna()].copy()
+        if bought.empty:
+            return result
+
+        bought['first_buy_time'] = pd.to_datetime(bought['first_buy_time'])
+        finished = bought['current_status'].isin(['S', 'F'])
+        bought['exit_time'] = pd.to_datetime(
+            bought['take_profit_time'].fillna(bought['stop_loss_time'])
+        ).where(finished)
+        bars = load_bars_frame(
+            stock_ids=bought['stock_id'].unique(),
+            start_date=bought['first_buy_time'].min().date(),
+            fields=('high', 'low', 'close'),
+            db_alias=self.db_alias
+        )
+        if bars.empty:
+            return result
+
+        # 信号与其股票的日线按股票连接，只保留持仓期间的K线（已结束信号截止到止盈/止损日）
+        merged = bought[['id', 'stock_id', 'first_buy_time', 'exit_time']].merge(bars, on='stock_id', how='inner')
+        merged = merged[
+            (merged['trade_date'] >= merged['first_buy_time'])
+            & ~(merged['trade_date'] > merged['exit_time'])
+        ]
+        if merged.empty:
+            return result
+
+        # merged 保持 (stock_id, trade_date) 的有序性，last 即最新交易日
+        agg = merged.groupby('id', sort=False).agg(
+            max_high=('high', 'max'),
+            min_low=('low', 'min'),
+            last_date=('trade_date', 'last'),
+            last_close=('close', 'last'),
+        )
+        frame = bought.set_index('id').join(agg, how='inner')
+
+        hp = frame['holding_price'].to_numpy(dtype=float)
+        first_buy = frame['first_buy_time']
+        finished = frame['current_status'].isin(['S', 'F']).to_numpy()
+
+        end_time = frame['exit_time']
+        end_date = np.where(finished, end_time, frame['last_date'])
+        holding_days = (pd.to_datetime(end_date) - first_buy).dt.days
+
+        # 已结束但缺少结束时间的信号与原实现一致：不计算任何指标
+        valid = ~(finished & end_time.isna().to_numpy())
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            max_price = np.maximum(frame['max_high'].to_numpy(), hp)
+            min_price = np.minimum(frame['min_low'].to_numpy(), hp)
+            max_profit = (max_price - hp) / hp * 100
+            max_drawdown = (hp - min_price) / hp * 100
+
+            exit_price = np.select(
+                [frame['current_status'].to_numpy() == 'S', frame['current_status'].to_numpy() == 'F'],
+                [frame['take_profit_point'].to_numpy(dtype=float), frame['stop_loss_point'].to_numpy(dtype=float)],
+                default=frame['last_close'].to_numpy()
+            )
+            final_profit = (exit_price - hp) / hp * 100
+
+        has_price = hp > 0
+        for pos, signal_id in enumerate(frame.index):
+            if not valid[pos]:
+                continue
+            stats = result[int(signal_id)]
+            stats['holding_days'] = int(holding_days.iloc[pos])
+            if has_price[pos]:
+                stats['max_profit'] = round(float(max_profit[pos]), 2)
+                stats['max_drawdown'] = round(float(max_drawdown[pos]), 2)
+                stats['final_profit'] = round(float(final_profit[pos]), 2)
+
+        logger.info(f"批量计算 {len(result)} 个信号的交易统计")
+        return result
+
+    def _load_signals(self, signals) -> pd.DataFrame:
+        """读取信号字段为 DataFrame"""
+        if isinstance(signals, QuerySet):
+            rows = list(signals.using(self.db_alias).values_list(*SIGNAL_FIELDS))
+        else:
+            signal_ids = list(signals)
+            rows = []
+            for chunk in chunked(signal_ids):
+                rows.extend(
+                    PolicyDetails.objects.using(self.db_alias)
+                    .filter(id__in=chunk)
+                    .values_list(*SIGNAL_FIELDS)
+                )
+
+        df = pd.DataFrame.from_records(rows, columns=SIGNAL_FIELDS)
+        if not df.empty:
+            for col in ('holding_price', 'take_profit_point', 'stop_loss_point'):
+                df[col] = df[col].astype(float)
+        return df
+
+    def calculate_one(self, signal: PolicyDetails) -> Dict:
+        """计算单个信号的统计指标"""
+        return self.calculate_batch([signal.id]).get(signal.id, empty_stats())
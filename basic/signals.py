@@ -0,0 +1,79 @@
+"""
+模型信号：PolicyDetails 状态变化时增量维护策略统计汇总桶和历史成功率分桶，并递增信号数据版本号；
+Code 变化时递增股票代码数据版本号，使各进程的搜索索引重建
+"""
+import logging
+
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Code, PolicyDetails
+from .services.code_search import invalidate_index
+from .services.data_version import CODES, SIGNALS, bump_version_on_commit
+from .services.strategy_rollup_service import SNAPSHOT_FIELDS, StrategyRollupService
+from .services.success_rate_service import FEATURE_FIELDS, SuccessRateService
+
+logger = logging.getLogger(__name__)
+
+TRACKED_FIELDS = SNAPSHOT_FIELDS + FEATURE_FIELDS
+
+
+def _snapshot(instance):
+    return {field: getattr(instance, field) for field in TRACKED_FIELDS}
+
+
+def _loaded_snapshot(instance):
+    """实例字段完整加载时返回快照，存在延迟加载字段时返回 None（避免额外查询）"""
+    if any(field not in instance.__dict__ for field in TRACKED_FIELDS):
+        return None
+    return _snapshot(instance)
+
+
+def _apply_transition(old, new, using, pk):
+    for service in (StrategyRollupService(using), SuccessRateService(using)):
+        try:
+            service.apply_transition(old, new)
+        except Exception as e:
+            logger.error(f"{service.__class__.__name__} 增量更新失败 (signal {pk}): {str(e)}")
+
+
+@receiver(post_init, sender=PolicyDetails)
+def remember_policy_state(sender, instance, **kwargs):
+    instance._rollup_snapshot = _loaded_snapshot(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=PolicyDetails)
+def load_policy_state(sender, instance, raw=False, using=None, **kwargs):
+    # 使用 .only()/.defer() 读取的实例没有完整快照，保存前从数据库补齐
+    if raw or not instance.pk or instance._rollup_snapshot is not None:
+        return
+    instance._rollup_snapshot = (
+        PolicyDetails.objects.using(using).filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=PolicyDetails)
+def update_rollup_on_save(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    new = _snapshot(instance)
+    old = None if created else instance._rollup_snapshot
+    _apply_transition(old, new, using, instance.pk)
+    instance._rollup_snapshot = new
+    bump_version_on_commit(SIGNALS, using)
+
+
+@receiver(post_delete, sender=PolicyDetails)
+def update_rollup_on_delete(sender, instance, using=None, **kwargs):
+    old = instance._rollup_snapshot or _snapshot(instance)
+    _apply_transition(old, None, using, instance.pk)
+    bump_version_on_commit(SIGNALS, using)
+
+
+@receiver(post_save, sender=Code)
+@receiver(post_delete, sender=Code)
+def refresh_code_search_index(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    invalidate_index()
+    bump_version_on_commit(CODES, using)
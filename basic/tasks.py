@@ -8,15 +8,16 @@ from .models import (
     StockAnalysis
 )
 from .utils import StockDataFetcher
-from .analysis import ContinuousLimitStrategy
-from .views import ManualStrategyAnalysisView
+from .analysis import ContinuousLimitStrategy, TechnicalAnalysis
+from .services.strategy_rollup_service import StrategyRollupService
+from .services.indicator_service import IndicatorService
+from .services.browse_analytics import BrowseAnalyticsService
+from .locks import DEFAULT_LOCK_TTL, DistributedLock
 from datetime import datetime, timedelta
 import logging
 from celery.exceptions import MaxRetriesExceededError
 from django_celery_results.models import TaskResult
-from django.core.cache import cache
 from contextlib import contextmanager
-import time
 import traceback
 from django.conf import settings
 from decouple import config
@@ -25,20 +26,23 @@ from django.utils import timezone
 logger = logging.getLogger(__name__)
 
 @contextmanager
-def task_lock(lock_id, timeout=3600):
-    """使用 Redis 实现的分布式锁"""
-    lock_id = f'lock_{lock_id}'
-    timeout_at = time.monotonic() + timeout
+def task_lock(lock_id, ttl=DEFAULT_LOCK_TTL):
+    """基于 Redis 的分布式任务锁
+    
+    非阻塞获取：锁已被其他任务持有时立即返回 False；持有期间后台心跳续期，
+    任务退出时只释放自己持有的锁。
+    
+    Args:
+        lock_id (str): 锁名称
+        ttl (int): 锁过期时间（秒），进程异常退出后最多 ttl 秒自动释放
+    """
+    lock = DistributedLock(f'task_{lock_id}', ttl=ttl)
     try:
-        while time.monotonic() < timeout_at:
-            if cache.add(lock_id, 'lock', timeout):
-                yield True
-                break
-            time.sleep(0.1)
-        else:
-            yield False
+        yield lock.acquire()
     finally:
-        cache.delete(lock_id)
+        lock.release()
+        if lock.lost:
+            logger.error(f"任务 {lock_id} 执行期间丢失了分布式锁")
 
 @shared_task
 def update_daily_data_and_signals():
@@ -97,7 +101,7 @@ def daily_data_update(self):
     """每日更新股票数据"""
     logger.info("开始执行每日数据更新任务")
     try:
-        with task_lock('daily_data_update', timeout=3600) as acquired:
+        with task_lock('daily_data_update') as acquired:
             if not acquired:
                 logger.warning('Another daily_data_update task is already running')
                 return "Task already running"
@@ -122,6 +126,17 @@ def daily_data_update(self):
                 
                 if result.get('status') == 'success':
                     logger.info(f"成功更新 {result.get('total_saved', 0)} 条日线数据")
+                    
+                    # 日线入库后增量更新技术指标（失败不影响日线更新结果）；
+                    # 没有状态的股票不在日更任务中回放历史，交给独立的回放任务
+                    try:
+                        indicator_result = IndicatorService().update_for_date(today)
+                        logger.info(f"技术指标更新完成: {indicator_result}")
+                        if indicator_result['skipped']:
+                            backfill_indicators.delay()
+                    except Exception as indicator_error:
+                        logger.error(f"技术指标更新失败: {str(indicator_error)}")
+                    
                     return f"Successfully updated {result.get('total_saved', 0)} records"
                 else:
                     logger.warning(f"更新日线数据失败: {result.get('message')}")
@@ -273,26 +288,28 @@ def daily_stats_analysis():
             return "Not a trading day"
         
         try:
-            # 执行统计分析
-            analysis_view = ManualStrategyAnalysisView()
-            stats = analysis_view.analyze_signals(yesterday, today)
+            # 从增量维护的汇总桶中汇总窗口统计，不再重新分析全部信号
+            stats = StrategyRollupService().window_stats(yesterday, today)
             
-            # 保存统计结果
+            # 保存统计结果（同一天重复执行时覆盖当天记录）
             if stats['total'] > 0:
-                StrategyStats.objects.create(
+                StrategyStats.objects.update_or_create(
                     date=today,
-                    total_signals=stats['total'],
-                    first_buy_success=stats['first_buy_success'],
-                    second_buy_success=stats['second_buy_success'],
-                    failed_signals=stats['failed'],
-                    success_rate=round((stats['first_buy_success'] + stats['second_buy_success']) / stats['total'] * 100, 2),
-                    avg_hold_days=stats['avg_hold_days'],
-                    max_drawdown=stats['max_drawdown'],
-                    profit_0_3=stats['profit_distribution']['0-3%'],
-                    profit_3_5=stats['profit_distribution']['3-5%'],
-                    profit_5_7=stats['profit_distribution']['5-7%'],
-                    profit_7_10=stats['profit_distribution']['7-10%'],
-                    profit_above_10=stats['profit_distribution']['>10%']
+                    stock=None,
+                    defaults={
+                        'total_signals': stats['total'],
+                        'first_buy_success': stats['first_buy_success'],
+                        'second_buy_success': stats['second_buy_success'],
+                        'failed_signals': stats['failed'],
+                        'success_rate': stats['success_rate'],
+                        'avg_hold_days': stats['avg_hold_days'],
+                        'max_drawdown': stats['max_drawdown'],
+                        'profit_0_3': stats['profit_distribution']['0-3%'],
+                        'profit_3_5': stats['profit_distribution']['3-5%'],
+                        'profit_5_7': stats['profit_distribution']['5-7%'],
+                        'profit_7_10': stats['profit_distribution']['7-10%'],
+                        'profit_above_10': stats['profit_distribution']['>10%']
+                    }
                 )
                 logger.info(f"成功保存统计数据")
                 return True
@@ -445,3 +462,76 @@ def analyze_trading_signals_weekly():
             'message': str(e)
         }
 
+
+@shared_task
+def ma_cross_scan_daily(short_window=5, long_window=10):
+    """每日全市场均线金叉扫描
+    
+    功能说明：
+    1. 检查是否为交易日
+    2. 向量化计算全市场均线并识别当日金叉
+    3. 批量写入 MA_CROSS 策略信号
+    """
+    try:
+        today = datetime.now().date()
+        
+        trading_day = TradingCalendar.objects.filter(
+            date=today,
+            is_trading_day=True
+        ).exists()
+        
+        if not trading_day:
+            logger.info(f"{today} 不是交易日，跳过均线扫描")
+            return {
+                'status': 'skipped',
+                'message': f"{today} 不是交易日"
+            }
+        
+        result = TechnicalAnalysis.scan_market(
+            today, today,
+            short_window=short_window,
+            long_window=long_window
+        )
+        logger.info(f"均线金叉扫描完成: 信号 {result['signals']} 个，新写入 {result['created']} 个")
+        return {
+            'status': 'success',
+            **result
+        }
+        
+    except Exception as e:
+        logger.error(f"均线金叉扫描失败: {str(e)}")
+        return {
+            'status': 'error',
+            'message': str(e)
+        }
+
+
+@shared_task
+def backfill_indicators(stock_ids=None):
+    """回放历史日线补算技术指标（冷启动），已有最新状态的股票不会重复计算"""
+    try:
+        with task_lock('backfill_indicators') as acquired:
+            if not acquired:
+                logger.warning('Another backfill_indicators task is already running')
+                return "Task already running"
+            result = IndicatorService().backfill(stock_ids)
+            return f"Backfilled indicators for {result['stocks']} stocks, {result['values']} values"
+    except Exception as e:
+        logger.error(f"技术指标回放失败: {str(e)}")
+        raise
+
+
+@shared_task
+def purge_browse_records(retention_days=None):
+    """清理保留期之前的浏览记录"""
+    retention_days = retention_days or settings.BROWSE_RECORD_RETENTION_DAYS
+    try:
+        with task_lock('purge_browse_records') as acquired:
+            if not acquired:
+                logger.warning('Another purge_browse_records task is already running')
+                return "Task already running"
+            deleted = BrowseAnalyticsService().purge(retention_days)
+            return f"Deleted {deleted} browse records older than {retention_days} days"
+    except Exception as e:
+        logger.error(f"清理浏览记录失败: {str(e)}")
+        raise
@@ -1,3 +1,924 @@
+"""
+basic 应用测试代码
+"""
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from datetime import date, timedelta
+from decimal import Decimal
+import json
+import time
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from rest_framework.test import APIClient
+
+from .analysis import ContinuousLimitStrategy, TechnicalAnalysis
+from .models import Code, PolicyDetails, StockDailyData
+from .services.trade_stats_service import TradeStatsService
+from .services.strategy_rollup_service import StrategyRollupService
+from .services.success_rate_service import SuccessRateIndex, SuccessRateService, compute_features
+from .services.indicator_service import IndicatorService
+from .services.price_panel import PricePanel
+from .services.strategy_service import StrategyService
+
+
+class TradeStatsServiceTest(TestCase):
+    """批量交易统计测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.stock = Code.objects.create(
+            ts_code='600000.SH',
+            symbol='600000',
+            name='浦发银行',
+            list_status='L',
+            list_date='1999-11-10'
+        )
+        self.start = date(2024, 1, 2)
+        closes = [10.0, 10.5, 11.0, 9.8, 10.2]
+        for i, close in enumerate(closes):
+            StockDailyData.objects.create(
+                stock=self.stock,
+                trade_date=self.start + timedelta(days=i),
+                open=Decimal(str(close)),
+                high=Decimal(str(close + 0.3)),
+                low=Decimal(str(close - 0.3)),
+                close=Decimal(str(close)),
+                volume=1000,
+                amount=Decimal('10000')
+            )
+
+        self.holding = PolicyDetails.objects.create(
+            stock=self.stock,
+            date=date(2024, 1, 1),
+            first_buy_point=Decimal('10.00'),
+            second_buy_point=Decimal('9.50'),
+            stop_loss_point=Decimal('9.00'),
+            take_profit_point=Decimal('12.00'),
+            holding_price=Decimal('10.00'),
+            first_buy_time=self.start,
+            current_status='L'
+        )
+        self.failed = PolicyDetails.objects.create(
+            stock=self.stock,
+            date=date(2024, 1, 2),
+            first_buy_point=Decimal('10.50'),
+            second_buy_point=Decimal('10.00'),
+            stop_loss_point=Decimal('9.50'),
+            take_profit_point=Decimal('12.00'),
+            holding_price=Decimal('10.50'),
+            first_buy_time=self.start + timedelta(days=1),
+            stop_loss_time=self.start + timedelta(days=3),
+            current_status='F'
+        )
+        self.not_bought = PolicyDetails.objects.create(
+            stock=self.stock,
+            date=date(2024, 1, 3),
+            first_buy_point=Decimal('8.00'),
+            second_buy_point=Decimal('7.50'),
+            stop_loss_point=Decimal('7.00'),
+            take_profit_point=Decimal('9.00'),
+            current_status='L'
+        )
+
+    def test_calculate_batch(self):
+        """测试批量计算结果与逐信号口径一致"""
+        stats = TradeStatsService().calculate_batch(PolicyDetails.objects.all())
+
+        self.assertEqual(stats[self.holding.id], {
+            'holding_days': 4,
+            'max_profit': 13.0,
+            'max_drawdown': 5.0,
+            'final_profit': 2.0
+        })
+        self.assertEqual(stats[self.failed.id]['holding_days'], 2)
+        self.assertEqual(stats[self.failed.id]['max_profit'], 7.62)
+        self.assertEqual(stats[self.failed.id]['max_drawdown'], 9.52)
+        self.assertEqual(stats[self.failed.id]['final_profit'], -9.52)
+        self.assertEqual(stats[self.not_bought.id]['holding_days'], 0)
+
+    def test_excursion_stops_at_exit(self):
+        """测试已结束信号的 MFE/MAE 只统计到止损日，之后的行情不影响结果"""
+        StockDailyData.objects.create(
+            stock=self.stock,
+            trade_date=self.start + timedelta(days=5),
+            open=Decimal('15.00'),
+            high=Decimal('20.00'),
+            low=Decimal('5.00'),
+            close=Decimal('15.00'),
+            volume=1000,
+            amount=Decimal('10000')
+        )
+        stats = TradeStatsService().calculate_batch(PolicyDetails.objects.all())
+
+        self.assertEqual(stats[self.failed.id]['max_profit'], 7.62)
+        self.assertEqual(stats[self.failed.id]['max_drawdown'], 9.52)
+        self.assertEqual(stats[self.holding.id]['max_profit'], 100.0)
+
+    def test_calculate_batch_by_ids(self):
+        """测试按信号ID批量计算"""
+        stats = TradeStatsService().calculate_batch([self.holding.id])
+        self.assertEqual(list(stats.keys()), [self.holding.id])
+
+
+class StrategyRollupServiceTest(TestCase):
+    """策略统计汇总增量维护测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.stock = Code.objects.create(
+            ts_code='000001.SZ',
+            symbol='000001',
+            name='平安银行',
+            list_status='L',
+            list_date='1991-04-03'
+        )
+        self.signal_date = date(2024, 1, 10)
+
+    def _create_signal(self, **kwargs):
+        defaults = {
+            'stock': self.stock,
+            'date': self.signal_date,
+            'first_buy_point': Decimal('10.00'),
+            'second_buy_point': Decimal('9.50'),
+            'stop_loss_point': Decimal('9.00'),
+            'take_profit_point': Decimal('10.80'),
+            'current_status': 'L'
+        }
+        defaults.update(kwargs)
+        return PolicyDetails.objects.create(**defaults)
+
+    def test_incremental_rollup_matches_rebuild(self):
+        """测试状态变化的增量更新与全量重建结果一致"""
+        signal = self._create_signal()
+        other = self._create_signal(date=date(2024, 1, 11))
+        service = StrategyRollupService()
+
+        stats = service.window_stats(date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(stats['total'], 2)
+        self.assertEqual(stats['first_buy_success'], 0)
+
+        # 第一买点止盈
+        signal.holding_price = Decimal('10.00')
+        signal.first_buy_time = date(2024, 1, 12)
+        signal.take_profit_time = date(2024, 1, 17)
+        signal.current_status = 'S'
+        signal.save()
+
+        # 止损失败
+        other.holding_price = Decimal('10.00')
+        other.first_buy_time = date(2024, 1, 12)
+        other.stop_loss_time = date(2024, 1, 15)
+        other.current_status = 'F'
+        other.save()
+
+        stats = service.window_stats(date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(stats['first_buy_success'], 1)
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['total_hold_days'], 8)
+        self.assertEqual(stats['profit_distribution']['7-10%'], 1)
+        self.assertEqual(stats['max_drawdown'], 10.0)
+        self.assertEqual(stats['success_rate'], 50.0)
+
+        # 窗口只包含第一个信号
+        stats = service.window_stats(date(2024, 1, 10), date(2024, 1, 10))
+        self.assertEqual(stats['total'], 1)
+        self.assertEqual(stats['failed'], 0)
+
+        incremental = service.window_stats(date(2024, 1, 1), date(2024, 1, 31))
+        service.rebuild()
+        self.assertEqual(service.window_stats(date(2024, 1, 1), date(2024, 1, 31)), incremental)
+
+        # 删除信号后扣减
+        other.delete()
+        stats = service.window_stats(date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(stats['total'], 1)
+        self.assertEqual(stats['failed'], 0)
+
+
+class SuccessRateServiceTest(TestCase):
+    """历史成功率分桶测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.stock = Code.objects.create(
+            ts_code='600000.SH',
+            symbol='600000',
+            name='浦发银行',
+            list_status='L',
+            list_date='1999-11-10'
+        )
+        self.features = {
+            'limit_up_streak': 2,
+            'gap_pct': Decimal('0.50'),
+            'buy_distance_pct': Decimal('3.00')
+        }
+
+    def _create_signal(self, signal_date, **kwargs):
+        return PolicyDetails.objects.create(
+            stock=self.stock,
+            date=signal_date,
+            first_buy_point=Decimal('10.00'),
+            second_buy_point=Decimal('9.50'),
+            stop_loss_point=Decimal('9.00'),
+            take_profit_point=Decimal('10.80'),
+            **self.features,
+            **kwargs
+        )
+
+    def test_index_updates_on_resolve(self):
+        """测试信号结束时分桶增量更新，查表结果与重建一致"""
+        success = self._create_signal(date(2024, 1, 2))
+        failed = self._create_signal(date(2024, 1, 3))
+        self._create_signal(date(2024, 1, 4))
+
+        success.current_status = 'S'
+        success.save()
+        failed.current_status = 'F'
+        failed.save()
+
+        index = SuccessRateIndex.load()
+        score = index.score('龙回头', self.features)
+        self.assertEqual(score['samples'], 2)
+        self.assertEqual(score['success_rate'], Decimal('50.00'))
+
+        SuccessRateService().rebuild()
+        self.assertEqual(SuccessRateIndex.load().buckets, index.buckets)
+
+        # 不同形态的桶没有样本时回退到策略整体成功率
+        other = dict(self.features, limit_up_streak=0)
+        self.assertEqual(index.score('龙回头', other)['success_rate'], Decimal('50.00'))
+        self.assertIsNone(index.score('其他策略', other))
+
+    def test_compute_features(self):
+        """测试形态特征计算"""
+        bars = pd.DataFrame({
+            'open': [10.0, 11.0, 12.1, 13.5],
+            'close': [10.0, 11.0, 12.1, 13.0],
+            'up_limit': [10.0, 11.0, 12.1, 13.31],
+        })
+        features = compute_features(bars, 12.0)
+        self.assertEqual(features['limit_up_streak'], 3)
+        self.assertEqual(features['gap_pct'], Decimal('11.57'))
+        self.assertEqual(features['buy_distance_pct'], Decimal('8.33'))
+
+
+class ContinuousLimitStrategyTest(TestCase):
+    """连续涨停策略向量化分析测试"""
+
+    def setUp(self):
+        """构造两只股票的日线：一只符合形态，一只前10天内有涨停"""
+        self.strategy = ContinuousLimitStrategy()
+        self.start = date(2024, 1, 1)
+        patterns = {
+            # 第14、15天连续涨停，第16、17天收阴
+            '600000.SH': [10.0] * 13 + [11.0, 12.1, 11.8, 11.5, 11.6],
+            # 第6天涨停（在前10天内），随后同样的形态
+            '000001.SZ': [10.0] * 5 + [11.0] + [11.0] * 7 + [12.1, 13.31, 13.0, 12.8, 12.9],
+        }
+        for ts_code, closes in patterns.items():
+            stock = Code.objects.create(
+                ts_code=ts_code,
+                symbol=ts_code[:6],
+                name=ts_code,
+                list_status='L',
+                list_date='2000-01-01'
+            )
+            for i, close in enumerate(closes):
+                is_negative = i > 0 and close < closes[i - 1]
+                open_price = close + 0.1 if is_negative else close - 0.05
+                StockDailyData.objects.create(
+                    stock=stock,
+                    trade_date=self.start + timedelta(days=i),
+                    open=Decimal(str(round(open_price, 2))),
+                    high=Decimal(str(round(close + 0.2 + i * 0.01, 2))),
+                    low=Decimal(str(round(close - 0.2, 2))),
+                    close=Decimal(str(close)),
+                    volume=1000,
+                    amount=Decimal('10000')
+                )
+
+    def test_analyze_market(self):
+        """测试全市场分析结果与信号日、买点一致"""
+        signals = self.strategy.analyze_market(self.start, self.start + timedelta(days=30))
+
+        self.assertEqual(len(signals), 1)
+        signal = signals[0]
+        self.assertEqual(signal['stock'], '600000.SH')
+        self.assertEqual(signal['date'], self.start + timedelta(days=14))
+        # 买点取信号日前第2~4个交易日（第10~12天）
+        self.assertAlmostEqual(signal['first_buy_point'], 10.0 + 0.2 + 0.12)
+        self.assertAlmostEqual(signal['stop_loss_point'], 9.8)
+        self.assertEqual(signal['take_profit_point'], signal['first_buy_point'] * 1.75)
+
+        self.assertEqual(
+            self.strategy.analyze_stock('600000.SH', self.start, self.start + timedelta(days=30)),
+            signals
+        )
+
+    def test_save_signals_skips_existing(self):
+        """测试批量保存跳过已存在的信号"""
+        signals = self.strategy.analyze_market(self.start, self.start + timedelta(days=30))
+        self.assertEqual(self.strategy.save_signals(signals), 1)
+        self.assertEqual(self.strategy.save_signals(signals), 0)
+        self.assertEqual(PolicyDetails.objects.filter(strategy_type='CONTINUOUS_LIMIT_UP').count(), 1)
+
+
+class TechnicalAnalysisTest(TestCase):
+    """均线金叉向量化扫描测试"""
+
+    def setUp(self):
+        """构造两只股票：一只先跌后涨产生金叉，一只单边下跌"""
+        self.start = date(2024, 1, 1)
+        series = {
+            '600000.SH': [20 - i * 0.5 for i in range(12)] + [15 + i * 1.5 for i in range(8)],
+            '000001.SZ': [20 - i * 0.3 for i in range(20)],
+        }
+        for ts_code, closes in series.items():
+            stock = Code.objects.create(
+                ts_code=ts_code,
+                symbol=ts_code[:6],
+                name=ts_code,
+                list_status='L',
+                list_date='2000-01-01'
+            )
+            for i, close in enumerate(closes):
+                StockDailyData.objects.create(
+                    stock=stock,
+                    trade_date=self.start + timedelta(days=i),
+                    open=Decimal(str(round(close, 2))),
+                    high=Decimal(str(round(close + 0.1, 2))),
+                    low=Decimal(str(round(close - 0.1, 2))),
+                    close=Decimal(str(round(close, 2))),
+                    volume=1000,
+                    amount=Decimal('10000')
+                )
+
+    def _expected_crosses(self, ts_code):
+        closes = pd.Series([
+            float(c) for c in StockDailyData.objects.filter(stock_id=ts_code)
+            .order_by('trade_date').values_list('close', flat=True)
+        ])
+        ma5, ma10 = closes.rolling(5).mean(), closes.rolling(10).mean()
+        return [
+            self.start + timedelta(days=i) for i in range(1, len(closes))
+            if ma5[i - 1] <= ma10[i - 1] and ma5[i] > ma10[i]
+        ]
+
+    def test_market_signals_match_single_stock_loop(self):
+        """测试全市场结果与逐行判断一致，并批量写入 MA_CROSS 信号"""
+        end = self.start + timedelta(days=30)
+        signals = TechnicalAnalysis.generate_market_signals(self.start, end)
+
+        self.assertTrue(self._expected_crosses('600000.SH'))
+        self.assertEqual([s['date'] for s in signals if s['stock'] == '600000.SH'],
+                         self._expected_crosses('600000.SH'))
+        self.assertFalse([s for s in signals if s['stock'] == '000001.SZ'])
+
+        result = TechnicalAnalysis.scan_market(self.start, end)
+        self.assertEqual(result['created'], len(signals))
+        self.assertEqual(PolicyDetails.objects.filter(strategy_type='MA_CROSS').count(), len(signals))
+
+
+class IndicatorServiceTest(TestCase):
+    """技术指标增量维护测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        self.stock = Code.objects.create(
+            ts_code='600000.SH',
+            symbol='600000',
+            name='浦发银行',
+            list_status='L',
+            list_date='1999-11-10'
+        )
+        self.start = date(2024, 1, 1)
+        self.closes = [10 + ((i * 7) % 11) * 0.3 for i in range(60)]
+        for i, close in enumerate(self.closes):
+            StockDailyData.objects.create(
+                stock=self.stock,
+                trade_date=self.start + timedelta(days=i),
+                open=Decimal(str(round(close, 2))),
+                high=Decimal(str(round(close + 0.5, 2))),
+                low=Decimal(str(round(close - 0.5, 2))),
+                close=Decimal(str(round(close, 2))),
+                volume=1000,
+                amount=Decimal('10000')
+            )
+
+    def test_daily_updates_match_backfill(self):
+        """测试逐日增量更新与一次性回放结果一致"""
+        service = IndicatorService()
+        service.advance(['600000.SH'], self.start)
+        for i in range(1, len(self.closes)):
+            service.update_for_date(self.start + timedelta(days=i))
+        incremental = service.read(stock_code='600000.SH')
+
+        service.backfill(reset=True)
+        self.assertEqual(service.read(stock_code='600000.SH'), incremental)
+
+        # 简单移动平均与 pandas 滚动均值一致
+        expected = pd.Series([round(c, 2) for c in self.closes]).rolling(5).mean()
+        sma = {row['trade_date']: row['SMA5'] for row in incremental if 'SMA5' in row}
+        self.assertEqual(len(sma), len(self.closes) - 4)
+        last_date = (self.start + timedelta(days=59)).strftime('%Y-%m-%d')
+        self.assertAlmostEqual(sma[last_date], expected.iloc[-1], places=4)
+        self.assertIn('MACD_HIST', incremental[-1])
+        self.assertIn('RSI14', incremental[-1])
+
+    def test_daily_update_skips_cold_stocks(self):
+        """测试每日更新跳过没有状态的股票，不在日更中回放历史"""
+        service = IndicatorService()
+        result = service.update_for_date(self.start + timedelta(days=59))
+        self.assertEqual(result, {'stocks': 0, 'values': 0, 'skipped': 1})
+        self.assertEqual(service.read(stock_code='600000.SH'), [])
+
+        self.assertEqual(service.backfill()['stocks'], 1)
+        self.assertEqual(service.update_for_date(self.start + timedelta(days=59))['skipped'], 0)
+
+
+class AuthenticatedApiTestCase(TestCase):
+    """接口测试基类：已登录的 API 客户端，以及股票和日线数据的构造方法"""
+
+    BAR_DEFAULTS = {
+        'open': Decimal('10.00'),
+        'high': Decimal('10.50'),
+        'low': Decimal('9.50'),
+        'close': Decimal('10.00'),
+        'volume': 1000,
+        'amount': Decimal('10000'),
+    }
+
+    def setUp(self):
+        """已登录的 API 客户端"""
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('tester', password='pass'))
+
+    @staticmethod
+    def create_stock(ts_code, name=None, list_date='2000-01-01'):
+        """创建上市状态的股票，名称默认与代码相同"""
+        return Code.objects.create(
+            ts_code=ts_code, symbol=ts_code[:6], name=name or ts_code, list_status='L', list_date=list_date
+        )
+
+    @classmethod
+    def create_bars(cls, stock, days, **fields):
+        """按交易日批量创建日线，字段值为常量或按交易日序号 i 计算的函数，未指定的字段取 BAR_DEFAULTS"""
+        values = dict(cls.BAR_DEFAULTS, **fields)
+        StockDailyData.objects.bulk_create([
+            StockDailyData(stock=stock, trade_date=day, **{
+                field: value(i) if callable(value) else value for field, value in values.items()
+            })
+            for i, day in enumerate(days)
+        ])
+
+
+class StockDailyDataExportTest(AuthenticatedApiTestCase):
+    """日线数据键集分页与流式导出测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        super().setUp()
+        days = [date(2024, 1, 2) + timedelta(days=i) for i in range(3)]
+        for ts_code in ('600000.SH', '000001.SZ', '000002.SZ'):
+            self.create_bars(
+                self.create_stock(ts_code), days,
+                close=Decimal('10.20'), up_limit=Decimal('11.00'), down_limit=Decimal('9.00')
+            )
+
+    def test_keyset_pages_cover_all_rows(self):
+        """测试逐页读取覆盖全部数据且顺序与流式导出一致"""
+        params = {'start_date': '2024-01-01', 'end_date': '2024-01-31', 'limit': 4}
+        rows, cursor = [], None
+        while True:
+            response = self.client.get(reverse('update-daily-data'), dict(params, **({'cursor': cursor} if cursor else {})))
+            self.assertEqual(response.status_code, 200)
+            rows.extend(response.data['data'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                break
+
+        keys = [(row['trade_date'], row['stock_code']) for row in rows]
+        self.assertEqual(len(keys), 9)
+        self.assertTrue(all(row['stock_name'] == row['stock_code'] for row in rows))
+        self.assertEqual(keys, sorted(keys, key=lambda k: (-int(k[0].replace('-', '')), k[1])))
+
+        response = self.client.get(reverse('update-daily-data'), dict(params, stream='true'))
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed['data'], rows)
+
+    def test_columnar_format(self):
+        """测试列式返回与逐行返回内容一致"""
+        params = {'trade_date': '2024-01-03'}
+        rows = self.client.get(reverse('update-daily-data'), params).data['data']
+        columns = self.client.get(reverse('update-daily-data'), dict(params, format='columnar')).data['data']
+
+        self.assertEqual(columns['stock_code'], [row['stock_code'] for row in rows])
+        self.assertEqual(columns['close'], [row['close'] for row in rows])
+        self.assertEqual(columns['stock_names'], {row['stock_code']: row['stock_name'] for row in rows})
+
+
+class VersionedResponseCacheTest(AuthenticatedApiTestCase):
+    """策略信号查询接口的版本化缓存与 ETag 测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        super().setUp()
+        self.stock = self.create_stock('000001.SZ', '平安银行', list_date='1991-04-03')
+
+    def _create_signal(self, signal_date):
+        with self.captureOnCommitCallbacks(execute=True):
+            return PolicyDetails.objects.create(
+                stock=self.stock,
+                date=signal_date,
+                first_buy_point=Decimal('10.00'),
+                second_buy_point=Decimal('9.50'),
+                stop_loss_point=Decimal('9.00'),
+                take_profit_point=Decimal('10.80'),
+                strategy_type='龙回头',
+                current_status='L'
+            )
+
+    def test_etag_revalidation_and_invalidation(self):
+        """测试版本未变时返回 304，写入新信号后缓存失效"""
+        self._create_signal(date(2024, 1, 10))
+        params = {'start_date': '2024-01-01', 'end_date': '2024-01-31'}
+
+        first = self.client.get(reverse('stock-pattern'), params)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.data['data']), 1)
+        etag = first['ETag']
+
+        cached = self.client.get(reverse('stock-pattern'), params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+
+        # 参数不同的请求使用不同的 ETag
+        other = self.client.get(reverse('stock-pattern'), {'trade_date': '2024-01-10'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other.status_code, 200)
+
+        self._create_signal(date(2024, 1, 11))
+        refreshed = self.client.get(reverse('stock-pattern'), params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertNotEqual(refreshed['ETag'], etag)
+        self.assertEqual(len(refreshed.data['data']), 2)
+
+        listed = self.client.get(reverse('policy-details-list-create'))
+        self.assertEqual(listed.status_code, 200)
+        self.assertEqual(
+            self.client.get(reverse('policy-details-list-create'), HTTP_IF_NONE_MATCH=listed['ETag']).status_code,
+            304
+        )
+
+    def test_cache_keeps_absolute_links_per_host(self):
+        """测试不同协议、主机的请求不共用缓存，分页链接指向请求自身的地址"""
+        self._create_signal(date(2024, 1, 10))
+        self._create_signal(date(2024, 1, 11))
+        url = reverse('policy-details-list-create')
+
+        first = self.client.get(url, {'page_size': 1}, HTTP_HOST='a.example.com')
+        self.assertTrue(first.data['next'].startswith('http://a.example.com/'))
+        other = self.client.get(url, {'page_size': 1}, HTTP_HOST='b.example.com', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(other.status_code, 200)
+        self.assertTrue(other.data['next'].startswith('http://b.example.com/'))
+        secure = self.client.get(url, {'page_size': 1}, HTTP_HOST='a.example.com', secure=True)
+        self.assertTrue(secure.data['next'].startswith('https://a.example.com/'))
+
+
+class DistributedLockTest(TestCase):
+    """Redis 分布式锁测试（需要可连接的 Redis）"""
+
+    def setUp(self):
+        import redis
+        from .locks import get_redis_client
+
+        try:
+            get_redis_client().ping()
+        except redis.RedisError:
+            self.skipTest('Redis 不可用')
+
+    def test_lock_is_exclusive_and_owner_checked(self):
+        """测试锁互斥、续期，以及只能释放自己持有的锁"""
+        from .locks import DistributedLock
+
+        first = DistributedLock('test_lock', ttl=1)
+        second = DistributedLock('test_lock', ttl=1)
+        try:
+            self.assertTrue(first.acquire())
+            self.assertFalse(second.acquire())
+            # 心跳续期后超过 ttl 仍然持有锁
+            time.sleep(1.5)
+            self.assertFalse(first.lost)
+            self.assertFalse(second.acquire())
+            self.assertFalse(second.release())
+        finally:
+            self.assertTrue(first.release())
+        self.assertTrue(second.acquire())
+        second.release()
+
+
+class AuditBufferTest(TestCase):
+    """浏览记录缓冲区批量写入测试"""
+
+    def test_ring_buffer_drops_oldest_and_flushes_in_batches(self):
+        """测试缓冲区满时丢弃最旧事件，flush 分批写入并保留事件时间"""
+        from django.utils import timezone
+        from .audit import AuditBuffer
+        from .models import BrowseRecord
+
+        user = User.objects.create_user('tester', password='pass')
+        created_at = timezone.now() - timedelta(minutes=5)
+        buffer = AuditBuffer(capacity=3, batch_size=2, autostart=False)
+        for i in range(5):
+            buffer.push({
+                'user_id': user.pk, 'path': f'/api/test/{i}/', 'method': 'GET',
+                'ip': '127.0.0.1', 'user_agent': '', 'created_at': created_at,
+            })
+
+        metrics = buffer.metrics()
+        self.assertEqual((metrics['depth'], metrics['dropped'], metrics['received']), (3, 2, 5))
+
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(
+            sorted(BrowseRecord.objects.filter(path__startswith='/api/test/').values_list('path', flat=True)),
+            ['/api/test/2/', '/api/test/3/', '/api/test/4/']
+        )
+        self.assertTrue(all(r.created_at == created_at for r in BrowseRecord.objects.filter(path__startswith='/api/test/')))
+        self.assertEqual(buffer.metrics()['depth'], 0)
+        self.assertEqual(buffer.metrics()['written'], 3)
+
+
+class BrowseAnalyticsServiceTest(TestCase):
+    """浏览记录聚合统计与过期清理测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        from django.utils import timezone
+        from .models import BrowseRecord
+
+        self.now = timezone.now()
+        user = User.objects.create_user('tester', password='pass')
+        paths = ['/api/a/'] * 3 + ['/api/b/'] * 2 + ['/api/c/', '/api/d/']
+        BrowseRecord.objects.bulk_create([
+            BrowseRecord(user=user if i % 2 else None, path=path, method='GET',
+                         ip='10.0.0.1', created_at=self.now - timedelta(hours=i))
+            for i, path in enumerate(paths)
+        ] + [
+            BrowseRecord(path='/api/old/', method='GET', created_at=self.now - timedelta(days=400))
+        ])
+
+    def test_aggregate_pages_by_count(self):
+        """测试按请求数降序的游标分页覆盖全部分组"""
+        from .services.browse_analytics import BrowseAnalyticsService
+
+        service = BrowseAnalyticsService()
+        start, end = self.now - timedelta(days=1), self.now + timedelta(minutes=1)
+        results, cursor = [], None
+        while True:
+            page, cursor = service.aggregate('path', start, end, limit=2, cursor=cursor)
+            results.extend(page)
+            if not cursor:
+                break
+        self.assertEqual(
+            [(row['key'], row['count']) for row in results],
+            [('/api/a/', 3), ('/api/b/', 2), ('/api/c/', 1), ('/api/d/', 1)]
+        )
+
+        users, _ = service.aggregate('user', start, end)
+        self.assertEqual({row['label']: row['count'] for row in users}, {'tester': 3, 'Anonymous': 4})
+        hours, _ = service.aggregate('hour', start, end)
+        self.assertEqual(sum(row['count'] for row in hours), 7)
+
+    def test_purge_keeps_recent_records(self):
+        """测试只删除保留期之前的记录"""
+        from .models import BrowseRecord
+        from .services.browse_analytics import BrowseAnalyticsService
+
+        self.assertEqual(BrowseAnalyticsService().purge(180), 1)
+        self.assertFalse(BrowseRecord.objects.filter(path='/api/old/').exists())
+        self.assertEqual(BrowseRecord.objects.count(), 7)
+
+
+class PolicyDetailsPaginationTest(AuthenticatedApiTestCase):
+    """策略详情列表键集分页与字段筛选测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        super().setUp()
+        for i in range(7):
+            stock = self.create_stock(f'00000{i}.SZ', f'股票{i}')
+            # 同一日期多条记录，验证日期内按 id 定位
+            for day in (10, 11):
+                PolicyDetails.objects.create(
+                    stock=stock,
+                    date=date(2024, 1, day),
+                    first_buy_point=Decimal('10.00'),
+                    second_buy_point=Decimal('9.50'),
+                    stop_loss_point=Decimal('9.00'),
+                    take_profit_point=Decimal('10.80'),
+                    current_status='L'
+                )
+
+    def test_pages_follow_date_id_order(self):
+        """测试逐页读取按 (date, id) 降序覆盖全部记录，上一页可回退"""
+        url = reverse('policy-details-list-create')
+        pages, next_url = [], f'{url}?page_size=4'
+        while next_url:
+            response = self.client.get(next_url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            next_url = response.data['next']
+
+        ids = [row['id'] for page in pages for row in page['results']]
+        expected = list(PolicyDetails.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertIsNone(pages[0]['previous'])
+
+        previous = self.client.get(pages[2]['previous']).data
+        self.assertEqual(previous['results'], pages[1]['results'])
+
+    def test_sparse_fields(self):
+        """测试 fields 参数只返回指定字段，未知字段返回 400"""
+        url = reverse('policy-details-list-create')
+        response = self.client.get(url, {'fields': 'date,stock'})
+        self.assertEqual(set(response.data['results'][0]), {'date', 'stock'})
+        self.assertEqual(self.client.get(url, {'fields': 'date,bogus'}).status_code, 400)
+
+
+class BarResampleTest(AuthenticatedApiTestCase):
+    """周期K线重采样测试"""
+
+    def setUp(self):
+        """设置测试数据：两只股票约两个月的工作日日线"""
+        super().setUp()
+        days = [d.date() for d in pd.bdate_range('2024-01-03', '2024-02-29')]
+        for n, ts_code in enumerate(('000001.SZ', '600000.SH')):
+            close = lambda i, n=n: Decimal(str(10 + n + (i % 7) * 0.1))
+            self.create_bars(
+                self.create_stock(ts_code), days,
+                open=lambda i: close(i) - Decimal('0.05'), high=lambda i: close(i) + Decimal('0.20'),
+                low=lambda i: close(i) - Decimal('0.30'), close=close, volume=lambda i: 1000 + i
+            )
+
+    def _reference(self, ts_code, rule):
+        """pandas 按自然周期分组的参考结果"""
+        rows = StockDailyData.objects.filter(stock_id=ts_code).order_by('trade_date').values(
+            'trade_date', 'open', 'high', 'low', 'close', 'volume'
+        )
+        frame = pd.DataFrame.from_records(rows)
+        frame['trade_date'] = pd.to_datetime(frame['trade_date'])
+        frame = frame.set_index('trade_date').astype(float)
+        return frame.groupby(frame.index.to_period(rule)).agg({
+            'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
+        })
+
+    def test_weekly_and_monthly_match_pandas(self):
+        """测试周线、月线与 pandas 分组聚合结果一致"""
+        from .services.bar_resample import BarResampleService
+
+        service = BarResampleService()
+        for period, rule in (('W', 'W-SUN'), ('M', 'M')):
+            bars = service.get_bars(['000001.SZ', '600000.SH'], period, date(2024, 1, 1), date(2024, 2, 29))
+            self.assertEqual(set(bars), {'000001.SZ', '600000.SH'})
+            for ts_code, columns in bars.items():
+                expected = self._reference(ts_code, rule)
+                self.assertEqual(len(columns['close']), len(expected))
+                for field in ('open', 'high', 'low', 'close', 'volume'):
+                    self.assertEqual(
+                        [round(v, 2) for v in columns[field]],
+                        [round(v, 2) for v in expected[field].tolist()]
+                    )
+
+    def test_n_day_endpoint(self):
+        """测试 N 日线接口按交易日数分组"""
+        response = self.client.get(reverse('bars'), {
+            'ts_code': '000001.SZ', 'period': '5', 'start_date': '2024-01-01', 'end_date': '2024-02-29'
+        })
+        self.assertEqual(response.status_code, 200)
+        columns = response.data['data']['bars']['000001.SZ']
+        total_days = StockDailyData.objects.filter(stock_id='000001.SZ').count()
+        self.assertEqual(sum(columns['days']), total_days)
+        self.assertTrue(all(days == 5 for days in columns['days'][:-1]))
+
+        response = self.client.get(reverse('bars'), {'ts_code': '000001.SZ', 'period': 'X', 'start_date': '2024-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CodeSearchTest(AuthenticatedApiTestCase):
+    """股票搜索索引测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        super().setUp()
+        for ts_code, name in (('000001.SZ', '平安银行'), ('601318.SH', '中国平安'),
+                              ('600000.SH', '浦发银行'), ('600036.SH', '招商银行')):
+            self.create_stock(ts_code, name)
+
+    def test_search_ranks_code_initials_and_name(self):
+        """测试代码、拼音首字母、名称的匹配及排序"""
+        from .services.code_search import invalidate_index
+
+        invalidate_index()
+        codes = lambda q: [row['ts_code'] for row in self.client.get(reverse('code-search'), {'q': q}).data['data']]
+        self.assertEqual(codes('600000'), ['600000.SH'])
+        self.assertEqual(codes('600'), ['600000.SH', '600036.SH'])
+        self.assertEqual(codes('payh'), ['000001.SZ'])
+        self.assertEqual(codes('平安'), ['000001.SZ', '601318.SH'])
+        self.assertEqual(set(codes('银行')), {'000001.SZ', '600000.SH', '600036.SH'})
+        self.assertEqual(codes('PFH'), ['600000.SH'])
+
+        # 新增股票后索引重建
+        self.create_stock('600519.SH', '贵州茅台', list_date='2001-08-27')
+        self.assertEqual(codes('gzmt'), ['600519.SH'])
+
+    def test_limit_is_clamped(self):
+        """测试 limit 限制在 1 到 MAX_LIMIT 之间，无法解析时取默认值"""
+        search = lambda limit: self.client.get(reverse('code-search'), {'q': '银行', 'limit': limit})
+        self.assertEqual(len(search(-5).data['data']), 1)
+        self.assertEqual(len(search(0).data['data']), 1)
+        self.assertEqual(len(search(2).data['data']), 2)
+        self.assertEqual(len(search('abc').data['data']), 3)
+
+    def test_initials_cover_all_hanzi(self):
+        """测试 GB2312 二级汉字的拼音首字母"""
+        from .services.code_search import invalidate_index, pinyin_initials
+
+        for ts_code, name in (('000568.SZ', '泸州老窖'), ('002506.SZ', '协鑫集成'), ('603659.SH', '璞泰来')):
+            self.create_stock(ts_code, name)
+        invalidate_index()
+        codes = lambda q: [row['ts_code'] for row in self.client.get(reverse('code-search'), {'q': q}).data['data']]
+        self.assertEqual(codes('LZLJ'), ['000568.SZ'])
+        self.assertEqual(codes('XXJC'), ['002506.SZ'])
+        self.assertEqual(codes('PTL'), ['603659.SH'])
+        self.assertIn('STKJ', pinyin_initials('晟通科技'))
+        self.assertEqual(pinyin_initials('*ST长康'), ['STZK', 'STCK'])
+
+
+class BatchBarsTest(AuthenticatedApiTestCase):
+    """多只股票日线批量查询测试"""
+
+    def setUp(self):
+        """设置测试数据"""
+        super().setUp()
+        days = [date(2024, 1, 2) + timedelta(days=i) for i in range(3)]
+        for n, ts_code in enumerate(('000001.SZ', '600000.SH')):
+            self.create_bars(self.create_stock(ts_code, f'股票{n}'), days, close=lambda i, n=n: Decimal(str(10 + n + i)))
+
+    def test_grouped_columns(self):
+        """测试一次请求返回按股票分组的列式数据"""
+        response = self.client.post(reverse('bars-batch'), {
+            'ts_codes': ['600000.SH', '000001.SZ', '999999.SH'], 'start_date': '2024-01-01', 'end_date': '2024-01-31'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = response.data['data']
+        self.assertEqual(set(data['bars']), {'000001.SZ', '600000.SH'})
+        self.assertEqual(data['missing'], ['999999.SH'])
+        self.assertEqual(data['bars']['600000.SH']['close'], [11.0, 12.0, 13.0])
+        self.assertEqual(data['bars']['000001.SZ']['trade_date'], ['2024-01-02', '2024-01-03', '2024-01-04'])
+        self.assertEqual(data['stock_names']['000001.SZ'], '股票0')
+
+        response = self.client.get(reverse('bars-batch'), {'ts_code': '000001.SZ', 'start_date': '2024-01-01'})
+        self.assertEqual(list(response.data['data']['bars']), ['000001.SZ'])
+
+
+class PricePanelTest(TestCase):
+    """行情面板测试"""
+
+    def setUp(self):
+        """设置测试数据：第二只股票缺少第二个交易日"""
+        for n, ts_code in enumerate(('000001.SZ', '600000.SH')):
+            stock = Code.objects.create(
+                ts_code=ts_code, symbol=ts_code[:6], name=ts_code, list_status='L', list_date='2000-01-01'
+            )
+            for i in range(3):
+                if n == 1 and i == 1:
+                    continue
+                StockDailyData.objects.create(
+                    stock=stock, trade_date=date(2024, 1, 2) + timedelta(days=i),
+                    open=Decimal('10.00'), high=Decimal(str(11 + n + i)), low=Decimal('9.50'),
+                    close=Decimal(str(10 + n + i)), volume=1000 * (i + 1), amount=Decimal('10000')
+                )
+
+    def test_dense_arrays(self):
+        """测试数组布局、下标映射与缺失值"""
+        panel = PricePanel.load(['600000.SH', '000001.SZ'], date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(panel.codes, ['000001.SZ', '600000.SH'])
+        self.assertEqual(panel.dates, [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)])
+        self.assertEqual(panel.close.shape, (3, 2))
+        self.assertEqual(panel.close[:, panel.code_index['600000.SH']][[0, 2]].tolist(), [11.0, 13.0])
+        self.assertTrue(np.isnan(panel.close[panel.date_index[date(2024, 1, 3)], 1]))
+        self.assertEqual(panel.volume[:, 0].tolist(), [1000.0, 2000.0, 3000.0])
+        self.assertEqual(panel.stock_rows('600000.SH').tolist(), [0, 2])
+        self.assertEqual(panel.day_index([date(2024, 1, 4), date(2024, 1, 6)]).tolist(), [2, -1])
+
+        day = panel.day_prices(1)
+        self.assertIn('000001.SZ', day)
+        self.assertEqual(day.get('600000.SH', {}), {})
+        self.assertEqual(day['000001.SZ'], {'close': 11.0, 'high': 12.0, 'low': 9.5})
+
+    def test_legacy_price_data(self):
+        """测试旧接口 get_price_data 的嵌套字典由面板生成且结构不变"""
+        price_data = StrategyService().get_price_data(['000001.SZ', '600000.SH'], date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(len(price_data), 3)
+        self.assertEqual(set(price_data[date(2024, 1, 3)]), {'000001.SZ'})
+        self.assertEqual(price_data[date(2024, 1, 4)]['600000.SH'], {'close': 13.0, 'high': 14.0, 'low': 9.5})
@@ -13,6 +13,8 @@ urlpatterns = [
     path('policy-details/', PolicyDetailsListCreateView.as_view(), name='policy-details-list-create'),
     # 获取所有Code并创建新记录
     path('code/', CodeListCreateView.as_view(), name='code-list-create'),  
+    # 股票搜索（输入联想），需放在 code/<str:ts_code>/ 之前
+    path('code/search/', views.CodeSearchView.as_view(), name='code-search'),
     # 股票代码详情、更新和删除
     path('code/<str:ts_code>/', CodeRetrieveUpdateDeleteView.as_view(), name='code-detail'), 
     # 手动策略分析
@@ -29,7 +31,18 @@ urlpatterns = [
     path('stock-pattern/', StockPatternView.as_view(), name='stock-pattern'),
     # 策略统计
     path('strategy-stats/', StrategyStatsView.as_view(), name='strategy-stats'),
+    # 策略统计汇总（预聚合）
+    path('strategy-stats/rollup/', views.StrategyStatsRollupView.as_view(), name='strategy-stats-rollup'),
     # 交易信号分析路由
     path('trading/signals/analyze/', views.TradingSignalsAnalysisView.as_view(), name='analyze-trading-signals'),
+    # 信号交易统计（MFE/MAE）
+    path('trading/stats/', views.TradingStatsView.as_view(), name='trading-stats'),
+    # 技术指标读取和注册表
+    path('indicators/', views.IndicatorListView.as_view(), name='indicators'),
+    path('indicators/registry/', views.IndicatorRegistryView.as_view(), name='indicator-registry'),
+    # 周期K线（周线 / 月线 / N 日线）
+    path('bars/', views.ResampledBarsView.as_view(), name='bars'),
+    # 多只股票日线批量查询
+    path('bars/batch/', views.BatchBarsView.as_view(), name='bars-batch'),
 ]
 
@@ -11,6 +11,8 @@ from django.core.cache import cache
 import logging
 from decimal import Decimal
 from django.db.utils import IntegrityError
+from .services.success_rate_service import SuccessRateIndex, compute_features, load_feature_bars
+from .services.data_version import BARS, bump_version_on_commit
 
 # 配置logger
 logger = logging.getLogger(__name__)
@@ -311,6 +313,8 @@ class StockDataFetcher:
                     deleted_count = StockDailyData.objects.filter(
                         trade_date__lt=cutoff_date
                     ).delete()[0]
+                    if deleted_count:
+                        bump_version_on_commit(BARS)
                     
                     return {
                         'status': 'success',
@@ -451,6 +455,7 @@ class StockDataFetcher:
                                     ]
                                     
                                     StockDailyData.objects.bulk_create(bulk_data)
+                                    bump_version_on_commit(BARS)
                                     total_saved += len(bulk_data)
                                     
                                 except Exception as batch_error:
@@ -552,6 +557,7 @@ class StockDataFetcher:
                                             
                                             try:
                                                 StockDailyData.objects.bulk_create(bulk_data)
+                                                bump_version_on_commit(BARS)
                                                 daily_saved += len(bulk_data)
                                                 total_saved += len(bulk_data)
                                             except OSError as ose:
@@ -651,13 +657,23 @@ class StockDataFetcher:
                     cursor.execute(sql)
                     down_stocks = [row[0] for row in cursor.fetchall()]
                     
+                    # 一次查询加载全部候选股票的特征日线，并载入历史成功率查找表
+                    current_date = datetime.strptime(trade_date, '%Y-%m-%d').date()
+                    feature_bars = load_feature_bars(down_stocks, current_date) if down_stocks else {}
+                    success_index = SuccessRateIndex.load()
+                    
                     result_stocks = []
                     for stock_id in down_stocks:
                         try:
                             history_data = self.get_stock_history(stock_id, analysis_dates[3], num_days=15)
                             if history_data:
                                 price_points = self.calculate_price_points(history_data)
-                                self.save_strategy_details(stock_id, trade_date, price_points)
+                                features = compute_features(feature_bars.get(stock_id), price_points['max_high'])
+                                self.save_strategy_details(
+                                    stock_id, trade_date, price_points,
+                                    features=features,
+                                    score=success_index.score('龙回头', features)
+                                )
                                 result_stocks.append({
                                     'stock': stock_id,
                                     'pattern': '龙回头',
@@ -825,8 +841,16 @@ class StockDataFetcher:
             logger.error(f"计算价格点位时出错: {str(e)}")
             raise
 
-    def save_strategy_details(self, stock_id, trade_date, price_points):
-        """保存策略详情"""
+    def save_strategy_details(self, stock_id, trade_date, price_points, features=None, score=None):
+        """保存策略详情
+        
+        Args:
+            stock_id (str): 股票代码
+            trade_date (str): 信号日期，格式为 'YYYY-MM-DD'
+            price_points (dict): calculate_price_points 计算的价格点位
+            features (dict, optional): 形态特征（连续涨停、跳空幅度、距买点距离）
+            score (dict, optional): SuccessRateIndex.score 查表得到的历史成功率和信号强度
+        """
         try:
             with transaction.atomic():
                 stock = Code.objects.get(ts_code=stock_id)
@@ -848,8 +872,10 @@ class StockDataFetcher:
                         stop_loss_point=price_points['min_low'],
                         take_profit_point=price_points['take_profit'],
                         strategy_type='龙回头',
-                        signal_strength=Decimal('0.85'),
-                        current_status='L'
+                        signal_strength=score['signal_strength'] if score else Decimal('0.85'),
+                        success_rate=score['success_rate'] if score else Decimal('0.00'),
+                        current_status='L',
+                        **(features or {})
                     )
                     logger.info(f"已为股票 {stock_id} 创建策略详情")
                 else:
@@ -1007,64 +1033,13 @@ class StockDataFetcher:
         Returns:
             dict: 统计指标
         """
+        from .services.trade_stats_service import TradeStatsService, empty_stats
+
         try:
-            stats = {
-                'holding_days': 0,
-                'max_profit': 0,
-                'max_drawdown': 0,
-                'final_profit': 0
-            }
-            
-            if not signal.first_buy_time:
-                return stats
-                
-            # 获取持仓期间的数据
-            daily_data = StockDailyData.objects.filter(
-                stock=signal.stock,
-                trade_date__gte=signal.first_buy_time
-            ).order_by('trade_date')
-            
-            if not daily_data.exists():
-                return stats
-                
-            # 计算持仓天数
-            if signal.current_status in ['S', 'F']:
-                end_date = signal.take_profit_time or signal.stop_loss_time
-                stats['holding_days'] = (end_date - signal.first_buy_time).days
-            else:
-                stats['holding_days'] = (daily_data.last().trade_date - signal.first_buy_time).days
-                
-            # 计算最大收益和最大回撤
-            max_price = float(signal.holding_price)
-            min_price = float(signal.holding_price)
-            
-            for data in daily_data:
-                current_price = float(data.high)
-                if current_price > max_price:
-                    max_price = current_price
-                if float(data.low) < min_price:
-                    min_price = float(data.low)
-                    
-            stats['max_profit'] = round((max_price - float(signal.holding_price)) / float(signal.holding_price) * 100, 2)
-            stats['max_drawdown'] = round((float(signal.holding_price) - min_price) / float(signal.holding_price) * 100, 2)
-            
-            # 计算最终收益
-            if signal.current_status == 'S':
-                stats['final_profit'] = round((float(signal.take_profit_point) - float(signal.holding_price)) / 
-                                            float(signal.holding_price) * 100, 2)
-            elif signal.current_status == 'F':
-                stats['final_profit'] = round((float(signal.stop_loss_point) - float(signal.holding_price)) / 
-                                            float(signal.holding_price) * 100, 2)
-            else:
-                last_price = float(daily_data.last().close)
-                stats['final_profit'] = round((last_price - float(signal.holding_price)) / 
-                                            float(signal.holding_price) * 100, 2)
-                                            
-            return stats
-            
+            return TradeStatsService().calculate_one(signal)
         except Exception as e:
             logger.error(f"计算交易统计指标出错: {str(e)}")
-            return stats
+            return empty_stats()
 
     def test_date_functions(self):
         """测试日期相关函数
@@ -2,25 +2,74 @@ from rest_framework import generics
 from .models import PolicyDetails, Code, TradingCalendar, StockDailyData, StrategyStats
 from .serializers import PolicyDetailsSerializer, CodeSerializer, TradingCalendarSerializer, StockPatternAnalysisSerializer, StockPatternResultSerializer, StrategyStatsSerializer
 from django.shortcuts import render
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
 from .analysis import ContinuousLimitStrategy
-from datetime import datetime
+from datetime import datetime, timedelta
 from .utils import StockDataFetcher
+from .services.trade_stats_service import TradeStatsService, empty_stats
+from .services.strategy_rollup_service import StrategyRollupService
+from .services.indicator_service import IndicatorService
+from .services import bar_export
+from .services.data_version import versioned_response
+from .services.bar_resample import BarResampleService, parse_period
+from .services.code_search import get_search_index
+from .negotiation import DataFormatNegotiation
+from .pagination import DateIdCursorPagination
+from .indicators import INDICATORS, output_names
 from django.db import models
 from django.db.models import Min, Max, Avg, Count
 
 class PolicyDetailsListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
-    """策略详情列表和创建视图"""
-    """策略详情列表和创建视图"""
-    queryset = PolicyDetails.objects.all()
+    """策略详情列表和创建视图
+    
+    列表按 (date, id) 键集分页；fields=date,stock,... 只查询并返回指定字段。
+    """
+    queryset = PolicyDetails.objects.select_related('stock')
     serializer_class = PolicyDetailsSerializer
+    pagination_class = DateIdCursorPagination
     # 添加过滤字段
     filterset_fields = ['stock', 'date', 'strategy_type']
 
+    def get_sparse_fields(self):
+        """解析 fields 查询参数，返回字段名列表（未指定时为 None）"""
+        if self.request.method != 'GET':
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            param = self.request.query_params.get('fields')
+            fields = [name.strip() for name in param.split(',') if name.strip()] if param else None
+            if fields:
+                unknown = set(fields) - set(self.serializer_class().fields)
+                if unknown:
+                    raise ValidationError({'fields': f"未知字段: {', '.join(sorted(unknown))}"})
+            self._sparse_fields = fields
+        return self._sparse_fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_sparse_fields()
+        if fields:
+            if 'stock' not in fields:
+                queryset = queryset.select_related(None)
+            # 分页键 date / id 始终需要
+            queryset = queryset.only(*(set(fields) | {'id', 'date'}))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        # 按查询参数和信号数据版本号缓存，支持 ETag / If-None-Match
+        return versioned_response(request, lambda: super(PolicyDetailsListCreateView, self).list(request, *args, **kwargs))
+
 
 class CodeListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
@@ -479,6 +528,9 @@ class StockDailyDataUpdateView(APIView):
     permission_classes = [IsAuthenticated]
     http_method_names = ['get', 'post']
     http_method_names = ['get', 'post']
+    content_negotiation_class = DataFormatNegotiation
+    DEFAULT_LIMIT = 10000
+    MAX_LIMIT = 50000
     
     """股票日线数据更新和查询视图
     
@@ -488,6 +540,13 @@ class StockDailyDataUpdateView(APIView):
     3. start_date + end_date - 返回日期范围内的数据
     4. 仅 start_date - 返回从起始日期到最新的数据
     
+    GET 分页与导出（按 trade_date 降序、stock_code 升序的键集分页）：
+    - limit: 每页条数，默认 10000，最大 50000
+    - cursor: 上一页返回的 next_cursor
+    - stream=true: 流式输出全部匹配数据（常量内存，忽略 limit）
+    - format: json（默认，逐行对象）、columnar（并行数组）、arrow（Arrow IPC 流，需要 pyarrow，
+      下一页游标放在 X-Next-Cursor 响应头）
+    
     POST 请求支持以下更新方式：
     1. trade_date - 更新指定日期的数据
     2. start_date + end_date - 更新日期范围内的数据
@@ -502,8 +561,8 @@ class StockDailyDataUpdateView(APIView):
             end_date = request.query_params.get('end_date')
             stock_code = request.query_params.get('stock_code')  # 可选的股票代码过滤
             
-            # 初始化查询集
-            queryset = StockDailyData.objects.all().select_related('stock')
+            # 初始化查询集（只读取需要的列，不加载 Code 对象）
+            queryset = StockDailyData.objects.all()
             
             # 根据不同参数组合进行过滤
             if trade_date:
@@ -548,32 +607,79 @@ class StockDailyDataUpdateView(APIView):
             
             # 如果提供了股票代码，进行过滤
             if stock_code:
-                queryset = queryset.filter(stock__ts_code=stock_code)
-            
-            # 按日期和股票代码排序
-            queryset = queryset.order_by('-trade_date', 'stock__ts_code')
-            
-            # 构造返回数据
-            data = []
-            for record in queryset:
-                data.append({
-                    'stock_code': record.stock.ts_code,
-                    'stock_name': record.stock.name,
-                    'trade_date': record.trade_date,
-                    'open': float(record.open),
-                    'high': float(record.high),
-                    'low': float(record.low),
-                    'close': float(record.close),
-                    'volume': record.volume,
-                    'amount': float(record.amount),
-                    'up_limit': float(record.up_limit),
-                    'down_limit': float(record.down_limit)
+                queryset = queryset.filter(stock_id=stock_code)
+            
+            cursor = request.query_params.get('cursor')
+            if cursor:
+                try:
+                    bar_export.decode_cursor(cursor)
+                except bar_export.InvalidCursor as e:
+                    return Response(
+                        {'status': 'error', 'message': str(e)},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            
+            response_format = request.query_params.get('format', 'json')
+            if response_format not in ('json', 'columnar', 'arrow'):
+                return Response(
+                    {'status': 'error', 'message': 'format 仅支持 json、columnar、arrow'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if response_format == 'arrow' and not bar_export.arrow_available():
+                return Response(
+                    {'status': 'error', 'message': '服务器未安装 pyarrow，不支持 format=arrow'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # 流式导出：逐块序列化，不在内存中保留全部数据
+            if request.query_params.get('stream', '').lower() in ('1', 'true'):
+                if response_format != 'json':
+                    return Response(
+                        {'status': 'error', 'message': 'stream 仅支持 format=json'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                return StreamingHttpResponse(
+                    bar_export.stream_json(queryset, cursor),
+                    content_type='application/json'
+                )
+            
+            try:
+                limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+            except ValueError:
+                limit = 0
+            if not 0 < limit <= self.MAX_LIMIT:
+                return Response(
+                    {'status': 'error', 'message': f'limit 必须在 1 到 {self.MAX_LIMIT} 之间'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # 列式输出：由 values_list 元组直接转置为并行数组或 Arrow IPC
+            if response_format != 'json':
+                rows, next_cursor = bar_export.fetch_rows(queryset, limit, cursor)
+                if response_format == 'arrow':
+                    response = HttpResponse(
+                        bar_export.arrow_ipc(rows),
+                        content_type='application/vnd.apache.arrow.stream'
+                    )
+                    response['X-Next-Cursor'] = next_cursor or ''
+                    return response
+                return Response({
+                    'status': 'success',
+                    'message': f'找到 {len(rows)} 条日线数据记录',
+                    'data': bar_export.columnar_payload(rows),
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
                 })
             
+            # 键集分页：按 (trade_date 降序, stock_code 升序) 读取一页
+            data, next_cursor = bar_export.fetch_page(queryset, limit, cursor)
+            
             return Response({
                 'status': 'success',
                 'message': f'找到 {len(data)} 条日线数据记录',
-                'data': data
+                'data': data,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
             })
             
         except Exception as e:
@@ -651,9 +757,15 @@ class StockPatternView(APIView):
     1. trade_date - 分析指定日期的数据
     2. start_date + end_date - 分析日期范围内的数据
     3. 仅 start_date - 分析从起始日期到最新的数据
+    
+    GET 响应按查询参数和信号数据版本号缓存，并返回 ETag；
+    客户端携带 If-None-Match 且数据未变化时返回 304。
     """
     
     def get(self, request):
+        return versioned_response(request, lambda: self.query_patterns(request))
+    
+    def query_patterns(self, request):
         try:
             # 获取查询参数
             trade_date = request.query_params.get('trade_date')
@@ -1019,3 +1131,426 @@ class TradingSignalsAnalysisView(APIView):
             )
 
 
+
+
+class TradingStatsView(APIView):
+    """信号交易统计视图（批量计算持仓天数、MFE、MAE、最终收益）"""
+    permission_classes = [IsAuthenticated]
+
+    # 单次请求最多计算的信号数量
+    MAX_SIGNALS = 5000
+
+    def get(self, request):
+        """按条件筛选信号并返回交易统计
+
+        查询参数:
+        - start_date (str, optional): 信号开始日期，格式：YYYY-MM-DD
+        - end_date (str, optional): 信号结束日期，格式：YYYY-MM-DD
+        - strategy_type (str, optional): 策略类型
+        - stock_code (str, optional): 股票代码
+        - current_status (str, optional): 信号状态 S/F/L
+        """
+        try:
+            queryset = PolicyDetails.objects.all()
+
+            for param, lookup in (('start_date', 'date__gte'), ('end_date', 'date__lte')):
+                value = request.query_params.get(param)
+                if value:
+                    try:
+                        queryset = queryset.filter(**{lookup: datetime.strptime(value, '%Y-%m-%d').date()})
+                    except ValueError:
+                        return Response(
+                            {'error': f'{param} 格式无效，请使用 YYYY-MM-DD 格式'},
+                            status=status.HTTP_400_BAD_REQUEST
+                        )
+
+            strategy_type = request.query_params.get('strategy_type')
+            if strategy_type:
+                queryset = queryset.filter(strategy_type=strategy_type)
+            stock_code = request.query_params.get('stock_code')
+            if stock_code:
+                queryset = queryset.filter(stock_id=stock_code)
+            current_status = request.query_params.get('current_status')
+            if current_status:
+                queryset = queryset.filter(current_status=current_status)
+
+            return self._build_response(queryset)
+
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def post(self, request):
+        """按信号ID列表返回交易统计
+
+        请求参数:
+        - signal_ids (list[int]): 信号ID列表
+        """
+        signal_ids = request.data.get('signal_ids')
+        if not isinstance(signal_ids, list) or not signal_ids:
+            return Response(
+                {'error': 'signal_ids 必须是非空列表'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(signal_ids) > self.MAX_SIGNALS:
+            return Response(
+                {'error': f'signal_ids 数量不能超过 {self.MAX_SIGNALS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            signal_ids = [int(signal_id) for signal_id in signal_ids]
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'signal_ids 必须为整数列表'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            return self._build_response(PolicyDetails.objects.filter(id__in=signal_ids))
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def _build_response(self, queryset):
+        queryset = queryset.order_by('-date', 'stock_id')
+        total = queryset.count()
+        if total > self.MAX_SIGNALS:
+            return Response(
+                {'error': f'匹配的信号数量 {total} 超过上限 {self.MAX_SIGNALS}，请缩小查询范围'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = list(queryset.values('id', 'stock_id', 'date', 'strategy_type', 'current_status'))
+        stats = TradeStatsService().calculate_batch([row['id'] for row in rows])
+
+        data = []
+        for row in rows:
+            item = {
+                'signal_id': row['id'],
+                'stock_code': row['stock_id'],
+                'date': row['date'].strftime('%Y-%m-%d'),
+                'strategy_type': row['strategy_type'],
+                'current_status': row['current_status'],
+            }
+            item.update(stats.get(row['id'], empty_stats()))
+            data.append(item)
+
+        return Response({
+            'status': 'success',
+            'message': f'计算完成，共 {len(data)} 个信号',
+            'data': data
+        })
+
+
+class StrategyStatsRollupView(APIView):
+    """策略统计汇总视图（基于预聚合汇总桶，任意窗口即时返回）"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """汇总时间窗口内的策略统计
+
+        查询参数:
+        - start_date (str, optional): 信号开始日期，默认结束日期前100天
+        - end_date (str, optional): 信号结束日期，默认今天
+        - strategy_type (str, optional): 策略类型
+        - stock_code (str, optional): 股票代码
+        """
+        try:
+            end_date = request.query_params.get('end_date')
+            start_date = request.query_params.get('start_date')
+            try:
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.now().date()
+                start_date = (
+                    datetime.strptime(start_date, '%Y-%m-%d').date() if start_date
+                    else end_date - timedelta(days=100)
+                )
+            except ValueError:
+                return Response(
+                    {'error': '日期格式无效，请使用 YYYY-MM-DD 格式'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            stats = StrategyRollupService().window_stats(
+                start_date,
+                end_date,
+                strategy_type=request.query_params.get('strategy_type'),
+                stock_code=request.query_params.get('stock_code')
+            )
+            stats.update({
+                'start_date': start_date.strftime('%Y-%m-%d'),
+                'end_date': end_date.strftime('%Y-%m-%d'),
+            })
+
+            return Response({
+                'status': 'success',
+                'message': '统计完成',
+                'data': stats
+            })
+
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class IndicatorListView(APIView):
+    """技术指标读取视图"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """读取已计算的技术指标
+
+        查询参数（stock_code 与 trade_date 至少提供一个）:
+        - stock_code (str): 股票代码，返回该股票的指标时间序列
+        - trade_date (str): 交易日期，返回全市场当日截面
+        - names (str, optional): 指标输出名，逗号分隔，如 SMA5,RSI14,MACD_HIST
+        - start_date / end_date (str, optional): 日期范围，格式：YYYY-MM-DD
+        """
+        stock_code = request.query_params.get('stock_code')
+        names = [n.strip() for n in request.query_params.get('names', '').split(',') if n.strip()]
+
+        try:
+            dates = {}
+            for param in ('trade_date', 'start_date', 'end_date'):
+                value = request.query_params.get(param)
+                dates[param] = datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        except ValueError:
+            return Response(
+                {'error': '日期格式无效，请使用 YYYY-MM-DD 格式'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not stock_code and not dates['trade_date']:
+            return Response(
+                {'error': '请提供 stock_code 或 trade_date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        unknown = [name for name in names if name not in output_names()]
+        if unknown:
+            return Response(
+                {'error': f"未注册的指标: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            data = IndicatorService().read(stock_code=stock_code, names=names or None, **dates)
+            return Response({
+                'status': 'success',
+                'message': f'共 {len(data)} 条记录',
+                'data': data
+            })
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class IndicatorRegistryView(APIView):
+    """技术指标注册表视图"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """返回全部已注册的技术指标定义"""
+        return Response({
+            'status': 'success',
+            'message': f'共 {len(INDICATORS)} 个指标',
+            'data': [indicator.describe() for indicator in INDICATORS.values()]
+        })
+
+
+class ResampledBarsView(APIView):
+    """周期K线视图（周线 / 月线 / N 日线）"""
+    permission_classes = [IsAuthenticated]
+    MAX_STOCKS = 50
+
+    def get(self, request):
+        """服务端聚合日线为周期K线
+
+        查询参数:
+        - ts_code (str): 股票代码，多只用逗号分隔，最多 50 只
+        - period (str, optional): W（周线，默认）、M（月线）或 N（每 N 个交易日，如 5 或 5D）
+        - start_date (str): 开始日期，格式：YYYY-MM-DD
+        - end_date (str, optional): 结束日期，默认今天
+        """
+        codes = [c.strip() for c in request.query_params.get('ts_code', '').split(',') if c.strip()]
+        if not codes:
+            return Response(
+                {'status': 'error', 'message': '请提供 ts_code'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(codes) > self.MAX_STOCKS:
+            return Response(
+                {'status': 'error', 'message': f'ts_code 最多 {self.MAX_STOCKS} 只'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            period = parse_period(request.query_params.get('period', 'W'))
+        except ValueError as e:
+            return Response(
+                {'status': 'error', 'message': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            start = datetime.strptime(request.query_params['start_date'], '%Y-%m-%d').date()
+            end_date = request.query_params.get('end_date')
+            end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.now().date()
+        except KeyError:
+            return Response(
+                {'status': 'error', 'message': '请提供 start_date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except ValueError:
+            return Response(
+                {'status': 'error', 'message': '日期格式无效，请使用 YYYY-MM-DD 格式'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end:
+            return Response(
+                {'status': 'error', 'message': 'start_date 不能晚于 end_date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            bars = BarResampleService().get_bars(codes, period, start, end)
+            return Response({
+                'status': 'success',
+                'message': f'{len(bars)} 只股票，共 {sum(len(b["trade_date"]) for b in bars.values())} 根K线',
+                'data': {
+                    'period': period,
+                    'start_date': start.strftime('%Y-%m-%d'),
+                    'end_date': end.strftime('%Y-%m-%d'),
+                    'bars': bars
+                }
+            })
+        except Exception as e:
+            return Response(
+                {'status': 'error', 'message': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class CodeSearchView(APIView):
+    """股票搜索（输入联想）视图"""
+    permission_classes = [IsAuthenticated]
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+
+    def get(self, request):
+        """按代码、名称或拼音首字母搜索股票
+
+        查询参数:
+        - q (str): 搜索词，如 600000、平安、PAYH
+        - limit (int, optional): 最多返回条数，默认 10，取值限制在 1 到 50 之间
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'status': 'error', 'message': '请提供搜索词 q'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT))
+        except ValueError:
+            limit = self.DEFAULT_LIMIT
+
+        data = get_search_index().search(query, limit)
+        return Response({
+            'status': 'success',
+            'message': f'找到 {len(data)} 只股票',
+            'data': data
+        })
+
+
+class BatchBarsView(APIView):
+    """多只股票日线批量查询视图"""
+    permission_classes = [IsAuthenticated]
+    MAX_STOCKS = 500
+    MAX_ROWS = 200000
+
+    def get(self, request):
+        """批量查询多只股票的日线（一次往返，按股票分组的列式数据）
+
+        查询参数:
+        - ts_code (str): 股票代码，逗号分隔，最多 500 只
+        - start_date (str): 开始日期，格式：YYYY-MM-DD
+        - end_date (str, optional): 结束日期，默认今天
+        """
+        codes = [c.strip() for c in request.query_params.get('ts_code', '').split(',') if c.strip()]
+        return self._query(codes, request.query_params.get('start_date'), request.query_params.get('end_date'))
+
+    def post(self, request):
+        """股票列表较长时使用请求体：{"ts_codes": [...], "start_date": "...", "end_date": "..."}"""
+        codes = request.data.get('ts_codes') or []
+        if not isinstance(codes, list):
+            return Response(
+                {'status': 'error', 'message': 'ts_codes 必须为列表'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        codes = [str(c).strip() for c in codes if str(c).strip()]
+        return self._query(codes, request.data.get('start_date'), request.data.get('end_date'))
+
+    def _query(self, codes, start_date, end_date):
+        if not codes:
+            return Response(
+                {'status': 'error', 'message': '请提供股票代码'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        codes = list(dict.fromkeys(codes))
+        if len(codes) > self.MAX_STOCKS:
+            return Response(
+                {'status': 'error', 'message': f'一次最多查询 {self.MAX_STOCKS} 只股票'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not start_date:
+            return Response(
+                {'status': 'error', 'message': '请提供 start_date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            start = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.now().date()
+        except (TypeError, ValueError):
+            return Response(
+                {'status': 'error', 'message': '日期格式无效，请使用 YYYY-MM-DD 格式'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end:
+            return Response(
+                {'status': 'error', 'message': 'start_date 不能晚于 end_date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            queryset = StockDailyData.objects.filter(trade_date__range=[start, end])
+            bars = bar_export.fetch_grouped_columns(queryset, codes, max_rows=self.MAX_ROWS)
+            if bars is None:
+                return Response(
+                    {'status': 'error', 'message': f'数据量超过 {self.MAX_ROWS} 条，请缩小日期范围或减少股票数量'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            names = bar_export.code_names(bars.keys())
+            return Response({
+                'status': 'success',
+                'message': f'{len(bars)} 只股票，共 {sum(len(b["trade_date"]) for b in bars.values())} 条日线',
+                'data': {
+                    'start_date': start.strftime('%Y-%m-%d'),
+                    'end_date': end.strftime('%Y-%m-%d'),
+                    'stock_names': {code: names.get(code) for code in bars},
+                    'missing': [code for code in codes if code not in bars],
+                    'bars': bars
+                }
+            })
+        except Exception as e:
+            return Response(
+                {'status': 'error', 'message': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -242,6 +242,16 @@ def change_password(request):
 import uuid
 from django.contrib.auth.models import User
 from basic.models import UserKey, BrowseRecord
+from basic.audit import get_audit_buffer
+from basic.services.browse_analytics import (
+    GROUP_EXPRESSIONS, BrowseAnalyticsService, InvalidCursor, decode_cursor, encode_cursor
+)
+from datetime import datetime, timedelta
+from django.db.models import Q
+from django.utils import timezone
+
+BROWSE_RECORD_PAGE_SIZE = 500
+BROWSE_RECORD_MAX_PAGE_SIZE = 2000
 
 @extend_schema(
     summary="Key登录",
@@ -353,7 +363,7 @@ def generate_key(request):
 
 @extend_schema(
     summary="查看所有用户的浏览记录",
-    description="管理员可以查看系统中所有用户的最新500条浏览历史记录。",
+    description="管理员查看系统中所有用户的浏览历史记录（默认最新500条），支持 limit / cursor 键集分页，下一页游标见 X-Next-Cursor 响应头。",
     responses={
         200: inline_serializer(
             name="BrowseRecordListResponse",
@@ -376,16 +386,138 @@ def get_browse_records(request):
     if not request.user.is_superuser and not request.user.is_staff:
         return Response({'error': '权限不足，只有管理员可以查看浏览记录'}, status=status.HTTP_403_FORBIDDEN)
         
-    records = BrowseRecord.objects.select_related('user').all()[:500]
-    res_list = []
-    for r in records:
-        res_list.append({
-            'id': r.id,
-            'username': r.user.username if r.user else 'Anonymous',
-            'path': r.path,
-            'method': r.method,
-            'ip': r.ip,
-            'user_agent': r.user_agent,
-            'created_at': r.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        })
-    return Response(res_list, status=status.HTTP_200_OK)
+    try:
+        limit = min(int(request.query_params.get('limit', BROWSE_RECORD_PAGE_SIZE)), BROWSE_RECORD_MAX_PAGE_SIZE)
+        if limit <= 0:
+            raise ValueError
+    except ValueError:
+        return Response({'error': 'limit 必须为正整数'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # 键集分页：按 (created_at, id) 倒序，下一页游标通过 X-Next-Cursor 响应头返回
+    records = BrowseRecord.objects.order_by('-created_at', '-id')
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        try:
+            created_at, record_id = decode_cursor(cursor)
+            created_at = datetime.fromisoformat(created_at)
+        except (InvalidCursor, ValueError, TypeError):
+            return Response({'error': 'cursor 无效'}, status=status.HTTP_400_BAD_REQUEST)
+        records = records.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=record_id))
+
+    rows = list(records.values(
+        'id', 'user__username', 'path', 'method', 'ip', 'user_agent', 'created_at'
+    )[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    res_list = [
+        {
+            'id': row['id'],
+            'username': row['user__username'] or 'Anonymous',
+            'path': row['path'],
+            'method': row['method'],
+            'ip': row['ip'],
+            'user_agent': row['user_agent'],
+            'created_at': timezone.localtime(row['created_at']).strftime('%Y-%m-%d %H:%M:%S')
+        }
+        for row in rows
+    ]
+    response = Response(res_list, status=status.HTTP_200_OK)
+    if has_more and rows:
+        response['X-Next-Cursor'] = encode_cursor([rows[-1]['created_at'].isoformat(), rows[-1]['id']])
+    return response
+
+
+@extend_schema(
+    summary="浏览记录统计分析",
+    description=(
+        "管理员按路径 / 用户 / IP / 小时统计请求数（数据库端聚合）。"
+        "group_by 取 path、user、ip、hour，默认统计最近 7 天，支持 cursor 分页。"
+    ),
+    responses={
+        200: inline_serializer(
+            name="BrowseAnalyticsResponse",
+            fields={
+                "group_by": serializers.CharField(),
+                "start": serializers.CharField(),
+                "end": serializers.CharField(),
+                "results": serializers.ListField(child=serializers.DictField()),
+                "next_cursor": serializers.CharField(allow_null=True),
+            }
+        )
+    },
+    tags=["审计"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def browse_analytics(request):
+    if not request.user.is_superuser and not request.user.is_staff:
+        return Response({'error': '权限不足，只有管理员可以查看浏览统计'}, status=status.HTTP_403_FORBIDDEN)
+
+    group_by = request.query_params.get('group_by', 'path')
+    if group_by not in GROUP_EXPRESSIONS:
+        return Response(
+            {'error': f"group_by 必须为 {', '.join(GROUP_EXPRESSIONS)} 之一"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        end_param = request.query_params.get('end_date')
+        start_param = request.query_params.get('start_date')
+        end = (
+            timezone.make_aware(datetime.strptime(end_param, '%Y-%m-%d')) + timedelta(days=1)
+            if end_param else timezone.now()
+        )
+        start = (
+            timezone.make_aware(datetime.strptime(start_param, '%Y-%m-%d'))
+            if start_param else end - timedelta(days=7)
+        )
+        limit = min(int(request.query_params.get('limit', 50)), BROWSE_RECORD_MAX_PAGE_SIZE)
+        if limit <= 0:
+            raise ValueError
+    except ValueError:
+        return Response({'error': '参数无效：日期格式为 YYYY-MM-DD，limit 必须为正整数'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        results, next_cursor = BrowseAnalyticsService().aggregate(
+            group_by, start, end, limit, request.query_params.get('cursor')
+        )
+    except (InvalidCursor, ValueError, TypeError):
+        return Response({'error': 'cursor 无效'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'group_by': group_by,
+        'start': timezone.localtime(start).strftime('%Y-%m-%d %H:%M:%S'),
+        'end': timezone.localtime(end).strftime('%Y-%m-%d %H:%M:%S'),
+        'results': results,
+        'next_cursor': next_cursor,
+    }, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    summary="浏览记录写入指标",
+    description="管理员查看当前进程浏览记录缓冲区的深度、丢弃数和写入情况。",
+    responses={
+        200: inline_serializer(
+            name="AuditMetricsResponse",
+            fields={
+                "pid": serializers.IntegerField(),
+                "depth": serializers.IntegerField(),
+                "capacity": serializers.IntegerField(),
+                "received": serializers.IntegerField(),
+                "dropped": serializers.IntegerField(),
+                "written": serializers.IntegerField(),
+                "failed": serializers.IntegerField(),
+                "flushes": serializers.IntegerField(),
+            }
+        )
+    },
+    tags=["审计"]
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def audit_metrics(request):
+    if not request.user.is_superuser and not request.user.is_staff:
+        return Response({'error': '权限不足，只有管理员可以查看审计指标'}, status=status.HTTP_403_FORBIDDEN)
+
+    return Response(get_audit_buffer().metrics(), status=status.HTTP_200_OK)
@@ -201,6 +201,18 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 DOCS_ROOT = os.path.join(BASE_DIR, 'docs')
 DOCS_ACCESS = 'public'
 
+# Redis 配置：Django 缓存（响应缓存、数据版本号）与分布式任务锁共用
+REDIS_URL = config('REDIS_URL', default='redis://127.0.0.1:6379/1')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'vuestock',
+        'TIMEOUT': 300,
+    }
+}
+
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'
 CELERY_RESULT_BACKEND = 'redis://127.0.0.1:6379/0'
@@ -223,6 +235,11 @@ CELERY_BEAT_SCHEDULE = {
         ),
         'options': {'queue': 'default'}
     },
+    'purge-browse-records': {
+        'task': 'basic.tasks.purge_browse_records',
+        'schedule': crontab(hour=3, minute=30),
+        'options': {'queue': 'default'}
+    },
 }
 
 # 日志配置
@@ -332,6 +349,7 @@ CORS_PREFLIGHT_MAX_AGE = 86400  # 24小时
 # 是否允许特定的 HTTP 头暴露给 JavaScript
 CORS_EXPOSE_HEADERS = [
     'content-disposition',  # 允许前端访问下载文件名
+    'x-next-cursor',  # 浏览记录键集分页的下一页游标
 ]
 
 # 添加 Celery 配置
@@ -371,3 +389,23 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
 }
+
+# 策略统计汇总配置：是否同时维护单只股票的汇总桶（默认只维护全市场汇总）
+STRATEGY_ROLLUP_PER_STOCK = config('STRATEGY_ROLLUP_PER_STOCK', default=False, cast=bool)
+
+# 连续涨停策略回测的并行进程数（1 为串行，0 为 CPU 核数）
+BACKTEST_WORKERS = config('BACKTEST_WORKERS', default=1, cast=int)
+# 并行进程数上限（请求参数和 BACKTEST_WORKERS 都不会超过它），默认为 CPU 核数
+BACKTEST_MAX_WORKERS = config('BACKTEST_MAX_WORKERS', default=os.cpu_count() or 1, cast=int)
+
+# 进程内 Backtrader 数据源池容量（按数据源个数计），0 为关闭；
+# 开启时建议约为一次全市场回测的股票数（如 2000），数据源会常驻工作进程内存
+BACKTEST_FEED_POOL_SIZE = config('BACKTEST_FEED_POOL_SIZE', default=0, cast=int)
+
+# 浏览记录异步写入配置：是否后台批量写入、缓冲区容量、每批条数、定时写入间隔（毫秒）
+AUDIT_ASYNC = config('AUDIT_ASYNC', default=True, cast=bool)
+AUDIT_BUFFER_SIZE = config('AUDIT_BUFFER_SIZE', default=10000, cast=int)
+AUDIT_BATCH_SIZE = config('AUDIT_BATCH_SIZE', default=200, cast=int)
+AUDIT_FLUSH_INTERVAL_MS = config('AUDIT_FLUSH_INTERVAL_MS', default=1000, cast=int)
+# 浏览记录保留天数，过期记录由 purge_browse_records 任务每日清理
+BROWSE_RECORD_RETENTION_DAYS = config('BROWSE_RECORD_RETENTION_DAYS', default=180, cast=int)
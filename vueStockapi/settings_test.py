@@ -32,3 +32,6 @@ DATABASES = {
         }
     }
 }
+
+# 浏览记录在请求线程内同步写入，测试结果不依赖后台线程
+AUDIT_ASYNC = False